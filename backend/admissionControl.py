@@ -0,0 +1,278 @@
+import heapq
+import itertools
+import logging
+import math
+import time
+from threading import Condition, Lock
+from typing import Any, Callable, Dict, List, Optional
+from backend.configModule import AdmissionConfig
+from backend.metricsModule import metrics
+
+logger = logging.getLogger(__name__)
+
+LANE_URGENT = "urgent"  # reprints and one-off labels, served before any waiting bulk job
+LANE_BULK = "bulk"      # production runs
+LANES = (LANE_URGENT, LANE_BULK)
+
+admission_rejected_total = metrics.counter(
+    "hera_admission_rejected_total", "Print jobs refused with 429 because the printer's queue was full", ("printer", "lane"))
+admission_wait_seconds = metrics.histogram(
+    "hera_admission_wait_seconds", "Time a print job waited for its printer's rate limit", ("lane",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+
+class AdmissionRejected(Exception):
+    """Printer queue is full; retry_after is the number of seconds until the job would be admitted"""
+
+    def __init__(self, message: str, retry_after: float, **fields):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.fields = fields
+
+class Ticket:
+    """A job's place in a printer's queue, for `labels` physical labels"""
+
+    def __init__(self, gate: "PrinterGate", labels: int, lane: str, sequence: int):
+        self.gate = gate
+        self.labels = labels
+        self.lane = lane
+        self.sequence = sequence
+        self.queued = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+
+    def sort_key(self):
+        return LANES.index(self.lane), self.sequence
+
+    def __lt__(self, other: "Ticket") -> bool:
+        return self.sort_key() < other.sort_key()
+
+class PrinterGate:
+    """
+    Token bucket and priority queue in front of one printer
+
+    The bucket fills at the printer's label rate up to `burst` labels, what the printer
+    may hold ahead of its mechanism. A job goes out once it heads the queue and the
+    bucket has min(labels, burst) tokens, then takes all of its labels, so a long run
+    leaves a debt the next job waits out instead of overflowing the printer's buffer.
+    Urgent jobs queue ahead of every waiting bulk job; a job that is already sending
+    is never interrupted.
+    """
+
+    def __init__(self, ip: str, rate: float, burst: int, config: AdmissionConfig):
+        self.ip = ip
+        self.configured_rate = rate
+        self.measured_rate: Optional[float] = None
+        self.burst = burst
+        self.config = config
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waiting: List[Ticket] = []  # heap, urgent lane first, then arrival order
+        self.condition = Condition(Lock())
+        self._sequence = itertools.count()
+
+    @property
+    def rate(self) -> float:
+        """Labels per second, measured from sends the printer slowed down when there is one"""
+        return self.measured_rate or self.configured_rate
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _wait_estimate(self, labels: int, lane: str) -> float:
+        """Seconds a job arriving now would wait before sending (condition held)"""
+        rank = LANES.index(lane)
+        ahead = sum(ticket.labels for ticket in self.waiting if LANES.index(ticket.lane) <= rank)
+        needed = ahead + min(labels, self.burst) - self.tokens
+        return max(0.0, needed) / self.rate
+
+    def admit(self, labels: int, lane: str, force: bool = False) -> Ticket:
+        """Queue a job, or raise AdmissionRejected when it would wait longer than its lane allows"""
+        with self.condition:
+            self._refill(time.monotonic())
+            wait = self._wait_estimate(labels, lane)
+            if not force:
+                max_wait = self.config.max_wait[lane]
+                if len(self.waiting) >= self.config.max_queued_jobs:
+                    raise AdmissionRejected(f"Printer {self.ip} has {len(self.waiting)} jobs queued",
+                                            wait - max_wait if wait > max_wait else labels / self.rate,
+                                            queued=len(self.waiting), wait=round(wait, 1))
+                if wait > max_wait:
+                    # Come back when the queue has drained enough to fit within the lane's wait
+                    raise AdmissionRejected(f"Printer {self.ip} is busy for {wait:.0f} s", wait - max_wait,
+                                            queued=len(self.waiting), wait=round(wait, 1))
+            ticket = Ticket(self, labels, lane, next(self._sequence))
+            heapq.heappush(self.waiting, ticket)
+            return ticket
+
+    def acquire(self, ticket: Ticket):
+        """Block until the ticket's job may send; raises RuntimeError for a cancelled ticket"""
+        with self.condition:
+            while True:
+                if ticket.granted:
+                    return
+                if ticket.cancelled:
+                    # Not in the queue any more, waiting for it to reach the head would never end
+                    raise RuntimeError(f"Ticket for printer {self.ip} was cancelled")
+                now = time.monotonic()
+                self._refill(now)
+                needed = min(ticket.labels, self.burst)
+                at_head = bool(self.waiting) and self.waiting[0] is ticket
+                if at_head and self.tokens >= needed:
+                    heapq.heappop(self.waiting)
+                    self.tokens -= ticket.labels
+                    ticket.granted = True
+                    self.condition.notify_all()
+                    break
+                # The head waits for tokens, everyone else for the head to leave
+                timeout = (needed - self.tokens) / self.rate if at_head else None
+                self.condition.wait(timeout)
+        admission_wait_seconds.observe(time.monotonic() - ticket.queued, lane=ticket.lane)
+
+    def resize(self, ticket: Ticket, labels: int):
+        """Correct the label count of a waiting ticket, its place in the queue stays"""
+        with self.condition:
+            ticket.labels = labels
+            self.condition.notify_all()
+
+    def cancel(self, ticket: Ticket):
+        """Leave the queue without sending (the job failed before its turn)"""
+        with self.condition:
+            if not ticket.granted and not ticket.cancelled:
+                ticket.cancelled = True
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self.condition.notify_all()
+
+    def finished(self, ticket: Ticket, ok: bool, seconds: float):
+        """Account for a sent job: failed sends give their tokens back, slow ones measure the printer"""
+        with self.condition:
+            if not ok:
+                self.tokens = min(self.burst, self.tokens + ticket.labels)
+                self.condition.notify_all()
+            elif seconds >= self.config.measure_min_seconds and ticket.labels > self.burst:
+                # The socket only blocks this long when the printer's buffer is full, so this is its print speed
+                sample = ticket.labels / seconds
+                alpha = self.config.measure_smoothing
+                self.measured_rate = sample if self.measured_rate is None else \
+                    alpha * sample + (1 - alpha) * self.measured_rate
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.condition:
+            self._refill(time.monotonic())
+            return {
+                "ip": self.ip,
+                "labels_per_second": round(self.rate, 2),
+                "configured_labels_per_second": self.configured_rate,
+                "measured_labels_per_second": round(self.measured_rate, 2) if self.measured_rate else None,
+                "tokens": round(self.tokens, 1),
+                "burst": self.burst,
+                "queued": {lane: sum(1 for ticket in self.waiting if ticket.lane == lane) for lane in LANES},
+                "queued_labels": sum(ticket.labels for ticket in self.waiting),
+                "wait_seconds": {lane: round(self._wait_estimate(1, lane), 1) for lane in LANES}
+            }
+
+class AdmissionControl:
+    """
+    Per-printer rate limiting for print jobs
+
+    A job is admitted (or refused with 429 and Retry-After) before anything is rendered
+    or journaled, and its sends are paced by the printer's gate. Disabled with
+    HERA_ADMISSION=0, admission always succeeds and sends are not paced.
+    """
+
+    def __init__(self):
+        self.config = AdmissionConfig()
+        self.gates: Dict[str, PrinterGate] = {}
+        self._lock = Lock()
+
+    def gate(self, ip: str) -> PrinterGate:
+        with self._lock:
+            gate = self.gates.get(ip)
+            if gate is None:
+                rate = self.config.printer_rates.get(ip, self.config.labels_per_second)
+                gate = self.gates[ip] = PrinterGate(ip, rate, self.config.burst_labels, self.config)
+            return gate
+
+    def admit(self, ip: str, labels: int, lane: str) -> Optional[Ticket]:
+        """
+        Place a job of `labels` physical labels in the printer's queue
+
+        Raises AdmissionRejected when the printer's queue is full. The ticket must end up
+        in paced() or release(), a ticket left waiting would hold up the queue.
+        """
+        if not self.config.enabled:
+            return None
+        try:
+            return self.gate(ip).admit(labels, lane)
+        except AdmissionRejected:
+            admission_rejected_total.inc(printer=ip, lane=lane)
+            raise
+
+    def available(self, ips: List[str], labels: int, lane: str) -> List[str]:
+        """
+        Printers of a group that can take their share of a job now
+
+        A best-effort probe: nothing is reserved, so concurrent group jobs may all pick the
+        same printer and then queue behind each other at its gate. Raises AdmissionRejected
+        when none can. The shares are only known once the dispatcher splits the job, so
+        group slices queue (forced) when they are sent.
+        """
+        if not self.config.enabled:
+            return ips
+        share = math.ceil(labels / len(ips))
+        accepted, rejections = [], []
+        for ip in ips:
+            gate = self.gate(ip)
+            try:
+                gate.cancel(gate.admit(share, lane))
+                accepted.append(ip)
+            except AdmissionRejected as e:
+                rejections.append(e)
+        if not accepted:
+            for ip in ips:
+                admission_rejected_total.inc(printer=ip, lane=lane)
+            raise min(rejections, key=lambda e: e.retry_after)
+        return accepted
+
+    def release(self, ticket: Optional[Ticket]):
+        """Give up a ticket whose job ended before it was sent"""
+        if ticket is not None:
+            ticket.gate.cancel(ticket)
+
+    def paced(self, send: Callable[[str, int, int], bool], lane: str, copies: int = 1,
+              ticket: Ticket = None) -> Callable[[str, int, int], bool]:
+        """
+        send(ip, offset, labels) that waits for its turn at the printer's gate
+
+        The first slice for the ticket's printer uses the ticket, any other slice (group
+        members, resumed gaps) queues when it is sent.
+        """
+        if not self.config.enabled:
+            return send
+        unused = [ticket] if ticket is not None else []
+
+        def paced_send(ip: str, offset: int, labels: int) -> bool:
+            gate = self.gate(ip)
+            if unused and unused[0].gate is gate:
+                slice_ticket = unused.pop()
+                gate.resize(slice_ticket, labels * copies)
+            else:
+                slice_ticket = gate.admit(labels * copies, lane, force=True)
+            gate.acquire(slice_ticket)
+            start = time.monotonic()
+            ok = False
+            try:
+                ok = send(ip, offset, labels)
+                return ok
+            finally:
+                gate.finished(slice_ticket, ok, time.monotonic() - start)
+        return paced_send
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            gates = list(self.gates.values())
+        return [gate.snapshot() for gate in gates]
+
+# Global admission control
+admission_control = AdmissionControl()
@@ -0,0 +1,242 @@
+import asyncio
+import concurrent.futures
+import logging
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Any, Awaitable, Dict, List, Optional
+from backend.metricsModule import printer_socket_seconds, printer_errors_total, printer_bytes_total
+from backend.configModule import RenderConfig, PrinterConfig
+from backend.requestProfiler import profile_stage, STAGE_SEND
+from backend.tsplCommands import (
+    PrinterUnreachable, bmp_commands, regions_commands, text_commands, template_download, template_commands
+)
+
+logger = logging.getLogger(__name__)
+
+class AsyncTSCPrinter:
+    """
+    Non-blocking TSPL session with one printer
+
+    Lives on the AsyncPrinterManager event loop; every coroutine must run there. Callers
+    hold `lock` around a job so two jobs never interleave on the connection.
+    """
+
+    def __init__(self, printer_ip: str, printer_port: int = 9100, connect_timeout: float = None):
+        self.printer_ip = printer_ip
+        self.printer_port = printer_port
+        self.connect_timeout = connect_timeout or PrinterConfig().connect_timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.lock = asyncio.Lock()
+        self.downloaded_files = set()  # files stored in printer DRAM during this connection
+
+    def is_connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing() and not self.reader.at_eof()
+
+    async def connect_printer(self):
+        with printer_socket_seconds.time(printer=self.printer_ip, operation="connect"):
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.printer_ip, self.printer_port), self.connect_timeout)
+        # A new connection may follow a power cycle, which clears DRAM
+        self.downloaded_files = set()
+
+    async def disconnect_printer(self):
+        writer, self.reader, self.writer = self.writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (OSError, asyncio.CancelledError) as e:
+                logger.debug("disconnect_printer %s: %s", self.printer_ip, e)
+
+    async def check_connection(self, timeout: float = 3) -> bool:
+        """Check if printer is online and reachable (separate probe connection)"""
+        try:
+            with printer_socket_seconds.time(printer=self.printer_ip, operation="probe"):
+                _, writer = await asyncio.wait_for(asyncio.open_connection(self.printer_ip, self.printer_port), timeout)
+            writer.close()
+            return True
+        except (OSError, asyncio.TimeoutError):
+            return False
+
+    async def _ensure_connected(self) -> bool:
+        try:
+            if not self.is_connected():
+                await self.connect_printer()
+            return True
+        except (OSError, asyncio.TimeoutError) as e:
+            printer_errors_total.inc(printer=self.printer_ip, operation="connect")
+            logger.error("connect_printer Exception for %s: %s", self.printer_ip, e)
+            return False
+
+    async def _send(self, *payloads: bytes, pause: float = 0) -> bool:
+        """
+        Write payloads in order (pausing between them), reconnecting first when needed
+
+        Raises PrinterUnreachable when no connection can be opened, False means the write
+        failed and the printer may have received part of it.
+        """
+        if not await self._ensure_connected():
+            raise PrinterUnreachable(f"Could not connect to printer {self.printer_ip}")
+        try:
+            for index, payload in enumerate(payloads):
+                if index and pause:
+                    await asyncio.sleep(pause)
+                with printer_socket_seconds.time(printer=self.printer_ip, operation="send"):
+                    self.writer.write(payload)
+                    await self.writer.drain()
+            return True
+        except (OSError, asyncio.TimeoutError) as e:
+            printer_errors_total.inc(printer=self.printer_ip, operation="send")
+            logger.error("Send to %s failed: %s", self.printer_ip, e)
+            # The printer may have lost its files, upload again next time
+            await self.disconnect_printer()
+            return False
+
+    async def send_bmp(self, download: bytes, print_commands: bytes) -> bool:
+        # Same pause as the blocking driver, the printer stores the file before it prints
+        return await self._send(download, print_commands, pause=0.5)
+
+    async def send_commands(self, commands: bytes) -> bool:
+        return await self._send(commands)
+
+    async def send_template(self, filename: str, region: tuple, download: bytes, commands: bytes) -> bool:
+        # Connect first, a new connection forgets what was downloaded
+        if not await self._ensure_connected():
+            raise PrinterUnreachable(f"Could not connect to printer {self.printer_ip}")
+        if filename in self.downloaded_files:
+            download = b""
+        elif not download:
+            download = template_download(filename, region)
+        if download:
+            printer_bytes_total.inc(len(download), printer=self.printer_ip, encoding="template")
+        ok = await self._send(download + commands)
+        if ok and download:
+            self.downloaded_files.add(filename)
+        return ok
+
+class AsyncPrinterManager:
+    """
+    Printer sessions and probes multiplexed on one asyncio event loop thread
+
+    Offers the blocking API of PrinterManager, so routes, the dispatcher and the status
+    monitor can use either driver. TSPL is built in the calling thread and only socket
+    I/O runs on the loop, so hundreds of printers cost one thread instead of one each.
+    """
+
+    def __init__(self):
+        printerConfig = PrinterConfig()
+        self.renderConfig = RenderConfig()
+        self.raster_encodings = printerConfig.raster_encodings
+        self.connect_timeout = printerConfig.connect_timeout
+        self.printers: Dict[str, AsyncTSCPrinter] = {}
+        self._printers_lock = Lock()
+        self.loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._run_loop, name="printer-io", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine: Awaitable) -> concurrent.futures.Future:
+        """Schedule a coroutine on the printer loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Awaitable) -> Any:
+        """Run a coroutine on the printer loop and wait for its result"""
+        return self.submit(coroutine).result()
+
+    def get_printer(self, ip: str, port: int = 9100) -> AsyncTSCPrinter:
+        """Get or create a printer instance"""
+        key = f"{ip}:{port}"
+        with self._printers_lock:
+            if key not in self.printers:
+                self.printers[key] = AsyncTSCPrinter(ip, port, self.connect_timeout)
+            return self.printers[key]
+
+    async def _locked(self, printer: AsyncTSCPrinter, coroutine_function, *args) -> bool:
+        async with printer.lock:
+            return await coroutine_function(*args)
+
+    def check_printer_connection(self, ip: str, port: int = 9100, timeout: int = 3) -> bool:
+        """Check if printer is online and reachable"""
+        return self.run(self.get_printer(ip, port).check_connection(timeout))
+
+    def check_printers(self, ips: List[str], port: int = 9100, timeout: float = 3) -> Dict[str, bool]:
+        """Probe several printers concurrently"""
+        async def probe_all():
+            return await asyncio.gather(*(self.get_printer(ip, port).check_connection(timeout) for ip in ips))
+        return dict(zip(ips, self.run(probe_all()))) if ips else {}
+
+    def connect_printers(self, ips: List[str], port: int = 9100, timeout: float = 3) -> Dict[str, bool]:
+        """Open job connections ahead of the first job; printers that don't answer a probe are skipped"""
+        async def connect(printer: AsyncTSCPrinter) -> bool:
+            if not await printer.check_connection(timeout):
+                return False
+            async with printer.lock:
+                return await printer._ensure_connected()
+        async def connect_all():
+            return await asyncio.gather(*(connect(self.get_printer(ip, port)) for ip in ips))
+        return dict(zip(ips, self.run(connect_all()))) if ips else {}
+
+    def get_printer_status(self, ip: str, port: int = 9100) -> Dict[str, Any]:
+        """Get printer status including connection info"""
+        is_online = self.check_printer_connection(ip, port)
+        return {
+            "ip": ip,
+            "port": port,
+            "is_online": is_online,
+            "status": "Online" if is_online else "Offline"
+        }
+
+    @profile_stage(STAGE_SEND)
+    def print_bmp(self, ip: str, bmp_path: str, width_mm: int = 100, height_mm: int = 29, port: int = 9100, sets: int = 1, copies: int = 1) -> bool:
+        """Print BMP file to specified printer"""
+        bmp_file = Path(bmp_path)
+        if not bmp_file.exists():
+            logger.error("print_bmp: BMP file not found: %s", bmp_path)
+            return False
+        download, print_commands = bmp_commands(bmp_file.read_bytes(), width_mm, height_mm, sets, copies)
+        printer = self.get_printer(ip, port)
+        return self.run(self._locked(printer, printer.send_bmp, download, print_commands))
+
+    @profile_stage(STAGE_SEND)
+    def print_label_buffer(self, ip: str, label_buffer, width_mm: int = 100, height_mm: int = 29, port: int = 9100, copies: int = 1) -> bool:
+        """Print a rendered LabelBuffer to specified printer"""
+        # Only the inked region is sent, CLS already cleared the rest of the label
+        region = label_buffer.packed_region(self.renderConfig.crop_blank_margins)
+        return self.print_regions(ip, [region], width_mm, height_mm, port, copies)
+
+    @profile_stage(STAGE_SEND)
+    def print_regions(self, ip: str, regions: List[tuple], width_mm: int = 100, height_mm: int = 29, port: int = 9100, copies: int = 1) -> bool:
+        """Print rendered label regions to specified printer in one session"""
+        commands = regions_commands(regions, width_mm, height_mm, copies, self.raster_encodings, ip)
+        printer = self.get_printer(ip, port)
+        return self.run(self._locked(printer, printer.send_commands, commands))
+
+    @profile_stage(STAGE_SEND)
+    def print_template(self, ip: str, filename: str, region: tuple, program, count: int = 1, copies: int = 1,
+                       width_mm: int = 100, height_mm: int = 29, port: int = 9100) -> bool:
+        """Print a template run with printer-side variables to specified printer"""
+        printer = self.get_printer(ip, port)
+        # Built up front, the loop skips the download when the printer already holds the file
+        download = template_download(filename, region) if filename not in printer.downloaded_files else b""
+        commands = template_commands(filename, region, program, count, copies, width_mm, height_mm)
+        return self.run(self._locked(printer, printer.send_template, filename, region, download, commands))
+
+    @profile_stage(STAGE_SEND)
+    def print_text(self, ip: str, text: str, x: int = 10, y: int = 10, width_mm: int = 100, height_mm: int = 29, port: int = 9100,
+                   sets: int = 1, copies: int = 1, counter_start: str = None, counter_step: int = 1) -> bool:
+        """Print text to specified printer"""
+        commands = text_commands(text, x, y, width_mm, height_mm, sets, copies, counter_start, counter_step)
+        printer = self.get_printer(ip, port)
+        return self.run(self._locked(printer, printer.send_commands, commands))
+
+    def disconnect_all(self):
+        """Disconnect all cached printers"""
+        with self._printers_lock:
+            printers, self.printers = list(self.printers.values()), {}
+        async def disconnect():
+            await asyncio.gather(*(printer.disconnect_printer() for printer in printers))
+        self.run(disconnect())
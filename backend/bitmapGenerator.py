@@ -7,17 +7,66 @@ import os
 import platform
 from pathlib import Path
 from typing import List, Dict, Any
+import logging
+from backend.imageCache import image_cache, font_cache, barcode_cache, static_layer_cache, glyph_metrics_cache
+from backend.dithering import dither_to_1bit
+from backend.configModule import RenderConfig
+from backend.metricsModule import timed, render_item_seconds, render_label_seconds, current_render_source
+from backend.requestProfiler import profile_stage, STAGE_RENDER
+from backend.labelBuffer import label_buffer_pool
+from backend.rasterBackend import get_raster_backend
+from backend.textLayout import GlyphMetrics, TextLayout, layout_text, FIT_NONE
+from backend.databaseModule.assets import parse_data_url, asset_id_for, asset_id_from_reference
+
+logger = logging.getLogger(__name__)
+
+BARCODE_CLASSES = {
+    "code128": Code128,
+    "ean13": EAN13,
+    "code39": Code39
+}
+
+def _without_geometry(item: Dict[str, Any], **changes) -> Dict[str, Any]:
+    """Item with new content; the bbox precomputed at save time no longer applies"""
+    item = {**item, **changes}
+    item.pop("bbox", None)
+    return item
+
+def apply_payload(settings_data: Dict[str, Any], payload: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Copy of saved frontend settings with variable fields replaced
+
+    payload: {"values": {valueId: content}, "barcodes": {barcode id: data}}
+    """
+    if not payload:
+        return settings_data
+    values = payload.get("values", {})
+    barcodes = {str(key): value for key, value in payload.get("barcodes", {}).items()}
+    result = dict(settings_data)
+    result["valueItems"] = [
+        _without_geometry(item, content=str(values[item.get("valueId")])) if item.get("valueId") in values else item
+        for item in settings_data.get("valueItems", [])
+    ]
+    result["barcodeItems"] = [
+        _without_geometry(item, data=str(barcodes[str(item.get("id"))])) if str(item.get("id")) in barcodes else item
+        for item in settings_data.get("barcodeItems", [])
+    ]
+    return result
 
 class BitmapGenerator:
     """Bitmap generation class based on test.py example"""
     
-    def __init__(self, width_mm: int = 100, height_mm: int = 29, dpi: int = 300, filename: str = "generated_bitmap.bmp"):
+    def __init__(self, width_mm: int = 100, height_mm: int = 29, dpi: int = 300, filename: str = "generated_bitmap.bmp", asset_store=None):
         self.width_mm = width_mm
         self.height_mm = height_mm
         self.dpi = dpi
         self.filename = filename
+        self.asset_store = asset_store  # Assets instance used to resolve icon asset ids
+        self.renderConfig = RenderConfig()
+        self.raster = get_raster_backend(self.renderConfig.raster_backend)
         self.draw = None
         self.img = None
+        self.buffer = None  # LabelBuffer backing self.img, borrowed from label_buffer_pool
 
     def _get_system_font_paths(self):
         """Get common system font paths based on operating system"""
@@ -110,16 +159,25 @@ class BitmapGenerator:
         return px / dpmm
 
     def _load_font(self, font_family: str = "Arial", font_size_px: int = 30):
+        """Load font, parsed once per family and size"""
+        cache_key = (font_family, font_size_px)
+        font = font_cache.get(cache_key)
+        if font is None:
+            font = self._open_font(font_family, font_size_px)
+            font_cache.put(cache_key, font)
+        return font
+
+    def _open_font(self, font_family: str, font_size_px: int):
         """Load font with improved resolution and fallbacks"""
         # First try to resolve the font family to a system font path
         font_path = self._resolve_font_path(font_family)
         
         if font_path:
             try:
-                print(f"Loading font: {font_path}")
+                logger.debug("Loading font: %s", font_path)
                 return ImageFont.truetype(font_path, font_size_px)
             except (OSError, UnicodeDecodeError) as e:
-                print(f"Error loading font {font_path}: {e}")
+                logger.warning("Error loading font %s: %s", font_path, e)
         
         # Fallback to common system fonts
         fallback_fonts = []
@@ -146,14 +204,14 @@ class BitmapGenerator:
         for fallback_path in fallback_fonts:
             try:
                 if os.path.isfile(fallback_path):
-                    print(f"Using fallback font: {fallback_path}")
+                    logger.debug("Using fallback font: %s", fallback_path)
                     return ImageFont.truetype(fallback_path, font_size_px)
             except (OSError, UnicodeDecodeError) as e:
-                print(f"Error loading fallback font {fallback_path}: {e}")
+                logger.warning("Error loading fallback font %s: %s", fallback_path, e)
                 continue
         
         # Last resort - use default font
-        print("Using default PIL font")
+        logger.warning("Using default PIL font")
         return ImageFont.load_default()
 
     def set_label_scale(self):
@@ -165,26 +223,82 @@ class BitmapGenerator:
 
     def set_text(self, text: str, x: int, y: int, font_size_px: int, font_family: str = "Arial"):
         """Add text to bitmap at specified coordinates"""
-        font = self._load_font(font_family, font_size_px)
-        self.draw.text((x, y), text, font=font, fill=0)
+        font = self._draw_text(text, x, y, font_size_px, font_family)
         bbox = self.draw.textbbox((x, y), text, font=font)
-        print(f"Text '{text}' bbox: {bbox}")
+        logger.debug("Text '%s' bbox: %s", text, bbox)
         return bbox
 
+    @timed(render_item_seconds, item_type="text")
+    def _draw_text(self, text: str, x: int, y: int, font_size_px: int, font_family: str = "Arial"):
+        """Draw one line of text without measuring it, returns the font used"""
+        font = self._load_font(font_family, font_size_px)
+        self.draw.text((x, y), text, font=font, fill=0)
+        return font
+
+    def glyph_metrics(self, font_family: str, font_size_px: int) -> GlyphMetrics:
+        """Cached per-character metrics of a font at one size"""
+        cache_key = (font_family, font_size_px)
+        metrics = glyph_metrics_cache.get(cache_key)
+        if metrics is None:
+            metrics = GlyphMetrics(self._load_font(font_family, font_size_px))
+            glyph_metrics_cache.put(cache_key, metrics)
+        return metrics
+
+    def layout_text_item(self, item: Dict[str, Any], text: str = None) -> TextLayout:
+        """Lines of a text item with a box (width, optional height), wrapped and fitted as the item asks"""
+        font_family = item.get("fontFamily", "Arial")
+        return layout_text(
+            str(item.get("content", "") if text is None else text),
+            lambda size: self.glyph_metrics(font_family, size),
+            item.get("fontSize", 12),
+            width=item.get("width"),
+            height=item.get("height"),
+            wrap=item.get("wrap", True),
+            fit=item.get("fit", FIT_NONE),
+            min_font_size=item.get("minFontSize"),
+            align=item.get("align", "left"),
+            vertical_align=item.get("verticalAlign", "top"),
+            line_spacing=item.get("lineSpacing", 1.0)
+        )
+
+    @timed(render_item_seconds, item_type="text")
+    def set_text_box(self, item: Dict[str, Any], x: int, y: int):
+        """Add a text item laid out in its box (wrapping, shrink-to-fit, alignment)"""
+        text_layout = self.layout_text_item(item)
+        font = self._load_font(item.get("fontFamily", "Arial"), text_layout.font_size)
+        for line, left, top in text_layout.lines:
+            self.draw.text((x + left, y + top), line, font=font, fill=0)
+        return x, y, x + text_layout.width, y + text_layout.height
+
+    @timed(render_item_seconds, item_type="barcode")
     def set_barcode(self, data: str, x: int, y: int, barcode_type: str = "code128", width_px: int = None, height_px: int = None):
         """Add barcode to bitmap at specified coordinates"""
-        # Barcode type selection
-        barcode_classes = {
-            "code128": Code128,
-            "ean13": EAN13,
-            "code39": Code39
-        }
+        barcode_img = self.render_barcode(data, barcode_type, width_px, height_px)
         
-        if barcode_type.lower() not in barcode_classes:
-            raise ValueError(f"Unsupported barcode type: {barcode_type}")
+        # Paste to main image
+        self._paste_tile(barcode_img, x, y)
         
+        # Calculate bounding box
+        bbox = (x, y, x + barcode_img.width, y + barcode_img.height)
+        logger.debug("Barcode '%s' (%s) bbox: %s", data, barcode_type, bbox)
+        
+        return bbox
+
+    def render_barcode(self, data: str, barcode_type: str = "code128", width_px: int = None, height_px: int = None) -> Image.Image:
+        """1-bit barcode image at the requested size (shared from the cache, don't modify it)"""
+        # Barcode type selection
+        if barcode_type.lower() not in BARCODE_CLASSES:
+            raise ValueError(f"Unsupported barcode type: {barcode_type}")
+        cache_key = (barcode_type.lower(), data, width_px, height_px, self.dpi)
+        barcode_img = barcode_cache.get(cache_key)
+        if barcode_img is None:
+            barcode_img = self._render_barcode(data, barcode_type, width_px, height_px)
+            barcode_cache.put(cache_key, barcode_img)
+        return barcode_img
+
+    def _render_barcode(self, data: str, barcode_type: str, width_px: int = None, height_px: int = None) -> Image.Image:
         # Create barcode
-        barcode_class = barcode_classes[barcode_type.lower()]
+        barcode_class = BARCODE_CLASSES[barcode_type.lower()]
         
         # ImageWriter for barcode creation
         writer = ImageWriter()
@@ -198,13 +312,8 @@ class BitmapGenerator:
         # Create barcode
         barcode = barcode_class(data, writer=writer)
         
-        # Save to BytesIO
-        buffer = BytesIO()
-        barcode.write(buffer)
-        buffer.seek(0)
-        
-        # Load as PIL Image
-        barcode_img = Image.open(buffer)
+        # Render straight to a PIL Image (no PNG encode/decode round trip)
+        barcode_img = barcode.render()
         
         # Convert to black-white (1-bit) mode
         barcode_img = barcode_img.convert("1")
@@ -215,54 +324,97 @@ class BitmapGenerator:
             new_width = width_px if width_px else current_width
             new_height = height_px if height_px else current_height
             barcode_img = barcode_img.resize((new_width, new_height))
-        
-        # Paste to main image
-        self.img.paste(barcode_img, (x, y))
-        
-        # Calculate bounding box
-        bbox = (x, y, x + barcode_img.width, y + barcode_img.height)
-        print(f"Barcode '{data}' ({barcode_type}) bbox: {bbox}")
-        
-        return bbox
+        return barcode_img
 
-    def set_image(self, image_path: str, x: int, y: int, width_px: int = None, height_px: int = None):
+    @timed(render_item_seconds, item_type="image")
+    def set_image(self, image_path: str, x: int, y: int, width_px: int = None, height_px: int = None, dither: str = None, threshold: int = None):
         """Add image to bitmap at specified coordinates"""
         try:
-            # Load image
-            img = Image.open(image_path)
-            
-            # Convert to black-white (1-bit) mode
-            img = img.convert("1")
-            
-            # Resize
-            if width_px or height_px:
-                current_width, current_height = img.size
-                
-                if width_px and height_px:
-                    # Both dimensions given - direct resize
-                    img = img.resize((width_px, height_px))
-                elif width_px:
-                    # Only width given - proportional resize
-                    ratio = width_px / current_width
-                    new_height = int(current_height * ratio)
-                    img = img.resize((width_px, new_height))
-                elif height_px:
-                    # Only height given - proportional resize
-                    ratio = height_px / current_height
-                    new_width = int(current_width * ratio)
-                    img = img.resize((new_width, height_px))
+            # Decoded 1-bit tiles are cached until the file changes on disk
+            mtime = os.path.getmtime(image_path)
+            cache_key = ("image", image_path, mtime, width_px, height_px, dither, threshold)
+            tile = image_cache.get(cache_key)
+            if tile is None:
+                with Image.open(image_path) as src:
+                    tile = self._to_1bit_tile(src, width_px, height_px, dither, threshold)
+                image_cache.put(cache_key, tile)
             
             # Paste to main image
-            self.img.paste(img, (x, y))
+            self._paste_tile(tile, x, y)
             
             # Calculate bounding box
-            bbox = (x, y, x + img.width, y + img.height)
-            print(f"Image '{image_path}' bbox: {bbox}")
+            bbox = (x, y, x + tile.width, y + tile.height)
+            logger.debug("Image '%s' bbox: %s", image_path, bbox)
             
             return bbox
             
         except Exception as e:
-            print(f"Error loading image: {e}")
+            logger.error("Error loading image %s: %s", image_path, e)
+            return (x, y, x, y)  # Return empty bbox
+
+    def _paste_tile(self, tile: Image.Image, x: int, y: int):
+        """Composite a 1-bit tile into the label buffer with the configured raster backend"""
+        self.raster.paste(self.buffer, tile, x, y, self.renderConfig.composite)
+
+    def _fit_size(self, size: tuple, width_px: int = None, height_px: int = None) -> tuple:
+        """Target size for a tile, keeping aspect ratio when only one side is given"""
+        current_width, current_height = size
+        if width_px and height_px:
+            return width_px, height_px
+        if width_px:
+            return width_px, max(1, int(current_height * width_px / current_width))
+        if height_px:
+            return max(1, int(current_width * height_px / current_height)), height_px
+        return current_width, current_height
+
+    def _to_1bit_tile(self, img: Image.Image, width_px: int = None, height_px: int = None, dither: str = None, threshold: int = None) -> Image.Image:
+        """Flatten transparency onto white, resample in grayscale at target size, then dither to 1-bit"""
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            img = img.convert("RGBA")
+            background = Image.new("RGBA", img.size, (255, 255, 255, 255))
+            background.alpha_composite(img)
+            img = background
+        img = img.convert("L")
+        size = self._fit_size(img.size, width_px, height_px)
+        if size != img.size:
+            img = img.resize(size, Image.LANCZOS)
+        return dither_to_1bit(
+            img,
+            dither or self.renderConfig.dither,
+            self.renderConfig.threshold if threshold is None else threshold
+        )
+
+    @timed(render_item_seconds, item_type="icon")
+    def set_icon(self, icon_ref: str, x: int, y: int, width_px: int = None, height_px: int = None, dither: str = None, threshold: int = None):
+        """Add icon to bitmap from an asset id, `/api/assets/<id>` url or base64 data URL"""
+        try:
+            asset_id = asset_id_from_reference(icon_ref)
+            raw = None
+            if asset_id is None:
+                parsed = parse_data_url(icon_ref)
+                if not parsed:
+                    raise ValueError("Unsupported icon reference")
+                raw = parsed[1]
+                asset_id = asset_id_for(raw)
+
+            cache_key = ("icon", asset_id, width_px, height_px, dither, threshold)
+            tile = image_cache.get(cache_key)
+            if tile is None:
+                if raw is None:
+                    if self.asset_store is None:
+                        raise ValueError("No asset store available")
+                    raw = self.asset_store.get_asset_data(asset_id)
+                    if raw is None:
+                        raise ValueError(f"Asset not found: {asset_id}")
+                with Image.open(BytesIO(raw)) as src:
+                    tile = self._to_1bit_tile(src, width_px, height_px, dither, threshold)
+                image_cache.put(cache_key, tile)
+
+            self._paste_tile(tile, x, y)
+            return (x, y, x + tile.width, y + tile.height)
+
+        except Exception as e:
+            logger.error("Error loading icon: %s", e)
             return (x, y, x, y)  # Return empty bbox
 
     def bitmap_init(self):
@@ -270,14 +422,40 @@ class BitmapGenerator:
         # Calculate label dimensions
         W, H, dpmm = self.set_label_scale()
         
-        # Create Image and Draw objects
-        self.img = Image.new("1", (W, H), 1)  # 1=mode (1-bit), 1=white
+        # Borrow a cleared, preallocated raster instead of allocating a new Image
+        self.release_buffer()
+        self.buffer = label_buffer_pool.acquire(W, H)
+        self.img = self.buffer.image
         self.draw = ImageDraw.Draw(self.img)
+        self.draw.fontmode = "1"  # No anti-aliasing, same pixels as a mode "1" image
 
     def bitmap_finish(self):
-        """Save bitmap to file"""
-        self.img.save(self.filename, format="BMP")
+        """Save bitmap to file as 1-bit BMP and hand the buffer back to the pool"""
+        self.buffer.to_1bit().save(self.filename, format="BMP")
+        self.release_buffer()
+
+    def release_buffer(self):
+        """Return the label buffer to the pool; self.img is invalid afterwards"""
+        if self.buffer is not None:
+            label_buffer_pool.release(self.buffer)
+            self.buffer = None
+            self.img = None
+            self.draw = None
 
+    @timed(render_label_seconds, source=current_render_source)
+    @profile_stage(STAGE_RENDER)
+    def render_frontend_data(self, text_items: List[Dict], value_items: List[Dict], icon_items: List[Dict], barcode_items: List[Dict]):
+        """
+        Render frontend data into a pooled LabelBuffer without writing a file
+
+        The caller sends it (e.g. TSCPrinter.send_label_buffer) and then calls release_buffer().
+        """
+        self.bitmap_init()
+        self._draw_frontend_items(text_items, value_items, icon_items, barcode_items)
+        return self.buffer
+
+    @timed(render_label_seconds, source=current_render_source)
+    @profile_stage(STAGE_RENDER)
     def create_from_settings(self, settings_data: List[Dict[str, Any]]):
         """Create bitmap from settings data (similar to test.py message format)"""
         self.bitmap_init()
@@ -306,19 +484,66 @@ class BitmapGenerator:
                     item["data"]["x"], 
                     item["data"]["y"], 
                     item["data"].get("width_px", None),
-                    item["data"].get("height_px", None)
+                    item["data"].get("height_px", None),
+                    item["data"].get("dither", None),
+                    item["data"].get("threshold", None)
                 )
         
         self.bitmap_finish()
 
+    @profile_stage(STAGE_RENDER)
+    def render_regions(self, settings_data: Dict[str, Any], payloads: List[Dict[str, Any]] = None) -> List[tuple]:
+        """
+        Render one label per payload and return their packed regions for the printer
+
+        Each label is rendered into the same pooled buffer, packed, and the buffer is reused
+        for the next one, so a batch keeps a single raster alive.
+        """
+        regions = []
+        for payload in payloads or [None]:
+            data = apply_payload(settings_data, payload)
+            try:
+                label_buffer = self.render_frontend_data(
+                    data.get("textItems", []),
+                    data.get("valueItems", []),
+                    data.get("iconItems", []),
+                    data.get("barcodeItems", [])
+                )
+                regions.append(label_buffer.packed_region(self.renderConfig.crop_blank_margins))
+            finally:
+                # A label that fails to render must not keep its buffer out of the pool
+                self.release_buffer()
+        return regions
+
+    def render_static_region(self, settings_data: Dict[str, Any]) -> tuple:
+        """Packed region of a template's static layer, rendered once per layout and label geometry"""
+        cache_key = (self.width_mm, self.height_mm, self.dpi, json.dumps(settings_data, sort_keys=True))
+        region = static_layer_cache.get(cache_key)
+        if region is None:
+            region = self.render_regions(settings_data)[0]
+            static_layer_cache.put(cache_key, region)
+        return region
+
+    @timed(render_label_seconds, source=current_render_source)
+    @profile_stage(STAGE_RENDER)
     def create_from_frontend_data(self, text_items: List[Dict], value_items: List[Dict], icon_items: List[Dict], barcode_items: List[Dict]):
         """Create bitmap from frontend data format"""
         self.bitmap_init()
-        
-        # Process text items
-        for text_item in text_items:
-            if text_item.get("content"):
-                self.set_text(
+        self._draw_frontend_items(text_items, value_items, icon_items, barcode_items)
+        self.bitmap_finish()
+
+    def _draw_frontend_items(self, text_items: List[Dict], value_items: List[Dict], icon_items: List[Dict], barcode_items: List[Dict]):
+        """Draw frontend data items onto the current label"""
+        # Process text items, then value items (same as text items)
+        for text_item in [*text_items, *value_items]:
+            if not text_item.get("content"):
+                continue
+            if text_item.get("width"):
+                # Boxed text is wrapped and fitted, plain text is one line at its font size
+                self.set_text_box(text_item, text_item.get("x", 0), text_item.get("y", 0))
+            else:
+                # Nothing here needs the text's bbox, so it isn't measured
+                self._draw_text(
                     text_item["content"],
                     text_item.get("x", 0),
                     text_item.get("y", 0),
@@ -326,23 +551,19 @@ class BitmapGenerator:
                     text_item.get("fontFamily", "Arial")
                 )
         
-        # Process value items (same as text items)
-        for value_item in value_items:
-            if value_item.get("content"):
-                self.set_text(
-                    value_item["content"],
-                    value_item.get("x", 0),
-                    value_item.get("y", 0),
-                    value_item.get("fontSize", 12),
-                    value_item.get("fontFamily", "Arial")
-                )
-        
         # Process icon items
         for icon_item in icon_items:
-            if icon_item.get("iconFile"):
-                # For base64 data, we need to handle it differently
-                # For now, skip icon items as they need special handling
-                pass
+            icon_ref = icon_item.get("assetId") or icon_item.get("iconFile")
+            if icon_ref:
+                self.set_icon(
+                    icon_ref,
+                    icon_item.get("x", 0),
+                    icon_item.get("y", 0),
+                    icon_item.get("width", None),
+                    icon_item.get("height", None),
+                    icon_item.get("dither", None),
+                    icon_item.get("threshold", None)
+                )
         
         # Process barcode items
         for barcode_item in barcode_items:
@@ -355,6 +576,3 @@ class BitmapGenerator:
                     barcode_item.get("width", None),
                     barcode_item.get("height", None)
                 )
-        
-        self.bitmap_finish()
-
@@ -1,13 +1,104 @@
+import os
+
 
 class FrontendConfig:
     def __init__(self) -> None:
         self.build_path = "../frontend/build"
         self.port = 8088
         self.host = "127.0.0.1"
+        self.precompress = True          # gzip (and brotli when installed) the build at startup
+        self.compress_min_bytes = 1024   # smaller files aren't worth a Content-Encoding
+        self.gzip_level = 9
+        self.brotli_quality = 11
+        self.immutable_max_age = 31536000  # seconds, for content-hashed bundles
         
 class DatabaseConfig:
     def __init__(self) -> None:
         self.database_path = "database/database.db"
 
+class RenderConfig:
+    def __init__(self) -> None:
+        self.dither = "floyd-steinberg"  # floyd-steinberg, ordered or threshold
+        self.threshold = 128
+        self.image_cache_size = 256
+        self.font_cache_size = 64           # loaded fonts per (family, size)
+        self.barcode_cache_size = 256       # rendered barcode tiles, static barcodes render once
+        self.static_layer_cache_size = 32   # packed static layers of template jobs
+        self.glyph_metrics_cache_size = 256  # per-character advances per (font, size), used by text boxes
+        self.raster_backend = os.environ.get("HERA_RASTER_BACKEND", "auto")  # auto, numpy or pillow
+        self.composite = "replace"  # replace (tile overwrites) or or (black pixels combined)
+        self.crop_blank_margins = True  # only send the inked part of a label to the printer
+
+class PrinterConfig:
+    def __init__(self) -> None:
+        # Candidate raster encodings, the smallest is picked per label and raw is always the fallback.
+        # Add "zlib" only for firmware that accepts compressed BITMAP (mode 3).
+        self.raster_encodings = ["raw", "pcx"]
+        self.status_interval = 5  # seconds between background probes of every printer
+        self.status_timeout = 1   # connect timeout of one probe
+        self.connect_timeout = 5  # connect timeout of a print job connection (asyncio driver)
+        # "thread": blocking sockets, one thread per concurrent job; "asyncio": every printer on one event loop thread
+        self.driver = os.environ.get("HERA_PRINTER_DRIVER", "thread")
+
+class DiscoveryConfig:
+    def __init__(self) -> None:
+        self.cidr = os.environ.get("HERA_DISCOVERY_CIDR", "192.168.1.0/24")  # range scanned when none is given
+        self.max_hosts = 4096      # larger ranges are refused
+        self.concurrency = 256     # connects in flight at once
+        self.connect_timeout = 0.5
+        self.reply_timeout = 0.5   # wait for the status and model replies
+        self.max_reply_bytes = 64  # longest model reply read, the rest is ignored
+        self.deadline = 3          # seconds for the whole sweep
+
+class WarmUpConfig:
+    def __init__(self) -> None:
+        self.enabled = os.environ.get("HERA_WARMUP", "1") == "1"  # render layouts and connect printers at startup
+        self.connect_printers = True
+        self.probe_timeout = 1  # printers that don't answer within this are left for their first job
+
+class StartupConfig:
+    def __init__(self) -> None:
+        self.profile = os.environ.get("HERA_STARTUP_PROFILE", "0") == "1"  # log import and startup phase times
+        self.report_top = 15  # slowest imports listed in the report
 
-        
\ No newline at end of file
+class AdminConfig:
+    def __init__(self) -> None:
+        # Admin API (/api/admin/...) key, sent as X-Admin-Token or a Bearer token; unset, only loopback clients may use it
+        self.token = os.environ.get("HERA_ADMIN_TOKEN", "")
+
+class ProfilingConfig:
+    def __init__(self) -> None:
+        self.max_requests = 100        # requests one profiling session may capture
+        self.keep_sessions = 20        # finished sessions kept for download
+        self.armed_timeout = 600       # seconds a session waits for its requests before it expires
+        self.sample_interval_ms = 5    # default stack sampling interval
+        self.min_sample_interval_ms = 1
+        self.max_stack_depth = 64      # frames kept per sample
+        self.report_limit = 40         # functions listed in the text report
+
+class AdmissionConfig:
+    def __init__(self) -> None:
+        self.enabled = os.environ.get("HERA_ADMISSION", "1") == "1"  # rate limit and queue print jobs per printer
+        self.labels_per_second = float(os.environ.get("HERA_PRINTER_RATE", "5"))  # default printer speed
+        # Per printer speeds, "192.168.1.50=4,192.168.1.51=8"; printers that slow a long send down are measured
+        self.printer_rates = {ip.strip(): float(rate) for ip, rate in
+                              (item.split("=", 1) for item in os.environ.get("HERA_PRINTER_RATES", "").split(",")
+                               if "=" in item)}
+        self.burst_labels = 30         # labels a printer may be sent ahead of what it has printed
+        self.max_wait = {"urgent": 120, "bulk": 60}  # seconds a job may wait for its printer before 429
+        self.max_queued_jobs = 50      # jobs waiting per printer
+        self.measure_min_seconds = 1.0  # sends shorter than this don't measure the printer's speed
+        self.measure_smoothing = 0.3   # weight of the newest speed measurement
+
+class IdempotencyConfig:
+    def __init__(self) -> None:
+        self.ttl_seconds = 86400        # how long a repeated Idempotency-Key returns the original result
+        self.max_memory_keys = 10000    # recent keys looked up without the database
+        self.in_flight_wait = 30        # seconds a repeat waits for the original request to finish before 409
+        self.max_key_length = 255
+        self.purge_interval = 300       # seconds between removals of expired keys
+
+class LogConfig:
+    def __init__(self) -> None:
+        self.level = os.environ.get("HERA_LOG_LEVEL", "info")  # debug, info, warning, error
+        self.werkzeug_level = "warning"
@@ -0,0 +1,152 @@
+from backend.databaseModule.databaseModule import DatabaseModule
+from typing import Dict, Any, List, Optional, Tuple
+from backend.configModule import DatabaseConfig
+import base64
+import hashlib
+import re
+
+DATA_URL_PATTERN = re.compile(r"^data:(?P<mime>[\w/+.-]+)?(;[\w=-]+)*;base64,(?P<data>.*)$", re.DOTALL)
+ASSET_URL_PREFIX = "/api/assets/"
+SCHEMA_VERSION = 1
+INSERT_ASSET = "INSERT OR IGNORE INTO assets (id, mime, size, data) VALUES (?, ?, ?, ?)"
+
+def parse_data_url(data_url: str) -> Optional[Tuple[str, bytes]]:
+    """Split a base64 data URL into (mime type, raw bytes), or None if it isn't one"""
+    match = DATA_URL_PATTERN.match(data_url or "")
+    if not match:
+        return None
+    try:
+        raw = base64.b64decode(match.group("data"), validate=False)
+    except (ValueError, TypeError):
+        return None
+    return match.group("mime") or "application/octet-stream", raw
+
+def to_data_url(mime: str, data: bytes) -> str:
+    """Inline base64 data URL for raw bytes (inverse of parse_data_url)"""
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+def asset_id_for(data: bytes) -> str:
+    """Content hash used as the asset id"""
+    return hashlib.sha256(data).hexdigest()
+
+def asset_id_from_reference(reference: str) -> Optional[str]:
+    """Extract the asset id from an `/api/assets/<id>` url or a bare id"""
+    if not reference:
+        return None
+    if reference.startswith(ASSET_URL_PREFIX):
+        return reference[len(ASSET_URL_PREFIX):]
+    if re.fullmatch(r"[0-9a-f]{64}", reference):
+        return reference
+    return None
+
+def externalize_icon_items(icon_items: list, save_data_url) -> list:
+    """Replace inline base64 icons with asset references, save_data_url(data_url) stores one and returns its id"""
+    result = []
+    for icon_item in icon_items:
+        icon_item = dict(icon_item)
+        icon_file = icon_item.get("iconFile") or ""
+        if icon_file.startswith("data:"):
+            asset_id = save_data_url(icon_file)
+            if asset_id:
+                icon_item["assetId"] = asset_id
+                icon_item["iconFile"] = f"{ASSET_URL_PREFIX}{asset_id}"
+        elif not icon_item.get("assetId"):
+            asset_id = asset_id_from_reference(icon_file)
+            if asset_id:
+                icon_item["assetId"] = asset_id
+        result.append(icon_item)
+    return result
+
+class Assets(DatabaseModule):
+    """Content-addressed binary store for layout assets (icons, logos)"""
+
+    def __init__(self):
+        self.databaseConfig = DatabaseConfig()
+        super().__init__(self.databaseConfig.database_path)
+
+        self.ensure_schema("assets", SCHEMA_VERSION, self.create_assets_table)
+
+    def create_assets_table(self):
+        """Create assets table"""
+        assets_columns = {
+            "id": "TEXT PRIMARY KEY",  # sha256 of data
+            "mime": "TEXT NOT NULL",
+            "size": "INTEGER NOT NULL",
+            "data": "BLOB NOT NULL",
+            "created_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+        }
+        return self.create_table("assets", assets_columns)
+
+    def save_asset(self, data: bytes, mime: str = "application/octet-stream") -> Optional[str]:
+        """Store binary data once and return its content hash id"""
+        asset_id = asset_id_for(data)
+        if self.execute_update(INSERT_ASSET, (asset_id, mime, len(data), data)):
+            return asset_id
+        return None
+
+    def save_data_urls(self, data_urls: List[str]) -> Optional[List[str]]:
+        """Store several base64 data URLs in one transaction and return their ids"""
+        rows = []
+        for data_url in data_urls:
+            parsed = parse_data_url(data_url)
+            if not parsed:
+                return None
+            mime, raw = parsed
+            rows.append((asset_id_for(raw), mime, len(raw), raw))
+        if not self.execute_batch([(INSERT_ASSET, rows)]):
+            return None
+        return [row[0] for row in rows]
+
+    def save_data_url(self, data_url: str) -> Optional[str]:
+        """Store a base64 data URL as an asset and return its id"""
+        parsed = parse_data_url(data_url)
+        if not parsed:
+            return None
+        mime, raw = parsed
+        return self.save_asset(raw, mime)
+
+    def get_asset(self, asset_id: str) -> Optional[Dict[str, Any]]:
+        """Get asset row (id, mime, size, data) by id"""
+        result = self.execute_query("SELECT * FROM assets WHERE id = ?", (asset_id,))
+        return result[0] if result else None
+
+    def get_asset_data(self, asset_id: str) -> Optional[bytes]:
+        """Get raw asset bytes by id"""
+        asset = self.get_asset(asset_id)
+        return asset["data"] if asset else None
+
+    def externalize_icon_items(self, icon_items: list) -> list:
+        """Move inline base64 icons into the asset store and reference them by id"""
+        return externalize_icon_items(icon_items, self.save_data_url)
+
+class StagedAssets:
+    """
+    Assets held in memory until the records using them are written
+
+    Reads fall back to the store, so layouts can be compiled against staged icons;
+    rows() gives the INSERT_ASSET parameters to commit in the same transaction.
+    """
+
+    def __init__(self, store: Assets):
+        self.store = store
+        self.staged: Dict[str, Tuple[str, str, int, bytes]] = {}
+
+    def save_data_url(self, data_url: str) -> Optional[str]:
+        parsed = parse_data_url(data_url)
+        if not parsed:
+            return None
+        mime, raw = parsed
+        asset_id = asset_id_for(raw)
+        self.staged.setdefault(asset_id, (asset_id, mime, len(raw), raw))
+        return asset_id
+
+    def get_asset_data(self, asset_id: str) -> Optional[bytes]:
+        row = self.staged.get(asset_id)
+        return row[3] if row else self.store.get_asset_data(asset_id)
+
+    def externalize_icon_items(self, icon_items: list) -> list:
+        return externalize_icon_items(icon_items, self.save_data_url)
+
+    def rows(self, asset_ids) -> List[Tuple[str, str, int, bytes]]:
+        """Staged assets among asset_ids, ids already in the store are left out"""
+        return [self.staged[asset_id] for asset_id in dict.fromkeys(asset_ids) if asset_id in self.staged]
@@ -1,11 +1,19 @@
 import sqlite3
 import os
-from typing import List, Dict, Any
+import logging
+from threading import RLock
+from backend.metricsModule import db_query_seconds
+from backend.requestProfiler import stage_span, STAGE_DB
+from typing import List, Dict, Any, Tuple, Union
+
+logger = logging.getLogger(__name__)
 
 class DatabaseModule:
     def __init__(self, database_path: str) -> None:
         self.database_path = database_path
         self.connection = None
+        # One connection is shared by all request threads, statements are serialized
+        self.lock = RLock()
         self._create_database()
         self.connect()
     
@@ -17,7 +25,7 @@ class DatabaseModule:
             os.makedirs(os.path.dirname(self.database_path), exist_ok=True)
             return True
         except Exception as e:
-            print(f"create_database {e}")
+            logger.error("create_database %s", e)
             return False
             
     def connect(self):
@@ -30,40 +38,85 @@ class DatabaseModule:
                 check_same_thread=False
             )
             self.connection.row_factory = sqlite3.Row  # This enables column access by name
-            print(f"Connected to database: {self.database_path}")
+            logger.info("Connected to database: %s", self.database_path)
         except sqlite3.Error as e:
-            print(f"Database connection error: {e}")
+            logger.error("Database connection error: %s", e)
             
     def disconnect(self):
         """Disconnect from SQLite database"""
         if self.connection:
             self.connection.close()
-            print("Disconnected from database")
+            logger.info("Disconnected from database")
         else:
-            print("No active database connection to close")
+            logger.debug("No active database connection to close")
             
     def execute_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Execute SELECT query and return results as list of dictionaries"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+            with self.lock, db_query_seconds.time(operation="select"), stage_span(STAGE_DB):
+                cursor = self.connection.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
             return [dict(row) for row in rows]
         except sqlite3.Error as e:
-            print(f"Query execution error: {e}")
+            logger.error("Query execution error: %s", e)
             return []
         
 
     def execute_update(self, query: str, params: tuple = ()) -> bool:
         """Execute INSERT, UPDATE, or DELETE query and return success status"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(query, params)
-            self.connection.commit()
+            with self.lock, db_query_seconds.time(operation="update"), stage_span(STAGE_DB):
+                cursor = self.connection.cursor()
+                cursor.execute(query, params)
+                self.connection.commit()
             return True
         except sqlite3.Error as e:
-            print(f"Query execution error: {e}")
+            logger.error("Query execution error: %s", e)
+            return False
+
+    def execute_batch(self, statements: List[Tuple[str, Union[tuple, List[tuple]]]]) -> bool:
+        """
+        Execute several statements in one transaction (a single commit for the whole batch)
+        statements: list of (query, params); a list of param tuples runs the query with executemany
+        Nothing is written when any statement fails
+        """
+        try:
+            with self.lock, db_query_seconds.time(operation="batch"), stage_span(STAGE_DB):
+                with self.connection:
+                    cursor = self.connection.cursor()
+                    for query, params in statements:
+                        if isinstance(params, list):
+                            cursor.executemany(query, params)
+                        else:
+                            cursor.execute(query, params)
+            return True
+        except sqlite3.Error as e:
+            logger.error("Batch execution error: %s", e)
+            return False
+
+    def ensure_schema(self, module: str, version: int, *creators) -> bool:
+        """
+        Run the table creators of a module unless the database already records this schema version
+        A current database costs one SELECT at startup instead of a CREATE and a commit per table
+        Bump the module's version whenever its creators change
+        """
+        try:
+            with self.lock:
+                row = self.connection.execute(
+                    "SELECT version FROM schema_versions WHERE module = ?", (module,)).fetchone()
+            if row is not None and row["version"] >= version:
+                return True
+        except sqlite3.OperationalError:
+            pass  # new database, schema_versions doesn't exist yet
+        if not all(creator() for creator in creators):
             return False
+        logger.info("Schema of %s is at version %d", module, version)
+        return self.execute_batch([
+            ("CREATE TABLE IF NOT EXISTS schema_versions (module TEXT PRIMARY KEY, version INTEGER NOT NULL)", ()),
+            ("INSERT INTO schema_versions (module, version) VALUES (?, ?) "
+             "ON CONFLICT(module) DO UPDATE SET version = excluded.version", (module, version))
+        ])
 
     def create_table(self, table_name: str, columns: dict) -> bool:
         """
@@ -79,5 +132,5 @@ class DatabaseModule:
             query = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(column_definitions)})"
             return self.execute_update(query)
         except Exception as e:
-            print(f"Table creation error: {e}")
+            logger.error("Table creation error: %s", e)
             return False
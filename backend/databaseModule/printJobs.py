@@ -0,0 +1,133 @@
+from backend.databaseModule.databaseModule import DatabaseModule
+from typing import List, Dict, Any, Optional, Tuple
+from backend.configModule import DatabaseConfig
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+
+JOB_STARTED = "started"
+JOB_FINISHED = "finished"
+JOB_FAILED = "failed"
+JOB_INTERRUPTED = "interrupted"  # the process stopped while the job was running
+
+SLICE_SENDING = "sending"  # recorded before the bytes go out, "in doubt" after a crash
+SLICE_SENT = "sent"
+SLICE_FAILED = "failed"
+
+class PrintJobs(DatabaseModule):
+    """Journal of print jobs, the label slices sent for them and the serials issued"""
+
+    def __init__(self):
+        self.databaseConfig = DatabaseConfig()
+        super().__init__(self.databaseConfig.database_path)
+
+        # WAL lets journal commits append without blocking readers; NORMAL sync
+        # survives a process crash, which is what the journal protects against
+        self.execute_query("PRAGMA journal_mode=WAL")
+        self.execute_update("PRAGMA synchronous=NORMAL")
+
+        self.ensure_schema(
+            "print_jobs", SCHEMA_VERSION,
+            self.create_print_jobs_table, self.create_print_job_slices_table, self.create_serial_counters_table,
+            self.create_idempotency_keys_table)
+
+    def create_print_jobs_table(self):
+        """Create print jobs table"""
+        print_jobs_columns = {
+            "id": "TEXT PRIMARY KEY",
+            "target": "TEXT NOT NULL",       # printer ip or group name
+            "target_kind": "TEXT NOT NULL",  # printer or group
+            "type": "TEXT NOT NULL",
+            "settings_name": "TEXT",
+            "request": "TEXT NOT NULL",      # JSON body, used to resume the job
+            "state": "TEXT NOT NULL",
+            "labels_total": "INTEGER NOT NULL",
+            "labels_done": "INTEGER NOT NULL DEFAULT 0",
+            "created_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+            "updated_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+        }
+        return self.create_table("print_jobs", print_jobs_columns)
+
+    def create_print_job_slices_table(self):
+        """Create print job slices table"""
+        print_job_slices_columns = {
+            "job_id": "TEXT NOT NULL",
+            "printer_ip": "TEXT NOT NULL",
+            "slice_offset": "INTEGER NOT NULL",
+            "labels": "INTEGER NOT NULL",
+            "state": "TEXT NOT NULL",
+            "updated_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+            "PRIMARY KEY": "(job_id, printer_ip, slice_offset)"
+        }
+        return self.create_table("print_job_slices", print_job_slices_columns)
+
+    def create_serial_counters_table(self):
+        """Create serial counters table (highest serial issued per layout field)"""
+        serial_counters_columns = {
+            "scope": "TEXT PRIMARY KEY",  # <layout name>/<field key>
+            "last_value": "TEXT NOT NULL",
+            "updated_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+        }
+        return self.create_table("serial_counters", serial_counters_columns)
+
+    def create_idempotency_keys_table(self):
+        """Create idempotency keys table (Idempotency-Key of a print request and its job's response)"""
+        idempotency_keys_columns = {
+            "key": "TEXT PRIMARY KEY",          # <endpoint> <Idempotency-Key header>
+            "fingerprint": "TEXT NOT NULL",     # hash of the request body
+            "job_id": "TEXT NOT NULL",
+            "status": "INTEGER",                # NULL while the job runs, or when the process stopped during it
+            "response": "TEXT",
+            "expires_at": "REAL NOT NULL",      # unix time
+            "created_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+        }
+        return self.create_table("idempotency_keys", idempotency_keys_columns)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job with its slices"""
+        result = self.execute_query("SELECT * FROM print_jobs WHERE id = ?", (job_id,))
+        if not result:
+            return None
+        job = result[0]
+        job["slices"] = self.execute_query(
+            "SELECT printer_ip, slice_offset, labels, state, updated_at FROM print_job_slices WHERE job_id = ? ORDER BY slice_offset",
+            (job_id,))
+        return job
+
+    def get_jobs(self, state: str = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent jobs, optionally only those in one state"""
+        if state:
+            return self.execute_query(
+                "SELECT * FROM print_jobs WHERE state = ? ORDER BY created_at DESC LIMIT ?", (state, limit))
+        return self.execute_query("SELECT * FROM print_jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+
+    def get_last_requests(self, job_type: str) -> Dict[Tuple[str, str], str]:
+        """Request JSON of the most recent job of a type per (target, layout name)"""
+        # SQLite takes the bare columns from the row holding MAX(created_at)
+        rows = self.execute_query(
+            "SELECT target, settings_name, request, MAX(created_at) FROM print_jobs "
+            "WHERE type = ? AND settings_name IS NOT NULL GROUP BY target, settings_name", (job_type,))
+        return {(row["target"], row["settings_name"]): row["request"] for row in rows}
+
+    def get_serial_counters(self, scopes: List[str]) -> Dict[str, str]:
+        """Highest issued value per scope"""
+        if not scopes:
+            return {}
+        placeholders = ",".join("?" * len(scopes))
+        rows = self.execute_query(f"SELECT scope, last_value FROM serial_counters WHERE scope IN ({placeholders})", tuple(scopes))
+        return {row["scope"]: row["last_value"] for row in rows}
+
+    def get_idempotency_key(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored request key, None if it was never used"""
+        result = self.execute_query("SELECT * FROM idempotency_keys WHERE key = ?", (key,))
+        return result[0] if result else None
+
+    def mark_interrupted(self) -> List[str]:
+        """Flag every job still marked running as interrupted and return their ids"""
+        rows = self.execute_query("SELECT id FROM print_jobs WHERE state = ?", (JOB_STARTED,))
+        if rows:
+            self.execute_update(
+                "UPDATE print_jobs SET state = ?, updated_at = CURRENT_TIMESTAMP WHERE state = ?", (JOB_INTERRUPTED, JOB_STARTED))
+        return [row["id"] for row in rows]
@@ -0,0 +1,81 @@
+from backend.databaseModule.databaseModule import DatabaseModule
+from typing import List, Dict, Any
+from backend.configModule import DatabaseConfig
+
+SCHEMA_VERSION = 1
+
+class PrinterGroups(DatabaseModule):
+    """Named sets of printers that print one job together"""
+
+    def __init__(self):
+        self.databaseConfig = DatabaseConfig()
+        super().__init__(self.databaseConfig.database_path)
+
+        self.ensure_schema(
+            "printer_groups", SCHEMA_VERSION, self.create_printer_groups_table, self.create_printer_group_members_table)
+
+    def create_printer_groups_table(self):
+        """Create printer groups table"""
+        printer_groups_columns = {
+            "id": "INTEGER PRIMARY KEY AUTOINCREMENT",
+            "name": "TEXT NOT NULL UNIQUE",
+            "created_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+        }
+        return self.create_table("printer_groups", printer_groups_columns)
+
+    def create_printer_group_members_table(self):
+        """Create printer group members table"""
+        printer_group_members_columns = {
+            "group_id": "INTEGER NOT NULL",
+            "printer_ip": "TEXT NOT NULL",
+            "position": "INTEGER NOT NULL DEFAULT 0",
+            "PRIMARY KEY": "(group_id, printer_ip)"
+        }
+        return self.create_table("printer_group_members", printer_group_members_columns)
+
+    def get_all_groups(self) -> List[Dict[str, Any]]:
+        """Get all groups with their member IPs"""
+        groups = self.execute_query("SELECT * FROM printer_groups ORDER BY name")
+        for group in groups:
+            group["members"] = self.get_group_members(group["id"])
+        return groups
+
+    def get_group(self, name: str) -> Dict[str, Any]:
+        """Get a group with its member IPs by name, None if it doesn't exist"""
+        result = self.execute_query("SELECT * FROM printer_groups WHERE name = ?", (name,))
+        if not result:
+            return None
+        group = result[0]
+        group["members"] = self.get_group_members(group["id"])
+        return group
+
+    def get_group_members(self, group_id: int) -> List[str]:
+        """Member printer IPs of a group in configured order"""
+        rows = self.execute_query(
+            "SELECT printer_ip FROM printer_group_members WHERE group_id = ? ORDER BY position", (group_id,))
+        return [row["printer_ip"] for row in rows]
+
+    def save_group(self, name: str, members: List[str]) -> bool:
+        """Create a group or replace the members of an existing one, in one transaction"""
+        group_id = "(SELECT id FROM printer_groups WHERE name = ?)"
+        return self.execute_batch([
+            ("INSERT OR IGNORE INTO printer_groups (name) VALUES (?)", (name,)),
+            (f"DELETE FROM printer_group_members WHERE group_id = {group_id}", (name,)),
+            (f"INSERT OR IGNORE INTO printer_group_members (group_id, printer_ip, position) VALUES ({group_id}, ?, ?)",
+             [(name, ip, position) for position, ip in enumerate(members)])
+        ])
+
+    def delete_group(self, name: str) -> bool:
+        """Delete a group and its memberships"""
+        group = self.execute_query("SELECT id FROM printer_groups WHERE name = ?", (name,))
+        if not group:
+            return False
+        group_id = group[0]["id"]
+        return self.execute_batch([
+            ("DELETE FROM printer_group_members WHERE group_id = ?", (group_id,)),
+            ("DELETE FROM printer_groups WHERE id = ?", (group_id,))
+        ])
+
+    def remove_printer(self, printer_ip: str) -> bool:
+        """Drop a printer from every group (when the printer is deleted)"""
+        return self.execute_update("DELETE FROM printer_group_members WHERE printer_ip = ?", (printer_ip,))
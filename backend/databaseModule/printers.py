@@ -1,14 +1,19 @@
 from backend.databaseModule.databaseModule import DatabaseModule
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from backend.configModule import DatabaseConfig
+from backend.databaseModule.assets import INSERT_ASSET
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
 
 class Printers(DatabaseModule):
     def __init__(self):
         self.databaseConfig = DatabaseConfig()
         super().__init__(self.databaseConfig.database_path)
-        
-        self.create_printers_table()
-        self.create_bitmap_settings_table()
+
+        self.ensure_schema("printers", SCHEMA_VERSION, self.create_printers_table, self.create_bitmap_settings_table)
         
     
     def create_printers_table(self):
@@ -72,41 +77,68 @@ class Printers(DatabaseModule):
         result = self.execute_query("SELECT COUNT(*) as count FROM printers")
         return result[0]["count"] if result else 0
 
+    def import_printers(self, printers: List[Dict[str, Any]], layouts: List[Tuple[str, str, str]] = (),
+                        assets: List[Tuple[str, str, int, bytes]] = ()) -> Optional[Dict[str, int]]:
+        """
+        Add printers (or update them when the IP exists) and save their layouts and assets in one transaction
+        layouts: (printer ip, layout name, settings JSON); assets: INSERT_ASSET rows the layouts reference
+        Returns counts of inserted / updated printers and saved layouts, None when nothing was written
+        """
+        with self.lock:
+            existing = {row["ip"] for row in self.execute_query("SELECT DISTINCT ip FROM printers")}
+            existing_layouts = {
+                (row["printer_ip"], row["name"])
+                for row in self.execute_query("SELECT printer_ip, name FROM bitmap_settings")
+            }
+            new_printers = [
+                (printer["ip"], printer["name"], printer["dpi"], printer["width"], printer["height"])
+                for printer in printers if printer["ip"] not in existing
+            ]
+            updated_printers = [
+                (printer["name"], printer["dpi"], printer["width"], printer["height"], printer["ip"])
+                for printer in printers if printer["ip"] in existing
+            ]
+            new_layouts = [layout for layout in layouts if layout[:2] not in existing_layouts]
+            updated_layouts = [(data, ip, name) for ip, name, data in layouts if (ip, name) in existing_layouts]
+            if not self.execute_batch([
+                (INSERT_ASSET, list(assets)),
+                ("INSERT INTO printers (ip, name, dpi, width, height) VALUES (?, ?, ?, ?, ?)", new_printers),
+                ("UPDATE printers SET name = ?, dpi = ?, width = ?, height = ? WHERE ip = ?", updated_printers),
+                ("INSERT INTO bitmap_settings (printer_ip, name, settings_data) VALUES (?, ?, ?)", new_layouts),
+                ("UPDATE bitmap_settings SET settings_data = ?, updated_at = CURRENT_TIMESTAMP WHERE printer_ip = ? AND name = ?",
+                 updated_layouts)
+            ]):
+                return None
+        return {"inserted": len(new_printers), "updated": len(updated_printers), "layouts": len(layouts)}
+
     # Bitmap Settings Methods
     def save_bitmap_settings(self, printer_ip: str, name: str, settings_data: str) -> bool:
         """Save bitmap settings for a printer"""
-        print(f"Database: Saving bitmap settings for {printer_ip} with name: {name}")
-        print(f"Database: Settings data length: {len(settings_data)}")
+        logger.debug("Database: Saving bitmap settings for %s with name: %s (%d bytes)", printer_ip, name, len(settings_data))
         
         # Check if settings already exist for this printer and name
         existing = self.get_bitmap_settings(printer_ip, name)
-        print(f"Database: Existing settings found: {len(existing) if existing else 0}")
         
         if existing:
             # Update existing settings
             query = "UPDATE bitmap_settings SET settings_data = ?, updated_at = CURRENT_TIMESTAMP WHERE printer_ip = ? AND name = ?"
             result = self.execute_update(query, (settings_data, printer_ip, name))
-            print(f"Database: Update result: {result}")
             return result
         else:
             # Insert new settings
             query = "INSERT INTO bitmap_settings (printer_ip, name, settings_data) VALUES (?, ?, ?)"
             result = self.execute_update(query, (printer_ip, name, settings_data))
-            print(f"Database: Insert result: {result}")
             return result
 
     def get_bitmap_settings(self, printer_ip: str, name: str = None) -> List[Dict[str, Any]]:
         """Get bitmap settings for a printer"""
-        print(f"Database: Getting bitmap settings for {printer_ip} with name: {name}")
-        
         if name:
             query = "SELECT * FROM bitmap_settings WHERE printer_ip = ? AND name = ?"
             result = self.execute_query(query, (printer_ip, name))
         else:
             query = "SELECT * FROM bitmap_settings WHERE printer_ip = ?"
             result = self.execute_query(query, (printer_ip,))
-        
-        print(f"Database: Query result: {result}")
+
         return result
 
     def get_all_bitmap_settings(self) -> List[Dict[str, Any]]:
@@ -0,0 +1,63 @@
+from PIL import Image, ImageChops
+
+DITHER_FLOYD_STEINBERG = "floyd-steinberg"
+DITHER_ORDERED = "ordered"
+DITHER_THRESHOLD = "threshold"
+DITHER_MODES = (DITHER_FLOYD_STEINBERG, DITHER_ORDERED, DITHER_THRESHOLD)
+
+# 4x4 Bayer matrix, values 0..15
+BAYER_4X4 = (
+    (0, 8, 2, 10),
+    (12, 4, 14, 6),
+    (3, 11, 1, 9),
+    (15, 7, 13, 5),
+)
+
+_bayer_tile = None
+
+def _get_bayer_tile() -> Image.Image:
+    """4x4 grayscale threshold tile scaled to 0..255"""
+    global _bayer_tile
+    if _bayer_tile is None:
+        tile = Image.new("L", (4, 4))
+        tile.putdata([int((value + 0.5) * 256 / 16) for row in BAYER_4X4 for value in row])
+        _bayer_tile = tile
+    return _bayer_tile
+
+def _threshold_map(size: tuple) -> Image.Image:
+    """Threshold image of the given size tiled from the Bayer matrix"""
+    width, height = size
+    thresholds = _get_bayer_tile()
+    # Double the tiled area each step instead of pasting every 4x4 tile
+    while thresholds.width < width or thresholds.height < height:
+        grow_x = 2 if thresholds.width < width else 1
+        grow_y = 2 if thresholds.height < height else 1
+        grown = Image.new("L", (thresholds.width * grow_x, thresholds.height * grow_y))
+        for ty in range(grow_y):
+            for tx in range(grow_x):
+                grown.paste(thresholds, (tx * thresholds.width, ty * thresholds.height))
+        thresholds = grown
+    return thresholds.crop((0, 0, width, height))
+
+def dither_to_1bit(img: Image.Image, mode: str = DITHER_FLOYD_STEINBERG, threshold: int = 128) -> Image.Image:
+    """
+    Convert a grayscale image to 1-bit using the selected method
+
+    Args:
+        img: Image already resampled to its final size
+        mode: 'floyd-steinberg', 'ordered' (Bayer 4x4) or 'threshold'
+        threshold: Cut-off for 'threshold' mode (0-255, pixels >= threshold are white)
+    """
+    if img.mode != "L":
+        img = img.convert("L")
+
+    if mode == DITHER_FLOYD_STEINBERG:
+        return img.convert("1")
+    if mode == DITHER_ORDERED:
+        # Pixel is white where it is brighter than the local Bayer threshold
+        above = ImageChops.subtract(img, _threshold_map(img.size))
+        return above.point(lambda value: 255 if value > 0 else 0).convert("1", dither=Image.Dither.NONE)
+    if mode == DITHER_THRESHOLD:
+        return img.point(lambda value: 255 if value >= threshold else 0).convert("1", dither=Image.Dither.NONE)
+
+    raise ValueError(f"Unsupported dither mode: {mode}")
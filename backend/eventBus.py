@@ -0,0 +1,127 @@
+import itertools
+import json
+import logging
+import queue
+import uuid
+from collections import deque
+from threading import Lock
+from typing import Any, Dict, List, Optional
+from backend.metricsModule import metrics
+
+logger = logging.getLogger(__name__)
+
+EVENT_PRINTER_STATUS = "printer_status"  # printer went online / offline
+EVENT_JOB = "job"                        # print job state and progress
+
+class Event:
+    """One published event, numbered so SSE clients can resume with Last-Event-ID"""
+
+    def __init__(self, epoch: str, event_id: int, event_type: str, data: Dict[str, Any]):
+        self.epoch = epoch
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+    def to_sse(self) -> str:
+        return f"id: {self.epoch}-{self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+class Subscription:
+    """Bounded per-client queue; a client that stops reading loses its oldest events"""
+
+    def __init__(self, bus: "EventBus", max_queued: int):
+        self.bus = bus
+        self.queue: "queue.Queue[Event]" = queue.Queue(max_queued)
+        self.dropped = 0
+        self.resumed = False  # pre-filled with every event the client missed, no snapshot needed
+
+    def put(self, event: Event):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float = None) -> Optional[Event]:
+        """Next event, None when nothing arrived within timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+class EventBus:
+    """
+    In-process publish/subscribe hub feeding the /api/events stream
+
+    Event ids are "<epoch>-<number>"; the epoch changes with every process, so an id from
+    before a restart is recognised as foreign instead of matching a new event's number.
+    """
+
+    def __init__(self, history: int = 256, max_queued: int = 1024):
+        self.max_queued = max_queued
+        self.epoch = uuid.uuid4().hex[:8]
+        self._history: deque = deque(maxlen=history)
+        self._subscribers: List[Subscription] = []
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._lock = Lock()
+
+    def publish(self, event_type: str, **data) -> Event:
+        with self._lock:
+            self._last_id = next(self._ids)
+            event = Event(self.epoch, self._last_id, event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+        return event
+
+    def _parse_id(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Number of an event id of this process, None for a missing, malformed or foreign one"""
+        epoch, _, number = (last_event_id or "").strip().rpartition("-")
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        return int(number)
+
+    def subscribe(self, last_event_id: str = None) -> Subscription:
+        """
+        New subscription, pre-filled with the events after last_event_id
+
+        subscription.resumed is False when the history can't cover the id (a new client, an id
+        from an earlier process or events that already left the history); the client then
+        needs the current state instead.
+        """
+        subscription = Subscription(self, self.max_queued)
+        number = self._parse_id(last_event_id)
+        with self._lock:
+            oldest = self._history[0].id if self._history else self._last_id + 1
+            if number is not None and oldest - 1 <= number <= self._last_id:
+                for event in self._history:
+                    if event.id > number:
+                        subscription.put(event)
+                subscription.resumed = True
+            self._subscribers.append(subscription)
+        logger.debug("Event subscriber added (%d total)", len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+# Global event bus
+event_bus = EventBus()
+
+metrics.gauge("hera_event_subscribers", "Open /api/events streams", lambda: event_bus.subscriber_count)
@@ -1,56 +1,216 @@
-from flask import Flask, Response, render_template, request, jsonify, session, send_file
+from flask import Flask, Response, request, jsonify, session, send_file, g, stream_with_context
 from flask_cors import CORS
+from functools import wraps
 from threading import Thread
 import os
+import hmac
 import json
+import logging
+import time
+import uuid
 from backend.tscPrinterModule import printer_manager
-from backend.bitmapGenerator import BitmapGenerator
+from backend.printDispatcher import print_dispatcher
+from backend.tsplCommands import PrinterUnreachable
+from backend.statusMonitor import printer_status_monitor
+from backend.eventBus import event_bus, EVENT_JOB, EVENT_PRINTER_STATUS
+from backend.tsplTemplate import (
+    TemplateError, split_template, compile_template, template_filename, offset_variables, counter_value,
+    template_counters, with_counter_starts
+)
+from backend.jobJournal import SerialConflict
+from backend.databaseModule.printJobs import JOB_FAILED, JOB_INTERRUPTED
+from backend.databaseModule.assets import parse_data_url, to_data_url, ASSET_URL_PREFIX, StagedAssets
+from backend.printerDiscovery import DiscoveryError, discover_printers
+from backend.configModule import AdminConfig, DiscoveryConfig
+from backend.printerImport import (
+    PrinterImportError, PRINTER_FIELDS, printers_to_csv, parse_printers_csv, layout_asset_ids, validate_printers
+)
+from backend.metricsModule import metrics, http_request_seconds
+from backend.startupProfile import startup_profile
+from backend.requestProfiler import request_profiler, MODE_CPROFILE, MODE_SAMPLE
+from backend.admissionControl import admission_control, AdmissionRejected, LANES, LANE_BULK
+from backend.idempotencyKeys import (
+    IdempotencyError, IDEMPOTENCY_HEADER, REPLAYED_HEADER, idempotent_replays_total, request_fingerprint
+)
+from backend.warmUp import warm_up
+from backend.staticAssets import StaticAssets, INDEX_FILE
+
+logger = logging.getLogger(__name__)
+
+class JobRequestError(Exception):
+    """Print request that cannot be turned into a job, reported with an HTTP status"""
+
+    def __init__(self, message: str, status: int, **fields):
+        super().__init__(message)
+        self.status = status
+        self.fields = fields
 
 class FlaskModule:
-    def __init__(self, application) -> None:
+    def __init__(self, application, start_server: bool = True) -> None:
         self.application = application
         # Mutlak path kullan
         current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         build_path = os.path.join(current_dir, "frontend", "build")
         
-        self.app = Flask(__name__, 
-                        static_url_path='',
-                        static_folder=build_path,
-                        template_folder=build_path)
+        # The build is served from memory by the catch-all route, not by Flask's static view
+        self.app = Flask(__name__, static_folder=None)
+        self.static_assets = StaticAssets(build_path).start()
         
         # CORS'u etkinleştir
         CORS(self.app)
         
         self.setup_routes()
-        Thread(target=self.run, daemon=True).start()
+        if start_server:
+            Thread(target=self.run, daemon=True).start()
         
     def setup_routes(self):
+        @self.app.before_request
+        def start_request_timer():
+            g.request_start = time.perf_counter()
+            g.profile = request_profiler.start_request(
+                request.method, request.url_rule.rule if request.url_rule else None, request.path, request.view_args)
+
+        @self.app.after_request
+        def record_request_metrics(response):
+            start = g.get("request_start")
+            if start is not None:
+                # Use the rule template so label cardinality stays bounded
+                route = request.url_rule.rule if request.url_rule else "unmatched"
+                http_request_seconds.observe(
+                    time.perf_counter() - start,
+                    method=request.method,
+                    route=route,
+                    status=response.status_code
+                )
+            startup_profile.first_request()
+            g.response_status = response.status_code
+            return response
+
+        @self.app.teardown_request
+        def finish_request_profile(exception):
+            request_profiler.finish_request(g.pop("profile", None), g.get("response_status", 500 if exception else None))
+
         @self.app.route("/")
         def main():
-            return render_template("index.html")
+            return self.index()
 
         @self.app.route("/bitmap-settings")
         def bitmap_settings():
-            return render_template("index.html")
+            return self.index()
 
         @self.app.route("/printer-settings")
         def printer_settings():
-            return render_template("index.html")
+            return self.index()
         
         
         @self.app.route("/api/health")
         def health():
-            return jsonify({"status": "healthy", "message": "API is running"})
+            return jsonify({"status": "healthy", "message": "API is running", "warmup": warm_up.progress()})
+        
+        @self.app.route("/api/metrics")
+        def get_metrics():
+            return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+        
+        @self.app.route("/api/admission")
+        def get_admission():
+            """Each printer's rate, tokens and queued jobs per priority lane"""
+            return jsonify({"enabled": admission_control.config.enabled, "printers": admission_control.snapshot()})
+        
+        @self.app.route("/api/admin/profile", methods=['POST'])
+        def arm_profile():
+            """Profile the next requests of a route: {"route", "requests", "mode": "cprofile"|"sample", "method", "job", "interval_ms"}"""
+            denied = self.admin_denied()
+            if denied:
+                return denied
+            data = request.get_json(silent=True) or {}
+            route = data.get('route')
+            if route not in {rule.rule for rule in self.app.url_map.iter_rules()}:
+                return jsonify({"error": f"Unknown route: {route}"}), 400
+            try:
+                session = request_profiler.arm(route, int(data.get('requests', 1)), data.get('mode', MODE_CPROFILE),
+                                               data.get('method'), data.get('job'), data.get('interval_ms'))
+            except (TypeError, ValueError) as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify(session.summary()), 201
+
+        @self.app.route("/api/admin/profile", methods=['GET'])
+        def get_profiles():
+            denied = self.admin_denied()
+            if denied:
+                return denied
+            return jsonify([session.summary() for session in request_profiler.list_sessions()])
+
+        @self.app.route("/api/admin/profile/<session_id>", methods=['GET'])
+        def get_profile(session_id):
+            """Session report; format json (stage times per request), text (pstats), pstats (binary) or collapsed (flame graph)"""
+            denied = self.admin_denied()
+            if denied:
+                return denied
+            session = request_profiler.get(session_id)
+            if session is None:
+                return jsonify({"error": "Profile not found"}), 404
+            output = request.args.get('format', 'json')
+            if output == 'text':
+                try:
+                    report = request_profiler.pstats_text(session, request.args.get('sort', 'cumulative'),
+                                                          request.args.get('limit', request_profiler.config.report_limit, type=int))
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+                return Response(report, mimetype="text/plain")
+            if output == 'pstats':
+                dump = request_profiler.pstats_dump(session)
+                if dump is None:
+                    return jsonify({"error": "Profile has no cProfile data yet"}), 409
+                return Response(dump, mimetype="application/octet-stream",
+                                headers={"Content-Disposition": f"attachment; filename=profile-{session.id}.pstats"})
+            if output == 'collapsed':
+                if session.mode != MODE_SAMPLE:
+                    return jsonify({"error": "Collapsed stacks need a session with mode sample"}), 409
+                return Response(request_profiler.collapsed(session), mimetype="text/plain")
+            return jsonify(session.summary(with_requests=True))
+
+        @self.app.route("/api/admin/profile/<session_id>", methods=['DELETE'])
+        def cancel_profile(session_id):
+            denied = self.admin_denied()
+            if denied:
+                return denied
+            session = request_profiler.cancel(session_id)
+            if session is None:
+                return jsonify({"error": "Profile not found"}), 404
+            return jsonify(session.summary())
+
+        @self.app.route("/api/events")
+        def events():
+            """Server-sent events: printer online/offline transitions and print job progress"""
+            subscription = event_bus.subscribe(request.headers.get("Last-Event-ID"))
+            # A resuming client gets the events it missed, any other (new, or from before a restart) the current state
+            snapshot = printer_status_monitor.snapshot() if not subscription.resumed else []
+
+            def stream():
+                try:
+                    yield "retry: 3000\n\n"
+                    for status in snapshot:
+                        yield f"event: {EVENT_PRINTER_STATUS}\ndata: {json.dumps(status)}\n\n"
+                    while True:
+                        event = subscription.get(timeout=15)
+                        # Comment lines keep proxies from closing an idle stream
+                        yield event.to_sse() if event else ": keepalive\n\n"
+                finally:
+                    subscription.close()
+            
+            return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
         
         @self.app.route("/api/printers", methods=['GET'])
         def get_printers():
             try:
                 printers = self.application.printers.get_all_printers()
                 result = []
+                # Cached by the status monitor, only never-seen printers are probed (in parallel)
+                statuses = printer_status_monitor.get_statuses([printer["ip"] for printer in printers])
                 
                 for printer in printers:
-                    # Check printer connection status using printer_manager
-                    status_info = printer_manager.get_printer_status(printer["ip"])
+                    status_info = statuses[printer["ip"]]
                     printer_with_status = {
                         **printer,
                         "is_online": status_info["is_online"],
@@ -101,8 +261,7 @@ class FlaskModule:
                     return jsonify({"error": "Printer not found"}), 404
                 
                 printer = printer_data[0]
-                # Check printer connection status using printer_manager
-                status_info = printer_manager.get_printer_status(ip)
+                status_info = printer_status_monitor.get_status(ip)
                 
                 result = {
                     **printer,
@@ -162,6 +321,8 @@ class FlaskModule:
                 printer_id = existing_printer[0]['id']
                 success = self.application.printers.delete_printer(printer_id)
                 if success:
+                    self.application.printerGroups.remove_printer(ip)
+                    printer_status_monitor.forget(ip)
                     return jsonify({"message": "Printer deleted successfully"})
                 else:
                     return jsonify({"error": "Failed to delete printer"}), 500
@@ -176,43 +337,375 @@ class FlaskModule:
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
 
+        @self.app.route("/api/printers/export", methods=['GET'])
+        def export_printers():
+            """All printers with their layouts (JSON, icons included) or the printer list only (?format=csv)"""
+            try:
+                printers = self.application.printers.get_all_printers()
+                if request.args.get('format') == 'csv':
+                    return Response(printers_to_csv(printers), mimetype="text/csv",
+                                    headers={"Content-Disposition": "attachment; filename=printers.csv"})
+                
+                layouts = {}
+                for setting in self.application.printers.get_all_bitmap_settings():
+                    layouts.setdefault(setting["printer_ip"], {})[setting["name"]] = json.loads(setting["settings_data"])
+                assets = {}
+                exported = []
+                for printer in printers:
+                    printer_layouts = layouts.get(printer["ip"], {})
+                    for settings_data in printer_layouts.values():
+                        for asset_id in layout_asset_ids(settings_data):
+                            asset = assets.get(asset_id) or self.application.assets.get_asset(asset_id)
+                            if asset:
+                                assets[asset_id] = asset
+                    exported.append({**{field: printer[field] for field in PRINTER_FIELDS}, "layouts": printer_layouts})
+                return jsonify({
+                    "printers": exported,
+                    "assets": {asset_id: to_data_url(asset["mime"], asset["data"]) for asset_id, asset in assets.items()}
+                })
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        @self.app.route("/api/printers/import", methods=['POST'])
+        def import_printers():
+            """
+            Add or update many printers (and their layouts) in one transaction
+
+            Accepts the JSON export format, a JSON list of printers or a CSV file (text/csv body
+            or multipart "file"). Bad rows are reported by row number; with on_error=abort
+            (the default) nothing is written when any row is bad, with on_error=skip the good
+            rows are imported.
+            """
+            try:
+                on_error = request.args.get('on_error', 'abort')
+                assets = {}
+                if 'file' in request.files or request.mimetype == 'text/csv':
+                    raw = request.files['file'].read() if 'file' in request.files else request.get_data()
+                    text = raw.decode('utf-8')
+                    rows = json.loads(text) if text.lstrip().startswith(('[', '{')) else parse_printers_csv(text)
+                else:
+                    rows = request.get_json()
+                if isinstance(rows, dict):
+                    on_error = rows.get('on_error', on_error)
+                    assets = rows.get('assets') or {}
+                    rows = rows.get('printers')
+                if not isinstance(rows, list):
+                    return jsonify({"error": "Expected a list of printers"}), 400
+                if on_error not in ('abort', 'skip'):
+                    return jsonify({"error": "on_error must be 'abort' or 'skip'"}), 400
+                
+                # Icons are staged in memory so the layouts validate against them, nothing is written
+                # until the whole import is checked
+                staged = StagedAssets(self.application.assets)
+                if not isinstance(assets, dict) or any(
+                        not isinstance(url, str) or staged.save_data_url(url) is None for url in assets.values()):
+                    return jsonify({"error": "assets must be base64 data URLs"}), 400
+                
+                printers, layouts, errors = validate_printers(rows, staged)
+                if errors and on_error == 'abort':
+                    return jsonify({"error": f"{len(errors)} of {len(rows)} rows are invalid, nothing was imported",
+                                    "errors": errors}), 400
+                
+                used = [asset_id for _, _, settings_json in layouts for asset_id in layout_asset_ids(json.loads(settings_json))]
+                result = self.application.printers.import_printers(printers, layouts, staged.rows(used))
+                if result is None:
+                    return jsonify({"error": "Failed to import printers", "errors": errors}), 500
+                logger.info("Imported %d printers (%d new) and %d layouts, %d rows rejected",
+                            len(printers), result["inserted"], result["layouts"], len(errors))
+                return jsonify({**result, "errors": errors})
+            except (PrinterImportError, UnicodeDecodeError, json.JSONDecodeError) as e:
+                return jsonify({"error": str(e)}), 400
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        @self.app.route("/api/printers/discover", methods=['POST'])
+        def discover():
+            """Sweep a CIDR range for TSPL printers; registered ones are flagged so the rest can be bulk imported"""
+            try:
+                data = request.get_json(silent=True) or {}
+                cidr = data.get('cidr') or DiscoveryConfig().cidr
+                try:
+                    result = discover_printers(cidr, int(data.get('port', 9100)))
+                except (DiscoveryError, TypeError, ValueError) as e:
+                    return jsonify({"error": str(e)}), 400
+                
+                # Registered printers are printed to on the raw port 9100
+                registered = {(printer["ip"], 9100) for printer in self.application.printers.get_all_printers()}
+                for printer in result["printers"]:
+                    printer["registered"] = (printer["ip"], printer["port"]) in registered
+                return jsonify(result)
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
         @self.app.route("/api/printer/print", methods=['POST'])
+        @self.idempotent
         def print_to_printer():
             try:
                 data = request.get_json()
                 ip = data.get('ip')
-                print_type = data.get('type', 'bmp')  # 'bmp' or 'text'
+                print_type = data.get('type', 'bmp')  # 'bmp', 'text', 'layout' or 'template'
                 
                 if not ip:
                     return jsonify({"error": "IP is required"}), 400
                 
-                # Get printer info from database
-                printer_data = self.application.printers.get_printer_by_ip(ip)
-                if not printer_data:
-                    return jsonify({"error": "Printer not found"}), 404
+                try:
+                    copies = int(data.get('copies', 1))
+                    sets = int(data.get('sets', 1))
+                except (TypeError, ValueError):
+                    return jsonify({"error": "copies and sets must be integers"}), 400
+                if copies < 1 or sets < 1:
+                    return jsonify({"error": "copies and sets must be at least 1"}), 400
+                
+                ticket = None
+                try:
+                    try:
+                        lane = self.job_lane(data)
+                        target = self.resolve_target("printer", ip, print_type, data.get('name', 'default'))
+                        # Queue for the printer before rendering, a full queue answers 429 without any work done
+                        ticket = self.admit_job([ip], self.job_labels(print_type, data, copies, sets), lane)
+                        job_id = uuid.uuid4().hex
+                        count, send, extra = self.prepare_job(print_type, data, copies, sets, target, serial_scope=True)
+                    except JobRequestError as e:
+                        return self.job_error(e)
+                    extra["job"] = job_id
+                
+                    def job_event(state, **fields):
+                        event_bus.publish(EVENT_JOB, job=job_id, state=state, ip=ip, type=print_type, **fields)
+                
+                    journal = self.application.jobJournal
+                    self.job_started(job_id)
+                    journal.begin_job(job_id, ip, "printer", print_type, target["settings_name"], data, count)
+                    job_event("started", labels=count * copies)
+                    success = False
+                    try:
+                        success = admission_control.paced(journal.journaled(job_id, send), lane, copies, ticket)(ip, 0, count)
+                    except PrinterUnreachable:
+                        pass
+                    finally:
+                        # The job is closed even when sending raised
+                        journal.finish_job(job_id, success, count if success else 0)
+                    labels = count * copies
+                
+                    job_event("finished" if success else "failed", labels=labels if success else 0)
+                    if success:
+                        return jsonify({"message": f"Successfully printed to {ip}", "labels": labels, **extra})
+                    else:
+                        return jsonify({"error": f"Failed to print to {ip}", **extra}), 500
+                finally:
+                    # A ticket still waiting (the job ended before paced() took its turn) would block the printer's queue
+                    admission_control.release(ticket)
+                    
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        @self.app.route("/api/printer-groups", methods=['GET'])
+        def get_printer_groups():
+            try:
+                return jsonify(self.application.printerGroups.get_all_groups())
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @self.app.route("/api/printer-groups", methods=['POST'])
+        def save_printer_group():
+            try:
+                data = request.get_json()
+                name = data.get('name')
+                members = data.get('members', [])
+                
+                if not name:
+                    return jsonify({"error": "Group name is required"}), 400
+                if not isinstance(members, list) or not members:
+                    return jsonify({"error": "members must be a non-empty list of printer IPs"}), 400
+                
+                unknown = [ip for ip in members if not self.application.printers.get_printer_by_ip(ip)]
+                if unknown:
+                    return jsonify({"error": f"Printers not found: {', '.join(map(str, unknown))}"}), 404
+                
+                if self.application.printerGroups.save_group(name, list(dict.fromkeys(members))):
+                    return jsonify(self.application.printerGroups.get_group(name))
+                else:
+                    return jsonify({"error": "Failed to save group"}), 500
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @self.app.route("/api/printer-groups/delete", methods=['POST'])
+        def delete_printer_group():
+            try:
+                data = request.get_json()
+                name = data.get('name')
                 
-                printer_info = printer_data[0]
-                width_mm = printer_info["width"]
-                height_mm = printer_info["height"]
-                
-                if print_type == 'bmp':
-                    bmp_path = data.get('bmp_path', 'logo.bmp')
-                    # Bitmap dosyasının varlığını kontrol et
-                    if not os.path.exists(bmp_path):
-                        return jsonify({"error": f"Bitmap file not found: {bmp_path}"}), 404
-                    success = printer_manager.print_bmp(ip, bmp_path, width_mm, height_mm)
-                elif print_type == 'text':
-                    text = data.get('text', 'Test Print')
-                    x = data.get('x', 10)
-                    y = data.get('y', 10)
-                    success = printer_manager.print_text(ip, text, x, y, width_mm, height_mm)
+                if not name:
+                    return jsonify({"error": "Group name is required"}), 400
+                if self.application.printerGroups.delete_group(name):
+                    return jsonify({"message": "Group deleted successfully"})
                 else:
-                    return jsonify({"error": "Invalid print type. Use 'bmp' or 'text'"}), 400
+                    return jsonify({"error": "Group not found"}), 404
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @self.app.route("/api/printer-groups/print", methods=['POST'])
+        @self.idempotent
+        def print_to_printer_group():
+            """Render a layout or template run once and split its labels across the group's online printers"""
+            try:
+                data = request.get_json()
+                group_name = data.get('group')
+                print_type = data.get('type', 'layout')  # 'layout' or 'template'
+                
+                if not group_name:
+                    return jsonify({"error": "Group name is required"}), 400
+                if print_type not in ('layout', 'template'):
+                    return jsonify({"error": "Invalid print type. Use 'layout' or 'template'"}), 400
+                try:
+                    copies = int(data.get('copies', 1))
+                    sets = int(data.get('sets', 1))
+                except (TypeError, ValueError):
+                    return jsonify({"error": "copies and sets must be integers"}), 400
+                if copies < 1 or sets < 1:
+                    return jsonify({"error": "copies and sets must be at least 1"}), 400
+                
+                try:
+                    lane = self.job_lane(data)
+                    target = self.resolve_target("group", group_name, print_type, data.get('name', 'default'))
+                    online = print_dispatcher.online_members(target["members"])
+                    if not online:
+                        raise JobRequestError("No printer of the group is online", 503)
+                    # Members whose queue is full are left out of this job
+                    online = self.admit_job(online, self.job_labels(print_type, data, copies, sets), lane, group=True)
+                    if print_type == 'template' and len(online) > 1:
+                        offset_variables(data.get('variables'), 1)  # counters must be numeric to be split
+                    job_id = uuid.uuid4().hex
+                    count, send, extra = self.prepare_job(print_type, data, copies, sets, target, serial_scope=True)
+                except (TemplateError, TypeError, ValueError) as e:
+                    return jsonify({"error": str(e)}), 400
+                except JobRequestError as e:
+                    return self.job_error(e)
+                extra["job"] = job_id
+                
+                journal = self.application.jobJournal
+                self.job_started(job_id)
+                journal.begin_job(job_id, group_name, "group", print_type, target["settings_name"], data, count)
+                event_bus.publish(EVENT_JOB, job=job_id, state="started", group=group_name, type=print_type,
+                                  labels=count * copies, printers=online)
+                result = None
+                try:
+                    result = print_dispatcher.dispatch(
+                        online, count, admission_control.paced(journal.journaled(job_id, send), lane, copies), job_id)
+                finally:
+                    journal.finish_job(job_id, result is not None and result.success, result.labels if result else 0)
+                event_bus.publish(EVENT_JOB, job=job_id, state="finished" if result.success else "failed", group=group_name,
+                                  type=print_type, labels=result.labels * copies, unsent=result.unsent * copies,
+                                  in_doubt=result.in_doubt * copies)
+                body = {
+                    "labels": result.labels * copies,
+                    "printers": {ip: labels * copies for ip, labels in result.printed.items()},
+                    "failed_printers": result.failed_printers,
+                    "in_doubt": result.in_doubt * copies,
+                    **extra
+                }
+                if result.success:
+                    return jsonify({"message": f"Successfully printed to group {group_name}", **body})
+                else:
+                    return jsonify({"error": f"{result.unsent + result.in_doubt} labels could not be printed", **body}), 500
+                    
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        @self.app.route("/api/jobs", methods=['GET'])
+        def get_jobs():
+            try:
+                state = request.args.get('state')
+                limit = request.args.get('limit', 100, type=int)
+                self.application.jobJournal.flush()
+                jobs = self.application.printJobs.get_jobs(state, limit)
+                for job in jobs:
+                    del job["request"]
+                return jsonify(jobs)
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        @self.app.route("/api/jobs/<job_id>", methods=['GET'])
+        def get_job(job_id):
+            """Job with its slices: labels sent, in doubt (sending when the process stopped) and never sent"""
+            try:
+                job = self.application.jobJournal.describe(job_id)
+                if not job:
+                    return jsonify({"error": "Job not found"}), 404
+                return jsonify(job)
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        @self.app.route("/api/jobs/<job_id>/resume", methods=['POST'])
+        def resume_job(job_id):
+            """Print the labels of an interrupted or failed job that never reached a printer, in-doubt slices are left alone"""
+            try:
+                journal = self.application.jobJournal
+                job = journal.describe(job_id)
+                if not job:
+                    return jsonify({"error": "Job not found"}), 404
+                if job["state"] not in (JOB_INTERRUPTED, JOB_FAILED):
+                    return jsonify({"error": f"Job is {job['state']}, only interrupted or failed jobs can be resumed"}), 409
+                if not job["missing"]:
+                    return jsonify({"error": "Job has no unsent labels", "in_doubt": job["labels_in_doubt"]}), 409
+                
+                data = job["request"]
+                print_type = job["type"]
+                copies = int(data.get('copies', 1))
+                sets = int(data.get('sets', 1))
+                try:
+                    # A resumed job keeps its priority unless the resume request gives one
+                    lane = self.job_lane({**data, **(request.get_json(silent=True) or {})})
+                    target = self.resolve_target(job["target_kind"], job["target"], print_type, job["settings_name"])
+                    members = target["members"]
+                    if job["target_kind"] == "group":
+                        members = print_dispatcher.online_members(members)
+                        if not members:
+                            raise JobRequestError("No printer of the group is online", 503)
+                    members = self.admit_job(members, job["labels_missing"] * copies, lane, group=True)
+                    # The stored request already carries the serials reserved when the job began
+                    count, send, extra = self.prepare_job(print_type, data, copies, sets, target)
+                except (TemplateError, TypeError, ValueError) as e:
+                    return jsonify({"error": str(e)}), 400
+                except JobRequestError as e:
+                    return self.job_error(e)
+                if count != job["labels_total"]:
+                    return jsonify({"error": "Job request no longer matches its journal"}), 409
                 
+                journal.resume_job(job_id)
+                journaled_send = admission_control.paced(journal.journaled(job_id, send), lane, copies)
+                event_bus.publish(EVENT_JOB, job=job_id, state="started", type=print_type, resumed=True,
+                                  labels=job["labels_missing"] * copies, printers=members)
+                labels, unsent, in_doubt, failed_printers = 0, 0, 0, []
+                success = False
+                try:
+                    for gap in job["missing"]:
+                        result = print_dispatcher.dispatch(
+                            members, gap["labels"],
+                            lambda ip, offset, size, start=gap["offset"]: journaled_send(ip, start + offset, size),
+                            job_id)
+                        labels += result.labels
+                        unsent += result.unsent
+                        in_doubt += result.in_doubt
+                        failed_printers.extend(ip for ip in result.failed_printers if ip not in failed_printers)
+                    success = unsent == 0 and in_doubt == 0
+                finally:
+                    journal.finish_job(job_id, success, job["labels_sent"] + labels)
+                event_bus.publish(EVENT_JOB, job=job_id, state="finished" if success else "failed", type=print_type,
+                                  resumed=True, labels=labels * copies, unsent=unsent * copies, in_doubt=in_doubt * copies)
+                body = {
+                    "job": job_id,
+                    "labels": labels * copies,
+                    "in_doubt": (job["labels_in_doubt"] + in_doubt) * copies,
+                    "failed_printers": failed_printers
+                }
                 if success:
-                    return jsonify({"message": f"Successfully printed to {ip}"})
+                    response = jsonify({"message": f"Resumed job {job_id}", **body})
                 else:
-                    return jsonify({"error": f"Failed to print to {ip}"}), 500
+                    response = jsonify({"error": f"{unsent + in_doubt} labels could not be printed", **body})
+                    response.status_code = 500
+                # Repeats of the interrupted request get this result instead of "interrupted"
+                self.application.idempotencyKeys.job_finished(job_id, response.status_code, response.get_data(as_text=True))
+                return response
                     
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
@@ -262,7 +755,8 @@ class FlaskModule:
                         printer_info["width"], 
                         printer_info["height"], 
                         printer_info["dpi"],
-                        bitmap_filename
+                        bitmap_filename,
+                        self.application.assets
                     )
                     generator.create_from_frontend_data(
                         settings_data.get('textItems', []), 
@@ -278,7 +772,7 @@ class FlaskModule:
                         return jsonify({"error": "Failed to generate bitmap"}), 500
                         
             except Exception as e:
-                print(f"Logo endpoint error: {e}")
+                logger.exception("Logo endpoint error: %s", e)
                 return jsonify({"error": str(e)}), 500
 
         @self.app.route("/api/bitmap-settings", methods=['POST'])
@@ -302,6 +796,9 @@ class FlaskModule:
                 icon_items = data.get('iconItems', [])
                 barcode_items = data.get('barcodeItems', [])
                 
+                # Store inline icons once in the asset table, keep only references in the layout
+                icon_items = self.application.assets.externalize_icon_items(icon_items)
+                
                 # Create settings data structure
                 settings_data = {
                     "textItems": text_items,
@@ -310,34 +807,58 @@ class FlaskModule:
                     "barcodeItems": barcode_items
                 }
                 
+                # Validate against the printer and store each item's geometry with the layout
+                printer_info = existing_printer[0]
+                from backend.layoutCompiler import LayoutCompiler, LayoutError
+                try:
+                    settings_data = LayoutCompiler(
+                        printer_info["width"],
+                        printer_info["height"],
+                        printer_info["dpi"],
+                        self.application.assets
+                    ).compile(settings_data)
+                except LayoutError as e:
+                    return jsonify({"error": str(e), "problems": e.problems}), 400
+                layout_warnings = settings_data["layout"]["warnings"]
+                if layout_warnings:
+                    logger.info("Layout %s for %s saved with warnings: %s", name, ip, "; ".join(layout_warnings))
+                
                 # Save to database
-                print(f"Saving bitmap settings for {ip} with name: {name}")
-                print(f"Settings data: {settings_data}")
+                logger.info("Saving bitmap settings for %s with name: %s", ip, name)
+                logger.debug("Settings data: %s", settings_data)
                 success = self.application.printers.save_bitmap_settings(
                     ip, name, json.dumps(settings_data)
                 )
-                print(f"Save result: {success}")
+                logger.debug("Save result: %s", success)
                 
                 if success:
                     # Generate bitmap file
                     try:
-                        printer_info = existing_printer[0]
+                        from backend.bitmapGenerator import BitmapGenerator
                         generator = BitmapGenerator(
                             printer_info["width"], 
                             printer_info["height"], 
                             printer_info["dpi"],
-                            f"bitmap_{ip}_{name}.bmp"
+                            f"bitmap_{ip}_{name}.bmp",
+                            self.application.assets
+                        )
+                        generator.create_from_frontend_data(
+                            settings_data["textItems"],
+                            settings_data["valueItems"],
+                            settings_data["iconItems"],
+                            settings_data["barcodeItems"]
                         )
-                        generator.create_from_frontend_data(text_items, value_items, icon_items, barcode_items)
                         
                         # Return the generated bitmap file
                         bitmap_path = os.path.join(os.getcwd(), f"bitmap_{ip}_{name}.bmp")
                         if os.path.exists(bitmap_path):
-                            return send_file(bitmap_path, mimetype='image/bmp')
+                            response = send_file(bitmap_path, mimetype='image/bmp')
+                            response.headers["X-Layout-Warnings"] = str(len(layout_warnings))
+                            return response
                         else:
                             return jsonify({"message": "Settings saved successfully"})
                     except Exception as e:
-                        print(f"Bitmap generation error: {e}")
+                        logger.exception("Bitmap generation error: %s", e)
                         return jsonify({"message": "Settings saved, but bitmap generation failed"})
                 else:
                     return jsonify({"error": "Failed to save settings"}), 500
@@ -355,14 +876,14 @@ class FlaskModule:
                 if not ip:
                     return jsonify({"error": "IP is required"}), 400
                 
-                print(f"Getting bitmap settings for {ip} with name: {name}")
+                logger.debug("Getting bitmap settings for %s with name: %s", ip, name)
                 
                 if name:
                     settings = self.application.printers.get_bitmap_settings(ip, name)
                 else:
                     settings = self.application.printers.get_bitmap_settings(ip)
                 
-                print(f"Found settings: {settings}")
+                logger.debug("Found settings: %d", len(settings))
                 
                 if settings:
                     if name and len(settings) > 0:
@@ -416,27 +937,300 @@ class FlaskModule:
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
         
+        @self.app.route("/api/assets", methods=['POST'])
+        def upload_asset():
+            """Upload a binary asset (multipart file or JSON data URL), deduplicated by content hash"""
+            try:
+                if 'file' in request.files:
+                    file = request.files['file']
+                    raw = file.read()
+                    mime = file.mimetype or "application/octet-stream"
+                else:
+                    data = request.get_json(silent=True) or {}
+                    parsed = parse_data_url(data.get('data', ''))
+                    if not parsed:
+                        return jsonify({"error": "A file or base64 data URL is required"}), 400
+                    mime, raw = parsed
+                
+                if not raw:
+                    return jsonify({"error": "Empty asset"}), 400
+                
+                asset_id = self.application.assets.save_asset(raw, mime)
+                if not asset_id:
+                    return jsonify({"error": "Failed to save asset"}), 500
+                
+                return jsonify({"id": asset_id, "url": f"{ASSET_URL_PREFIX}{asset_id}", "size": len(raw)}), 201
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @self.app.route("/api/assets/<asset_id>", methods=['GET'])
+        def get_asset(asset_id):
+            try:
+                asset = self.application.assets.get_asset(asset_id)
+                if not asset:
+                    return jsonify({"error": "Asset not found"}), 404
+                
+                # Content-addressed, so the bytes behind an id never change
+                response = Response(asset["data"], mimetype=asset["mime"])
+                response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+                response.headers["ETag"] = f'"{asset_id}"'
+                return response
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
         # Catch-all route for React Router (SPA support) - MUST BE LAST
         @self.app.route('/<path:path>')
         def catch_all(path):
             # API routes should not be caught
             if path.startswith('api/'):
                 return jsonify({"error": "API endpoint not found"}), 404
+            asset = self.static_assets.get(path)
+            if asset is not None:
+                return self.static_assets.response(asset, request)
             # Serve React app for all other routes
-            return render_template("index.html")
+            return self.index()
+        
+    def admin_denied(self):
+        """Error response unless the caller may use the admin API: the admin token, or loopback when none is set"""
+        token = AdminConfig().token
+        if token:
+            supplied = request.headers.get("X-Admin-Token") or request.headers.get("Authorization", "").removeprefix("Bearer ")
+            if hmac.compare_digest(supplied.strip().encode(), token.encode()):
+                return None
+            return jsonify({"error": "Admin token required"}), 401
+        if request.remote_addr in ("127.0.0.1", "::1"):
+            return None
+        return jsonify({"error": "Admin API is only open to this machine unless HERA_ADMIN_TOKEN is set"}), 403
+
+    def index(self):
+        """index.html of the React app, which routes everything that isn't a file or API"""
+        asset = self.static_assets.get(INDEX_FILE)
+        if asset is None:
+            return jsonify({"error": "Frontend build not found"}), 404
+        return self.static_assets.response(asset, request)
+
+    def resolve_target(self, target_kind: str, name: str, print_type: str, settings_name: str) -> dict:
+        """Printers, label geometry and saved layout a job prints with; raises JobRequestError"""
+        if target_kind == "group":
+            group = self.application.printerGroups.get_group(name)
+            if not group:
+                raise JobRequestError("Group not found", 404)
+            rows = [self.application.printers.get_printer_by_ip(ip) for ip in group["members"]]
+            printers = [printer_rows[0] for printer_rows in rows if printer_rows]
+            if not printers:
+                raise JobRequestError("Group has no printers", 400)
+        else:
+            printers = self.application.printers.get_printer_by_ip(name)
+            if not printers:
+                raise JobRequestError("Printer not found", 404)
         
+        # Renders are shared, so every member must use the same label geometry
+        geometry = {(printer["width"], printer["height"], printer["dpi"]) for printer in printers}
+        if len(geometry) > 1:
+            raise JobRequestError("Group members have different label sizes or DPI", 400)
+        width_mm, height_mm, dpi = geometry.pop()
+        
+        settings_data = settings_ip = None
+        if print_type in ('layout', 'template'):
+            for printer in printers:
+                bitmap_settings = self.application.printers.get_bitmap_settings(printer["ip"], settings_name)
+                if bitmap_settings:
+                    settings_data = json.loads(bitmap_settings[0]['settings_data'])
+                    settings_ip = printer["ip"]
+                    break
+            else:
+                raise JobRequestError(f"No bitmap settings named {settings_name}", 404)
+        return {
+            "members": [printer["ip"] for printer in printers],
+            "width_mm": width_mm,
+            "height_mm": height_mm,
+            "dpi": dpi,
+            "settings_name": settings_name if settings_data is not None else None,
+            "settings_ip": settings_ip,  # printer the layout is stored with
+            "settings_data": settings_data
+        }
+    
+    def idempotent(self, view):
+        """
+        Make a print view honour the Idempotency-Key header
+
+        A repeat of a request whose job began gets the original response back with
+        Idempotent-Replayed: true instead of printing again. Requests without the header
+        are not affected.
+        """
+        @wraps(view)
+        def idempotent_view(*args, **kwargs):
+            header = request.headers.get(IDEMPOTENCY_HEADER)
+            if header is None:
+                return view(*args, **kwargs)
+            keys = self.application.idempotencyKeys
+            if not header or len(header) > keys.config.max_key_length:
+                return jsonify({"error": f"{IDEMPOTENCY_HEADER} must be 1 to {keys.config.max_key_length} characters"}), 400
+            # Keys are per endpoint, the same key may name a printer job and a group job
+            key = f"{request.path} {header}"
+            try:
+                stored = keys.claim(key, request_fingerprint(request.get_json(silent=True)))
+            except IdempotencyError as e:
+                response = jsonify({"error": str(e), **e.fields})
+                response.status_code = e.status
+                if e.retry_after:
+                    response.headers["Retry-After"] = str(e.retry_after)
+                return response
+            if stored is not None:
+                idempotent_replays_total.inc(endpoint=request.path)
+                response = Response(stored.body, status=stored.status, mimetype="application/json")
+                response.headers[REPLAYED_HEADER] = "true"
+                return response
+            g.idempotency_key = key
+            status, body = 500, json.dumps({"error": "Request failed"})
+            try:
+                response = self.app.make_response(view(*args, **kwargs))
+                status, body = response.status_code, response.get_data(as_text=True)
+                return response
+            finally:
+                keys.finish(key, status, body)
+        return idempotent_view
+
+    def job_started(self, job_id: str):
+        """Tie the request's Idempotency-Key to its job, before the job is journaled"""
+        key = g.get("idempotency_key")
+        if key:
+            self.application.idempotencyKeys.started(key, job_id)
+
+    def job_lane(self, data: dict) -> str:
+        """Admission lane of a print request, its "priority" field"""
+        lane = data.get('priority') or LANE_BULK
+        if lane not in LANES:
+            raise JobRequestError(f"priority must be one of: {', '.join(LANES)}", 400)
+        return lane
+
+    def job_labels(self, print_type: str, data: dict, copies: int, sets: int) -> int:
+        """Physical labels a print request makes, known before anything is rendered"""
+        if print_type == 'layout':
+            payloads = data.get('payloads') or [None]
+            return (len(payloads) if isinstance(payloads, list) else 1) * copies
+        return sets * copies
+
+    def admit_job(self, ips: list, labels: int, lane: str, group: bool = False):
+        """
+        Admission of a job: the ticket of a single printer, or the members of a group that can
+        take a share. Raises JobRequestError 429 with retry_after when the printers are too busy.
+        """
+        try:
+            if group:
+                return admission_control.available(ips, labels, lane)
+            return admission_control.admit(ips[0], labels, lane)
+        except AdmissionRejected as e:
+            raise JobRequestError(str(e), 429, retry_after=e.retry_after, **e.fields)
+
+    def job_error(self, e: JobRequestError):
+        """Error response of a JobRequestError, a 429 tells the client when to retry"""
+        response = jsonify({"error": str(e), **e.fields})
+        response.status_code = e.status
+        if "retry_after" in e.fields:
+            response.headers["Retry-After"] = str(e.fields["retry_after"])
+        return response
+
+    def prepare_job(self, print_type: str, data: dict, copies: int, sets: int, target: dict, serial_scope: bool = False):
+        """
+        Number of labels in a print request and a send(ip, offset, labels) printing a slice of them
+
+        Returns (count, send, extra). With serial_scope the template counters are reserved in
+        the job journal and data["variables"] is updated with the resolved starts, so a resumed
+        job prints exactly the serials it reserved. Raises JobRequestError for bad requests.
+        """
+        from backend.bitmapGenerator import BitmapGenerator  # rendering stack loads with the first render
+        width_mm, height_mm, dpi = target["width_mm"], target["height_mm"], target["dpi"]
+        settings_data = target["settings_data"]
+        extra = {}
+        try:
+            if print_type == 'bmp':
+                bmp_path = data.get('bmp_path', 'logo.bmp')
+                # Bitmap dosyasının varlığını kontrol et
+                if not os.path.exists(bmp_path):
+                    raise JobRequestError(f"Bitmap file not found: {bmp_path}", 404)
+                count = sets
+                
+                def send(ip, offset, labels):
+                    return printer_manager.print_bmp(ip, bmp_path, width_mm, height_mm, sets=labels, copies=copies)
+            elif print_type == 'text':
+                text = data.get('text', 'Test Print')
+                x = data.get('x', 10)
+                y = data.get('y', 10)
+                counter_start = data.get('counter_start')
+                try:
+                    counter_step = int(data.get('counter_step', 1))
+                except (TypeError, ValueError):
+                    raise JobRequestError("counter_step must be an integer", 400)
+                count = sets
+                
+                def send(ip, offset, labels):
+                    start = None if counter_start is None else str(counter_start)
+                    if start is not None and offset:
+                        start = counter_value(start, counter_step, offset) or start
+                    return printer_manager.print_text(
+                        ip, text, x, y, width_mm, height_mm,
+                        sets=labels, copies=copies,
+                        counter_start=start, counter_step=counter_step
+                    )
+            elif print_type == 'layout':
+                # Saved layout with a list of variable payloads, printed in one TSPL session
+                payloads = data.get('payloads')
+                if payloads in (None, []):
+                    payloads = [None]
+                elif not isinstance(payloads, list) or not all(isinstance(payload, dict) for payload in payloads):
+                    raise JobRequestError("payloads must be a list of objects", 400)
+                if sets != 1:
+                    raise JobRequestError("sets does not apply to layout prints, send one payload per label", 400)
+                generator = BitmapGenerator(width_mm, height_mm, dpi, asset_store=self.application.assets)
+                regions = generator.render_regions(settings_data, payloads)
+                count = len(regions)
+                
+                def send(ip, offset, labels):
+                    return printer_manager.print_regions(ip, regions[offset:offset + labels], width_mm, height_mm, copies=copies)
+            elif print_type == 'template':
+                # Static layer uploaded once, serials and dates generated by the printer for `sets` labels
+                variables = data.get('variables')
+                static_settings, variable_items = split_template(settings_data, variables)
+                compile_template(variable_items, dpi)
+                if serial_scope:
+                    # Serials are scoped per stored layout (printer and name); every counter continues
+                    # after (and never below) what was issued
+                    counters = template_counters(variables)
+                    scopes = {key: f"{target['settings_ip']}/{target['settings_name']}/{key}" for key in counters}
+                    # Counters used to be scoped by layout name only, those values still count as issued
+                    inherited = {scope: f"{target['settings_name']}/{key}" for key, scope in scopes.items()}
+                    starts = self.application.jobJournal.reserve_serials(
+                        {scopes[key]: counter for key, counter in counters.items()}, sets, inherited)
+                    variables = with_counter_starts(variables, {key: starts[scopes[key]] for key in counters})
+                    data["variables"] = variables
+                    _, variable_items = split_template(settings_data, variables)
+                extra["last"] = compile_template(variable_items, dpi).last_values(sets)
+                
+                generator = BitmapGenerator(width_mm, height_mm, dpi, asset_store=self.application.assets)
+                region = generator.render_static_region(static_settings)
+                filename = template_filename(region)
+                count = sets
+                
+                def send(ip, offset, labels):
+                    # Each slice continues the serials where the previous one ends
+                    _, items = split_template(settings_data, offset_variables(variables, offset))
+                    program = compile_template(items, dpi)
+                    return printer_manager.print_template(ip, filename, region, program, labels, copies, width_mm, height_mm)
+            else:
+                raise JobRequestError("Invalid print type. Use 'bmp', 'text', 'layout' or 'template'", 400)
+        except SerialConflict as e:
+            raise JobRequestError(str(e), 409, next=e.next_values)
+        except (TemplateError, TypeError, ValueError) as e:
+            raise JobRequestError(str(e), 400)
+        return count, send, extra
+    
     def run(self):
         try:
-            print("Flask server starting on http://127.0.0.1:8088")
-            print("Frontend: http://127.0.0.1:8088")
-            print("API endpoints:")
-            print("  GET  /api/printers - List all printers")
-            print("  POST /api/printers - Add new printer")
-            print("  GET  /api/printers/<ip> - Get printer by IP")
-            print("  PUT  /api/printers/<ip> - Update printer by IP")
-            print("  DELETE /api/printers/<ip> - Delete printer by IP")
-            print("  GET  /api/health - Health check")
-            print("  POST /api/bitmap-settings - Save bitmap settings")
-            self.app.run(use_reloader=False, host="0.0.0.0", port=8088, threaded=False)
+            logger.info("Flask server starting on http://127.0.0.1:8088")
+            logger.info("Frontend: http://127.0.0.1:8088")
+            logger.info("Metrics: http://127.0.0.1:8088/api/metrics")
+            # Threaded so /api/events streams don't block other requests
+            self.app.run(use_reloader=False, host="0.0.0.0", port=8088, threaded=True)
         except Exception as e:
-            print("FlaskServer.py run Exception:", e)
+            logger.exception("FlaskServer.py run Exception: %s", e)
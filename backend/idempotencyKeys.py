@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from threading import Condition
+from typing import Any, Optional
+from backend.configModule import IdempotencyConfig
+from backend.jobJournal import JobJournal
+from backend.metricsModule import metrics
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+idempotent_replays_total = metrics.counter(
+    "hera_idempotent_replays_total", "Print requests answered with the result of an earlier request with the same key",
+    ("endpoint",))
+
+class IdempotencyError(Exception):
+    """A request key that cannot be used now, reported with an HTTP status"""
+
+    def __init__(self, message: str, status: int, retry_after: int = None, **fields):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.fields = fields
+
+class StoredResponse:
+    """Result of the first request with a key"""
+
+    def __init__(self, fingerprint: str, expires_at: float, job_id: str = None, status: int = None,
+                 body: str = None, interrupted: bool = False):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.job_id = job_id
+        self.status = status  # None while the request runs
+        self.body = body
+        self.interrupted = interrupted  # the request died with its job, the response stands in until a resume
+
+    @property
+    def done(self) -> bool:
+        return self.status is not None
+
+def request_fingerprint(data: Any) -> str:
+    """Hash of a JSON request body, independent of key order"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+class IdempotencyKeys:
+    """
+    Idempotency-Key handling for print requests
+
+    The first request with a key runs; a repeat with the same key and body gets the
+    first response back, or waits for it while the first is still printing. Keys live
+    in memory for fast lookups and in the idempotency_keys table, written through the
+    job journal: the key is committed together with its job before any label is sent,
+    so a retry after a crash finds the job instead of printing it again. A request that
+    ends before its job begins (validation error, 429) frees its key so a retry runs.
+    Database reads happen outside the lock, so a lookup never holds up other keys.
+    """
+
+    def __init__(self, journal: JobJournal):
+        self.journal = journal
+        self.config = IdempotencyConfig()
+        self.entries: "OrderedDict[str, StoredResponse]" = OrderedDict()  # least recently used first
+        self._condition = Condition()
+        self._purged = 0.0
+
+    def claim(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        Reserve key for this request, or return the finished response of the first one
+
+        Raises IdempotencyError when the key was used with a different body (422) or the
+        first request is still running after config.in_flight_wait seconds (409).
+        """
+        now = time.time()
+        deadline = time.monotonic() + self.config.in_flight_wait
+        with self._condition:
+            if now - self._purged > self.config.purge_interval:
+                self._purge(now)
+        while True:
+            entry = self._lookup(key, fingerprint, now)
+            if entry is None:
+                return None
+            with self._condition:
+                while self.entries.get(key) is entry:
+                    if entry.fingerprint != fingerprint:
+                        raise IdempotencyError(f"{IDEMPOTENCY_HEADER} was already used for a different request", 422)
+                    if entry.done:
+                        return entry
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise IdempotencyError("A request with this key is still printing", 409,
+                                               retry_after=self.config.in_flight_wait, job=entry.job_id)
+                    self._condition.wait(remaining)
+            # The first request freed its key, look it up again
+
+    def _lookup(self, key: str, fingerprint: str, now: float) -> Optional[StoredResponse]:
+        """
+        Entry of a key from memory, or from the database after a restart or eviction
+
+        Claims the key for this request (returns None) when it was never used.
+        """
+        with self._condition:
+            entry = self._cached(key, now)
+        if entry is not None:
+            return entry
+        stored = self._load(key)
+        with self._condition:
+            # Another request may have claimed or loaded the key while the database was read
+            entry = self._cached(key, now)
+            if entry is None:
+                if stored is None or stored.expires_at < now:
+                    self._remember(key, StoredResponse(fingerprint, now + self.config.ttl_seconds))
+                    return None
+                entry = stored
+                self._remember(key, entry)
+            return entry
+
+    def _cached(self, key: str, now: float) -> Optional[StoredResponse]:
+        """Entry of a key in memory (condition held)"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < now:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _load(self, key: str) -> Optional[StoredResponse]:
+        row = self.journal.store.get_idempotency_key(key)
+        if row is None:
+            return None
+        if row["status"] is None:
+            # Only a previous process can leave a key without a response: its job was interrupted
+            body = json.dumps({"error": "The original request was interrupted, resume its job", "job": row["job_id"]})
+            return StoredResponse(row["fingerprint"], row["expires_at"], row["job_id"], 409, body, interrupted=True)
+        return StoredResponse(row["fingerprint"], row["expires_at"], row["job_id"], row["status"], row["response"])
+
+    def _remember(self, key: str, entry: StoredResponse):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.config.max_memory_keys:
+            # Running requests stay; finished ones are still found in the database
+            oldest = next((k for k, e in self.entries.items() if e.done), None)
+            if oldest is None:
+                break
+            del self.entries[oldest]
+
+    def _purge(self, now: float):
+        for key in [key for key, entry in self.entries.items() if entry.done and entry.expires_at < now]:
+            del self.entries[key]
+        self.journal.forget_keys(now)
+        self._purged = now
+
+    def started(self, key: str, job_id: str):
+        """The key's job is about to begin, call before JobJournal.begin_job"""
+        with self._condition:
+            entry = self.entries[key]
+            entry.job_id = job_id
+        self.journal.record_key(key, entry.fingerprint, job_id, entry.expires_at)
+
+    def finish(self, key: str, status: int, body: str):
+        """Store the response of the key's request for its repeats, or free the key when no job began"""
+        with self._condition:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            if entry.job_id is None:
+                # Nothing was printed, a retry should run again
+                del self.entries[key]
+            else:
+                entry.status, entry.body = status, body
+                self.journal.record_key_response(key, status, body)
+            self._condition.notify_all()
+
+    def job_finished(self, job_id: str, status: int, body: str):
+        """
+        A resumed job ended: keys whose request was interrupted with it answer with this
+        result from now on instead of "interrupted"
+        """
+        # Committed before memory changes, so a lookup that misses memory finds the new response
+        self.journal.record_job_response(job_id, status, body)
+        with self._condition:
+            for entry in self.entries.values():
+                if entry.job_id == job_id and entry.interrupted:
+                    entry.status, entry.body, entry.interrupted = status, body, False
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional
+from backend.configModule import RenderConfig
+from backend.metricsModule import metrics
+
+class ImageCache:
+    """Thread-safe LRU cache for decoded, print-ready 1-bit image tiles"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return cached value for key or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store value for key, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_ratio(self) -> float:
+        """Fraction of lookups served from cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+# Global cache of pre-dithered icon/image tiles
+image_cache = ImageCache(RenderConfig().image_cache_size)
+# Parsed TrueType fonts, rendered barcodes and template static layers live in their own
+# caches so per-label barcodes never evict icon tiles
+font_cache = ImageCache(RenderConfig().font_cache_size)
+barcode_cache = ImageCache(RenderConfig().barcode_cache_size)
+static_layer_cache = ImageCache(RenderConfig().static_layer_cache_size)
+glyph_metrics_cache = ImageCache(RenderConfig().glyph_metrics_cache_size)
+
+metrics.gauge("hera_image_cache_hits", "Image tile cache hits", lambda: image_cache.hits)
+metrics.gauge("hera_image_cache_misses", "Image tile cache misses", lambda: image_cache.misses)
+metrics.gauge("hera_image_cache_hit_ratio", "Image tile cache hit ratio", image_cache.hit_ratio)
+metrics.gauge("hera_image_cache_entries", "Image tiles currently cached", lambda: len(image_cache))
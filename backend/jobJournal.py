@@ -0,0 +1,242 @@
+import json
+import logging
+import time
+from threading import Condition, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from backend.tsplTemplate import counter_value
+from backend.tsplCommands import PrinterUnreachable
+from backend.databaseModule.printJobs import (
+    PrintJobs, JOB_STARTED, JOB_FINISHED, JOB_FAILED, SLICE_SENDING, SLICE_SENT, SLICE_FAILED
+)
+
+logger = logging.getLogger(__name__)
+
+class JournalError(RuntimeError):
+    """A journal record that had to be durable could not be written"""
+
+class SerialConflict(ValueError):
+    """Requested serials overlap serials that were already issued"""
+
+    def __init__(self, message: str, next_values: Dict[str, str]):
+        super().__init__(message)
+        self.next_values = next_values
+
+class JobJournal:
+    """
+    Durable record of print jobs with group commit
+
+    Records are queued and a writer thread commits everything queued so far in one
+    transaction. Callers that need a record on disk before they continue (a slice
+    about to be sent) wait for the commit that covers it, so concurrent senders
+    share a single fsync instead of paying for one each.
+
+    A slice is journaled as "sending" before its bytes go to the printer. After a
+    crash, or a send that failed part way, such a slice is in doubt: it is reported
+    and never sent again. Only a slice whose printer could not be reached is failed.
+    Counter serials are reserved for the whole job before it starts, so serials of an
+    interrupted job are never handed to another one.
+    """
+
+    def __init__(self, store: PrintJobs, flush_interval: float = 0.002):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[str, tuple]] = []
+        self._queued = 0    # sequence number of the last queued record
+        self._written = 0   # sequence number of the last committed record
+        self._failed = 0    # sequence number of the last record in a failed batch
+        self._condition = Condition()
+        self._serial_lock = Lock()
+        self.commits = 0
+        self._thread = Thread(target=self._run, name="job-journal", daemon=True)
+        self._thread.start()
+
+    def _append(self, statements: List[Tuple[str, tuple]], durable: bool = False):
+        with self._condition:
+            self._pending.extend(statements)
+            self._queued += 1
+            sequence = self._queued
+            self._condition.notify_all()
+            if durable:
+                self._condition.wait_for(lambda: self._written >= sequence)
+                if self._failed >= sequence:
+                    raise JournalError("Print job journal write failed")
+
+    def flush(self):
+        """Block until everything queued so far is committed"""
+        self._append([], durable=True)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queued > self._written)
+            # Give concurrent writers a moment to join this commit
+            time.sleep(self.flush_interval)
+            with self._condition:
+                batch, self._pending = self._pending[:], []
+                sequence = self._queued
+            try:
+                ok = self.store.execute_batch(batch) if batch else True
+            except Exception as e:
+                # The writer must survive, durable callers wait for it and see the failure
+                logger.exception("Print job journal commit failed: %s", e)
+                ok = False
+            with self._condition:
+                self._written = sequence
+                self.commits += 1
+                if not ok:
+                    self._failed = sequence
+                self._condition.notify_all()
+
+    # Jobs
+
+    def begin_job(self, job_id: str, target: str, target_kind: str, job_type: str, settings_name: Optional[str],
+                  request: Dict[str, Any], labels_total: int):
+        self._append([(
+            "INSERT INTO print_jobs (id, target, target_kind, type, settings_name, request, state, labels_total) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, target, target_kind, job_type, settings_name, json.dumps(request), JOB_STARTED, labels_total)
+        )], durable=True)
+
+    def finish_job(self, job_id: str, success: bool, labels_done: int):
+        self._append([(
+            "UPDATE print_jobs SET state = ?, labels_done = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (JOB_FINISHED if success else JOB_FAILED, labels_done, job_id)
+        )])
+
+    def resume_job(self, job_id: str):
+        self._append([(
+            "UPDATE print_jobs SET state = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (JOB_STARTED, job_id)
+        )], durable=True)
+
+    def slice_sending(self, job_id: str, printer_ip: str, offset: int, labels: int):
+        """Durably mark a slice as going out"""
+        self._append([(
+            "INSERT OR REPLACE INTO print_job_slices (job_id, printer_ip, slice_offset, labels, state) VALUES (?, ?, ?, ?, ?)",
+            (job_id, printer_ip, offset, labels, SLICE_SENDING)
+        )], durable=True)
+
+    def slice_done(self, job_id: str, printer_ip: str, offset: int, ok: bool):
+        self._append([(
+            "UPDATE print_job_slices SET state = ?, updated_at = CURRENT_TIMESTAMP WHERE job_id = ? AND printer_ip = ? AND slice_offset = ?",
+            (SLICE_SENT if ok else SLICE_FAILED, job_id, printer_ip, offset)
+        )])
+
+    def journaled(self, job_id: str, send: Callable[[str, int, int], bool]) -> Callable[[str, int, int], bool]:
+        """Wrap a dispatcher send(ip, offset, labels) so every slice is journaled around the send"""
+        def journaled_send(ip: str, offset: int, labels: int) -> bool:
+            self.slice_sending(job_id, ip, offset, labels)
+            ok = False
+            try:
+                ok = bool(send(ip, offset, labels))
+            except PrinterUnreachable:
+                # Nothing went out, the slice can be resumed
+                self.slice_done(job_id, ip, offset, False)
+                raise
+            if ok:
+                self.slice_done(job_id, ip, offset, True)
+            # A failed send may have printed part of the slice, it stays "sending" (in doubt)
+            return ok
+        return journaled_send
+
+    # Idempotency keys
+
+    def record_key(self, key: str, fingerprint: str, job_id: str, expires_at: float):
+        """Tie a request key to its job; committed with the job's begin_job, before anything prints"""
+        self._append([(
+            "INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, job_id, expires_at) VALUES (?, ?, ?, ?)",
+            (key, fingerprint, job_id, expires_at)
+        )])
+
+    def record_key_response(self, key: str, status: int, response: str):
+        self._append([(
+            "UPDATE idempotency_keys SET status = ?, response = ? WHERE key = ?", (status, response, key)
+        )])
+
+    def record_job_response(self, job_id: str, status: int, response: str):
+        """Durably answer the keys of a job whose request never got a response (it was interrupted)"""
+        self._append([(
+            "UPDATE idempotency_keys SET status = ?, response = ? WHERE job_id = ? AND status IS NULL",
+            (status, response, job_id)
+        )], durable=True)
+
+    def forget_keys(self, expired_before: float):
+        self._append([("DELETE FROM idempotency_keys WHERE expires_at < ?", (expired_before,))])
+
+    # Serials
+
+    def reserve_serials(self, counters: Dict[str, Tuple[Optional[str], int]], count: int,
+                        inherited: Dict[str, str] = None) -> Dict[str, str]:
+        """
+        Durably reserve count values per counter and return the first value of each
+
+        counters maps scope -> (requested start, or None to continue after the last issued
+        value, step). inherited maps a scope to an older scope whose issued values it
+        continues when it has none of its own. Raises SerialConflict when a requested start
+        is at or below a value that was already issued. A failed job leaves a gap, never
+        a duplicate.
+        """
+        inherited = inherited or {}
+        with self._serial_lock:
+            issued = self.store.get_serial_counters(list(counters) + list(inherited.values()))
+            first_values, conflicts, next_values, statements = {}, [], {}, []
+            for scope, (start, step) in counters.items():
+                last = issued.get(scope, issued.get(inherited.get(scope)))
+                next_value = counter_value(last, 1, 1) if last is not None else None
+                if next_value is not None:
+                    next_values[scope] = next_value
+                if start is None:
+                    start = next_value or "1"
+                elif next_value is not None and start.isdigit() and int(start) < int(next_value):
+                    conflicts.append(f"{scope} starts at {start} but {last} was already issued")
+                first_values[scope] = start
+                end = counter_value(start, step, count - 1)
+                if end is not None:
+                    # Keep the highest value; values of one counter share their zero padding
+                    statements.append((
+                        "INSERT INTO serial_counters (scope, last_value) VALUES (?, ?) "
+                        "ON CONFLICT(scope) DO UPDATE SET last_value = excluded.last_value, updated_at = CURRENT_TIMESTAMP "
+                        "WHERE CAST(excluded.last_value AS INTEGER) > CAST(serial_counters.last_value AS INTEGER)",
+                        (scope, max(start, end, key=int))
+                    ))
+            if conflicts:
+                raise SerialConflict("; ".join(conflicts), next_values)
+            if statements:
+                self._append(statements, durable=True)
+        return first_values
+
+    # Recovery
+
+    def recover(self) -> List[Dict[str, Any]]:
+        """Mark jobs left running by a previous process as interrupted and describe each one"""
+        reports = [self.describe(job_id) for job_id in self.store.mark_interrupted()]
+        for report in reports:
+            logger.warning(
+                "Print job %s on %s was interrupted: %d of %d labels sent, %d in doubt, %d never sent",
+                report["id"], report["target"], report["labels_sent"], report["labels_total"],
+                report["labels_in_doubt"], report["labels_missing"]
+            )
+        return reports
+
+    def describe(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job with its slices and the label ranges that were never handed to a printer"""
+        self.flush()
+        job = self.store.get_job(job_id)
+        if job is None:
+            return None
+        job["request"] = json.loads(job["request"])
+        covered = sorted(
+            (entry["slice_offset"], entry["slice_offset"] + entry["labels"])
+            for entry in job["slices"] if entry["state"] in (SLICE_SENDING, SLICE_SENT)
+        )
+        missing, position = [], 0
+        for start, end in covered:
+            if start > position:
+                missing.append((position, start - position))
+            position = max(position, end)
+        if position < job["labels_total"]:
+            missing.append((position, job["labels_total"] - position))
+        job["labels_sent"] = sum(entry["labels"] for entry in job["slices"] if entry["state"] == SLICE_SENT)
+        job["labels_in_doubt"] = sum(entry["labels"] for entry in job["slices"] if entry["state"] == SLICE_SENDING)
+        job["labels_missing"] = sum(labels for _, labels in missing)
+        job["missing"] = [{"offset": offset, "labels": labels} for offset, labels in missing]
+        return job
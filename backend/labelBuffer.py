@@ -0,0 +1,95 @@
+from threading import Lock
+from typing import Dict, List, Tuple
+from PIL import Image
+from backend.rasterBackend import get_raster_backend
+
+WHITE = 255
+
+class LabelBuffer:
+    """
+    Preallocated raster for one label, reused through LabelBufferPool
+
+    Pillow keeps 1-bit images at one byte per pixel internally, so the buffer is an
+    "L" image holding 0 (black) / 255 (white). Drawing uses fontmode "1" so the result
+    is pixel-identical to drawing on a mode "1" image.
+    """
+
+    def __init__(self, width_px: int, height_px: int):
+        self.width_px = width_px
+        self.height_px = height_px
+        self.row_bytes = (width_px + 7) // 8  # packed TSPL row width
+        self.image = Image.new("L", (width_px, height_px), WHITE)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width_px, self.height_px
+
+    @property
+    def data(self) -> bytes:
+        """Pixels row by row, one byte each (a copy, drawing later doesn't change it)"""
+        return self.image.tobytes()
+
+    def clear(self):
+        """Reset every pixel to white in place"""
+        self.image.paste(WHITE, (0, 0, self.width_px, self.height_px))
+
+    def to_1bit(self) -> Image.Image:
+        """Mode "1" copy of the label (for saving as a 1-bit BMP)"""
+        return self.image.convert("1", dither=Image.Dither.NONE)
+
+    def packed_rows(self, invert: bool = False) -> bytes:
+        """Rows packed MSB first, 1 = white (as TSPL BITMAP expects) unless invert"""
+        return get_raster_backend().pack_rows(self, invert=invert)
+
+    def packed_region(self, crop: bool = True, invert: bool = False) -> Tuple[int, int, int, int, bytes]:
+        """
+        Packed rows of the inked part of the label
+
+        Returns (x, y, row_bytes, height, data). With crop, blank margins are dropped and
+        x is aligned to a byte so the region can be placed with BITMAP x,y. A blank label
+        gives height 0 and no data.
+        """
+        raster = get_raster_backend()
+        if not crop:
+            return 0, 0, self.row_bytes, self.height_px, raster.pack_rows(self, invert=invert)
+        bounds = raster.content_bounds(self)
+        if bounds is None:
+            return 0, 0, 0, 0, b""
+        left, top, right, bottom = bounds
+        left = left // 8 * 8
+        right = min(self.width_px, (right + 7) // 8 * 8)
+        data = raster.pack_rows(self, (left, top, right, bottom), invert=invert)
+        return left, top, (right - left + 7) // 8, bottom - top, data
+
+class LabelBufferPool:
+    """Free lists of label buffers keyed by pixel size"""
+
+    def __init__(self, max_free_per_size: int = 4):
+        self.max_free_per_size = max_free_per_size
+        self._free: Dict[Tuple[int, int], List[LabelBuffer]] = {}
+        self._lock = Lock()
+        self.allocations = 0
+
+    def acquire(self, width_px: int, height_px: int) -> LabelBuffer:
+        """Get a cleared buffer of the given size, allocating only when none is free"""
+        with self._lock:
+            free = self._free.get((width_px, height_px))
+            buffer = free.pop() if free else None
+            if buffer is None:
+                self.allocations += 1
+        if buffer is None:
+            return LabelBuffer(width_px, height_px)
+        buffer.clear()
+        return buffer
+
+    def release(self, buffer: LabelBuffer):
+        """Return a buffer for reuse; the caller must not touch it afterwards"""
+        if buffer is None:
+            return
+        with self._lock:
+            free = self._free.setdefault(buffer.size, [])
+            if len(free) < self.max_free_per_size and buffer not in free:
+                free.append(buffer)
+
+# Global label buffer pool
+label_buffer_pool = LabelBufferPool()
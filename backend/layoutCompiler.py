@@ -0,0 +1,194 @@
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+from PIL import Image
+from barcode.errors import BarcodeError
+from barcode.writer import ImageWriter
+from backend.bitmapGenerator import BitmapGenerator, BARCODE_CLASSES
+from backend.textLayout import FIT_NONE, FIT_MODES, ALIGNMENTS, VERTICAL_ALIGNMENTS
+from backend.databaseModule.assets import parse_data_url, asset_id_from_reference
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_VERSION = 1
+
+# Item lists in draw order, later lists are drawn on top
+ITEM_LISTS = (
+    ("textItems", "text"),
+    ("valueItems", "value"),
+    ("iconItems", "icon"),
+    ("barcodeItems", "barcode")
+)
+
+class LayoutError(ValueError):
+    """Layout that cannot be printed, with one message per problem"""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("Invalid layout: " + "; ".join(problems))
+        self.problems = problems
+
+def _intersects(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+class LayoutCompiler:
+    """
+    Validates a frontend layout against a printer and precomputes its geometry
+
+    Runs once when a layout is saved. Every item gets its bbox (text also its font
+    metrics) and bad layouts are rejected before they reach a printer. Items are drawn
+    in list order, texts, values, icons then barcodes, so no z-order is stored.
+    """
+
+    def __init__(self, width_mm: int, height_mm: int, dpi: int, asset_store=None):
+        self.generator = BitmapGenerator(width_mm, height_mm, dpi, asset_store=asset_store)
+        self.width_px, self.height_px, _ = self.generator.set_label_scale()
+        self.dpi = dpi
+        self.asset_store = asset_store
+
+    def compile(self, settings_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Copy of settings_data with geometry added to each item and a "layout" summary
+
+        Raises LayoutError listing every problem found. Overlaps and empty items are
+        only warnings, they are stored in layout["warnings"].
+        """
+        errors: List[str] = []
+        warnings: List[str] = []
+        compiled = dict(settings_data)
+        placed = []  # (label, bbox) in draw order
+
+        for list_name, kind in ITEM_LISTS:
+            items = []
+            for index, item in enumerate(settings_data.get(list_name) or []):
+                label = f"{kind} {index + 1}"
+                item = dict(item)
+                item.pop("z", None)  # stored by earlier versions
+                try:
+                    bbox = self._measure(kind, item, warnings, label)
+                except (TypeError, ValueError, OSError, BarcodeError) as e:
+                    errors.append(f"{label}: {e}")
+                    bbox = None
+                if bbox is not None:
+                    item["bbox"] = list(bbox)
+                    if bbox[0] < 0 or bbox[1] < 0 or bbox[2] > self.width_px or bbox[3] > self.height_px:
+                        errors.append(f"{label}: {list(bbox)} is outside the {self.width_px}x{self.height_px} label")
+                    else:
+                        placed.append((label, bbox))
+                else:
+                    item.pop("bbox", None)
+                items.append(item)
+            compiled[list_name] = items
+
+        for i, (label, bbox) in enumerate(placed):
+            for other_label, other_bbox in placed[i + 1:]:
+                if _intersects(bbox, other_bbox):
+                    warnings.append(f"{other_label} overlaps {label}")
+
+        if errors:
+            raise LayoutError(errors)
+        compiled["layout"] = {
+            "version": LAYOUT_VERSION,
+            "widthPx": self.width_px,
+            "heightPx": self.height_px,
+            "dpi": self.dpi,
+            "warnings": warnings
+        }
+        return compiled
+
+    def _number(self, item: Dict[str, Any], key: str, default: Optional[int] = None, positive: bool = False) -> Optional[int]:
+        value = item.get(key, default)
+        if value is None:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{key} must be a number")
+        if positive and value <= 0:
+            raise ValueError(f"{key} must be positive")
+        return int(value)
+
+    def _measure(self, kind: str, item: Dict[str, Any], warnings: List[str], label: str) -> Optional[Tuple[int, int, int, int]]:
+        """bbox of one item as the renderer will draw it, None when it draws nothing"""
+        x = self._number(item, "x", 0)
+        y = self._number(item, "y", 0)
+        if kind in ("text", "value"):
+            return self._measure_text(item, x, y, warnings, label)
+        if kind == "icon":
+            return self._measure_icon(item, x, y, warnings, label)
+        return self._measure_barcode(item, x, y, warnings, label)
+
+    def _measure_text(self, item, x, y, warnings, label):
+        font_size = self._number(item, "fontSize", 12, positive=True)
+        content = item.get("content")
+        if not content:
+            warnings.append(f"{label}: empty content is not printed")
+            return None
+        font = self.generator._load_font(item.get("fontFamily", "Arial"), font_size)
+        if hasattr(font, "getmetrics"):
+            ascent, descent = font.getmetrics()
+            item["fontMetrics"] = {"ascent": ascent, "descent": descent}
+        if item.get("width") is not None:
+            return self._measure_text_box(item, x, y, font_size, warnings, label)
+        # Same box ImageDraw.textbbox gives for the default "la" anchor with fontmode "1"
+        left, top, right, bottom = font.getbbox(str(content), mode="1")
+        return x + left, y + top, x + right, y + bottom
+
+    def _measure_text_box(self, item, x, y, font_size, warnings, label):
+        width = self._number(item, "width", None, positive=True)
+        height = self._number(item, "height", None, positive=True)
+        min_font_size = self._number(item, "minFontSize", None, positive=True)
+        if min_font_size is not None and min_font_size > font_size:
+            raise ValueError("minFontSize must not be larger than fontSize")
+        for key, default, allowed in (("fit", FIT_NONE, FIT_MODES), ("align", "left", ALIGNMENTS),
+                                      ("verticalAlign", "top", VERTICAL_ALIGNMENTS)):
+            if item.get(key, default) not in allowed:
+                raise ValueError(f"{key} must be one of {', '.join(allowed)}")
+        line_spacing = item.get("lineSpacing", 1.0)
+        if isinstance(line_spacing, bool) or not isinstance(line_spacing, (int, float)) or line_spacing <= 0:
+            raise ValueError("lineSpacing must be a positive number")
+        text_layout = self.generator.layout_text_item(item)
+        if text_layout.truncated:
+            warnings.append(f"{label}: text doesn't fit its {width}x{height} box, "
+                            f"only {len(text_layout.lines)} line(s) at size {text_layout.font_size} are printed")
+        elif text_layout.font_size < font_size:
+            logger.debug("%s shrunk from %d to %d to fit its box", label, font_size, text_layout.font_size)
+        return x, y, x + text_layout.width, y + text_layout.height
+
+    def _measure_icon(self, item, x, y, warnings, label):
+        width = self._number(item, "width", None, positive=True)
+        height = self._number(item, "height", None, positive=True)
+        icon_ref = item.get("assetId") or item.get("iconFile")
+        if not icon_ref:
+            warnings.append(f"{label}: no image is not printed")
+            return None
+        asset_id = asset_id_from_reference(icon_ref)
+        if asset_id is not None:
+            if self.asset_store is None:
+                raise ValueError("no asset store to resolve the icon")
+            raw = self.asset_store.get_asset_data(asset_id)
+            if raw is None:
+                raise ValueError(f"asset not found: {asset_id}")
+        else:
+            parsed = parse_data_url(icon_ref)
+            if not parsed:
+                raise ValueError("unsupported icon reference")
+            raw = parsed[1]
+        with Image.open(BytesIO(raw)) as src:
+            size = self.generator._fit_size(src.size, width, height)
+        return x, y, x + size[0], y + size[1]
+
+    def _measure_barcode(self, item, x, y, warnings, label):
+        width = self._number(item, "width", None, positive=True)
+        height = self._number(item, "height", None, positive=True)
+        data = item.get("data")
+        if not data:
+            warnings.append(f"{label}: empty data is not printed")
+            return None
+        barcode_type = str(item.get("format", "code128")).lower()
+        barcode_class = BARCODE_CLASSES.get(barcode_type)
+        if barcode_class is None:
+            raise ValueError(f"unsupported barcode type: {barcode_type}")
+        if width and height:
+            # Constructing the barcode validates the data (digits for EAN13, charset for Code39)
+            barcode_class(str(data), writer=ImageWriter())
+        else:
+            width, height = self.generator.render_barcode(str(data), barcode_type, width, height).size
+        return x, y, x + width, y + height
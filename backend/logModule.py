@@ -0,0 +1,34 @@
+import logging
+import sys
+from backend.configModule import LogConfig
+
+class StructuredFormatter(logging.Formatter):
+    """Single-line key=value formatter; extra fields come from `extra={"fields": {...}}`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage().replace('"', '\\"')
+        parts = [
+            f"time={self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}",
+            f"level={record.levelname.lower()}",
+            f"logger={record.name}",
+            f'msg="{message}"'
+        ]
+        for key, value in getattr(record, "fields", {}).items():
+            parts.append(f"{key}={value}")
+        if record.exc_info:
+            parts.append(f'exc="{self.formatException(record.exc_info)}"')
+        return " ".join(parts)
+
+def setup_logging(level: str = None):
+    """Configure the `backend` logger tree; debug calls cost one level check when disabled"""
+    logConfig = LogConfig()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(StructuredFormatter())
+
+    root = logging.getLogger("backend")
+    root.handlers[:] = [handler]
+    root.setLevel((level or logConfig.level).upper())
+    root.propagate = False
+
+    # Werkzeug request lines duplicate the HTTP histogram, keep them quiet
+    logging.getLogger("werkzeug").setLevel(logConfig.werkzeug_level.upper())
@@ -0,0 +1,192 @@
+import bisect
+import time
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock, local
+from typing import Callable, Dict, List, Tuple
+
+# Latency buckets in seconds, from sub-millisecond renders to slow printer sockets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+class Gauge:
+    """Value sampled from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.callback()}"
+        ]
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels (Prometheus semantics)"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the wrapped block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """(count, sum) per label set"""
+        with self._lock:
+            return {key: (int(sum(series[:-1])), series[-1]) for key, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on /api/metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(name, documentation, callback))
+
+    def histogram(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+SOURCE_JOB = "job"
+SOURCE_WARMUP = "warmup"
+
+_source = local()
+
+@contextmanager
+def render_source(source: str):
+    """Label renders in this thread with source (e.g. SOURCE_WARMUP) instead of SOURCE_JOB"""
+    previous = getattr(_source, "value", SOURCE_JOB)
+    _source.value = source
+    try:
+        yield
+    finally:
+        _source.value = previous
+
+def current_render_source() -> str:
+    return getattr(_source, "value", SOURCE_JOB)
+
+def timed(histogram: Histogram, **labels):
+    """Decorator that observes the call duration in the given histogram, callable label values are read per call"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start,
+                                  **{name: value() if callable(value) else value for name, value in labels.items()})
+        return wrapper
+    return decorator
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+http_request_seconds = metrics.histogram(
+    "hera_http_request_seconds", "HTTP request latency by route", ("method", "route", "status"))
+render_item_seconds = metrics.histogram(
+    "hera_render_item_seconds", "Time to render one layout item by type", ("item_type",))
+render_label_seconds = metrics.histogram(
+    "hera_render_label_seconds", "Time to render a whole label, warm-up renders have source=\"warmup\"", ("source",))
+db_query_seconds = metrics.histogram(
+    "hera_db_query_seconds", "SQLite statement time", ("operation",))
+printer_socket_seconds = metrics.histogram(
+    "hera_printer_socket_seconds", "Printer socket connect/send time", ("printer", "operation"))
+printer_bytes_total = metrics.counter(
+    "hera_printer_bytes_total", "Raster bytes sent to printers by encoding", ("printer", "encoding"))
+printer_errors_total = metrics.counter(
+    "hera_printer_errors_total", "Printer socket failures", ("printer", "operation"))
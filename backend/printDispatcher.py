@@ -0,0 +1,169 @@
+import heapq
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Dict, List, Tuple
+from backend.tscPrinterModule import printer_manager
+from backend.statusMonitor import printer_status_monitor
+from backend.eventBus import event_bus, EVENT_JOB
+from backend.requestProfiler import request_profiler
+from backend.tsplCommands import PrinterUnreachable
+
+logger = logging.getLogger(__name__)
+
+SLICE_SENT = "sent"
+SLICE_NOT_SENT = "not_sent"  # the printer could not be reached, no label of the slice went out
+SLICE_IN_DOUBT = "in_doubt"  # sending failed part way, some labels may have printed
+
+class DispatchResult:
+    """Outcome of one fanned-out job"""
+
+    def __init__(self):
+        self.printed: Dict[str, int] = {}  # printer ip -> labels sent
+        self.failed_printers: List[str] = []
+        self.unsent = 0     # labels no printer accepted
+        self.in_doubt = 0   # labels of slices that failed part way, never sent again
+
+    @property
+    def labels(self) -> int:
+        return sum(self.printed.values())
+
+    @property
+    def success(self) -> bool:
+        return self.unsent == 0 and self.in_doubt == 0
+
+class PrintDispatcher:
+    """
+    Splits a batch of labels across the printers of a group and sends to each in parallel
+
+    Labels are balanced by each printer's queue depth (labels handed to it and not yet
+    sent) so a busy printer gets a smaller share. Each printer receives one contiguous
+    slice, which keeps serial ranges contiguous per printer.
+    """
+
+    def __init__(self, manager=printer_manager, monitor=printer_status_monitor, bus=event_bus, max_workers: int = 16):
+        self.manager = manager
+        self.monitor = monitor
+        self.bus = bus
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="print-dispatch")
+        self._queued: Dict[str, int] = {}
+        self._lock = Lock()
+
+    def queue_depth(self, ip: str) -> int:
+        """Labels queued for a printer by running dispatches"""
+        with self._lock:
+            return self._queued.get(ip, 0)
+
+    def _add_queued(self, ip: str, labels: int):
+        with self._lock:
+            self._queued[ip] = max(0, self._queued.get(ip, 0) + labels)
+
+    def online_members(self, members: List[str]) -> List[str]:
+        """Members the status monitor reports online (unknown ones probed in parallel), in member order"""
+        statuses = self.monitor.get_statuses(members)
+        return [ip for ip in members if statuses[ip]["is_online"]]
+
+    def split(self, members: List[str], count: int) -> List[Tuple[str, int, int]]:
+        """(ip, offset, labels) slices of count labels, filling the least loaded printers first"""
+        if not members or count <= 0:
+            return []
+        shares = {ip: 0 for ip in members}
+        heap = [(self.queue_depth(ip), position, ip) for position, ip in enumerate(members)]
+        heapq.heapify(heap)
+        for _ in range(count):
+            load, position, ip = heapq.heappop(heap)
+            shares[ip] += 1
+            heapq.heappush(heap, (load + 1, position, ip))
+        slices, offset = [], 0
+        for ip in members:
+            if shares[ip]:
+                slices.append((ip, offset, shares[ip]))
+                offset += shares[ip]
+        return slices
+
+    def _send_slices(self, slices: List[Tuple[str, int, int]], send: Callable[[str, int, int], bool],
+                     job_id: str = None, total: int = 0) -> List[Tuple[Tuple[str, int, int], str]]:
+        """
+        Send slices with one worker per printer and return each slice with its outcome
+
+        A printer gets its slices one after the other, so two slices never share its
+        connection at once. After a failure its remaining slices are not attempted.
+        """
+        # Workers of a profiled request report their stages to it
+        send = request_profiler.bind(send)
+        by_printer: Dict[str, List[Tuple[str, int, int]]] = {}
+        for entry in slices:
+            by_printer.setdefault(entry[0], []).append(entry)
+
+        def send_one(ip: str, offset: int, labels: int) -> str:
+            outcome = SLICE_IN_DOUBT
+            try:
+                outcome = SLICE_SENT if send(ip, offset, labels) else SLICE_IN_DOUBT
+            except PrinterUnreachable as e:
+                logger.warning("Dispatch to %s failed before sending: %s", ip, e)
+                outcome = SLICE_NOT_SENT
+            except Exception as e:
+                logger.error("Dispatch to %s failed: %s", ip, e)
+            finally:
+                self._add_queued(ip, -labels)
+                if job_id:
+                    self.bus.publish(EVENT_JOB, job=job_id, state="progress", printer=ip,
+                                     offset=offset, labels=labels, ok=outcome == SLICE_SENT, total=total)
+            return outcome
+
+        def run(entries: List[Tuple[str, int, int]]) -> List[str]:
+            outcomes = []
+            for ip, offset, labels in entries:
+                if outcomes and outcomes[-1] != SLICE_SENT:
+                    self._add_queued(ip, -labels)
+                    outcomes.append(SLICE_NOT_SENT)
+                else:
+                    outcomes.append(send_one(ip, offset, labels))
+            return outcomes
+
+        for ip, _, labels in slices:
+            self._add_queued(ip, labels)
+        futures = {ip: self.executor.submit(run, entries) for ip, entries in by_printer.items()}
+        outcomes = {ip: iter(future.result()) for ip, future in futures.items()}
+        return [(entry, next(outcomes[entry[0]])) for entry in slices]
+
+    def dispatch(self, members: List[str], count: int, send: Callable[[str, int, int], bool], job_id: str = None) -> DispatchResult:
+        """
+        Send count labels across members with send(ip, offset, labels)
+
+        With a job_id, every finished slice is published as a job progress event.
+
+        A slice whose printer could not be reached is split again across the printers
+        that succeeded, once. A slice that failed part way may have printed some labels
+        and is reported in DispatchResult.in_doubt instead of being sent again, so
+        serials are never printed twice; whatever is still unsent is in unsent.
+        """
+        result = DispatchResult()
+        pending = self.split(members, count)
+        for attempt in range(2):
+            retry = []
+            for (ip, offset, labels), outcome in self._send_slices(pending, send, job_id, count):
+                if outcome == SLICE_SENT:
+                    result.printed[ip] = result.printed.get(ip, 0) + labels
+                    continue
+                if ip not in result.failed_printers:
+                    result.failed_printers.append(ip)
+                if outcome == SLICE_NOT_SENT:
+                    retry.append((offset, labels))
+                else:
+                    result.in_doubt += labels
+            if not retry:
+                return result
+            healthy = [ip for ip in members if ip not in result.failed_printers]
+            if attempt == 1 or not healthy:
+                result.unsent = sum(labels for _, labels in retry)
+                return result
+            logger.warning("Re-dispatching %d labels from %s to %s", sum(labels for _, labels in retry),
+                           ", ".join(result.failed_printers), ", ".join(healthy))
+            pending = []
+            for offset, labels in retry:
+                pending.extend((ip, offset + sub_offset, sub_labels) for ip, sub_offset, sub_labels in self.split(healthy, labels))
+        return result
+
+# Global print dispatcher
+print_dispatcher = PrintDispatcher()
@@ -0,0 +1,135 @@
+import asyncio
+import ipaddress
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+from backend.configModule import DiscoveryConfig
+from backend.tsplCommands import STATUS_QUERY
+
+logger = logging.getLogger(__name__)
+
+MODEL_QUERY = b"~!T"  # answers the model name, e.g. "TE310"
+
+# TSC model numbers encode the resolution in their first digit: TE210 / TTP-244 are 203 dpi,
+# TE310 / TTP-344 300 dpi, TX600 600 dpi
+MODEL_DPI_PATTERN = re.compile(r"(\d)\d{2,3}")
+MODEL_DPI = {"2": 203, "3": 300, "6": 600}
+
+class DiscoveryError(ValueError):
+    """Scan range that cannot or should not be swept"""
+
+def dpi_from_model(model: Optional[str]) -> Optional[int]:
+    """Resolution implied by a TSC model name, None when the name doesn't tell"""
+    match = MODEL_DPI_PATTERN.search(model or "")
+    return MODEL_DPI.get(match.group(1)) if match else None
+
+def scan_hosts(cidr: str, max_hosts: int) -> List[str]:
+    """Host addresses of a CIDR range (a single address is a range of one)"""
+    try:
+        network = ipaddress.ip_network(cidr, strict=False)
+    except ValueError as e:
+        raise DiscoveryError(f"Invalid CIDR range: {e}")
+    if network.num_addresses > max_hosts + 2:
+        raise DiscoveryError(f"{cidr} has {network.num_addresses} addresses, at most {max_hosts} can be scanned")
+    hosts = [str(host) for host in network.hosts()]
+    return hosts or [str(network.network_address)]
+
+async def _read_reply(reader: asyncio.StreamReader, limit: int) -> bytes:
+    """First line of a reply, never more than limit bytes whatever the device keeps sending"""
+    reply = b""
+    while len(reply) < limit and b"\n" not in reply:
+        chunk = await reader.read(limit - len(reply))
+        if not chunk:
+            break
+        reply += chunk
+    return reply.split(b"\n", 1)[0]
+
+async def _query(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, query: bytes, timeout: float,
+                 limit: int = 1) -> Optional[bytes]:
+    writer.write(query)
+    await writer.drain()
+    try:
+        if query == STATUS_QUERY:
+            return await asyncio.wait_for(reader.readexactly(1), timeout)
+        return await asyncio.wait_for(_read_reply(reader, limit), timeout)
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+        return None
+
+async def probe_printer(ip: str, port: int, connect_timeout: float, reply_timeout: float,
+                        max_reply_bytes: int = 64) -> Optional[Dict[str, Any]]:
+    """Printer found at ip:port with whatever it reports about itself, None when the port is closed"""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), connect_timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    printer = {"ip": ip, "port": port, "model": None, "dpi": None, "status": None, "tspl": False}
+    try:
+        status = await _query(reader, writer, STATUS_QUERY, reply_timeout)
+        if status is not None:
+            # Anything listening on 9100 accepts the connection, a status byte means it speaks TSPL
+            printer["tspl"] = True
+            printer["status"] = status[0]
+            model = await _query(reader, writer, MODEL_QUERY, reply_timeout, max_reply_bytes)
+            if model:
+                printer["model"] = model.decode("ascii", errors="ignore").strip() or None
+                printer["dpi"] = dpi_from_model(printer["model"])
+    except OSError as e:
+        logger.debug("Discovery probe of %s failed after connect: %s", ip, e)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    return printer
+
+async def sweep(hosts: List[str], port: int, concurrency: int, connect_timeout: float, reply_timeout: float,
+                deadline: float, max_reply_bytes: int = 64) -> Dict[str, Any]:
+    """Probe hosts with at most concurrency connections in flight, stopping at the deadline"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(ip: str) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            return await probe_printer(ip, port, connect_timeout, reply_timeout, max_reply_bytes)
+
+    tasks = [asyncio.ensure_future(limited(ip)) for ip in hosts]
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    found = [task.result() for task in tasks if task in done and not task.cancelled() and task.result()]
+    return {"found": found, "scanned": len(done), "unfinished": len(pending)}
+
+def discover_printers(cidr: str, port: int = 9100, deadline: float = None) -> Dict[str, Any]:
+    """
+    Sweep a CIDR range for TSPL printers
+
+    Returns {"cidr", "scanned", "unfinished", "seconds", "printers"}; hosts still pending at the
+    deadline are counted as unfinished instead of holding up the result.
+    """
+    if not 1 <= port <= 65535:
+        raise DiscoveryError(f"Invalid port: {port}, must be between 1 and 65535")
+    discoveryConfig = DiscoveryConfig()
+    hosts = scan_hosts(cidr, discoveryConfig.max_hosts)
+    start = time.perf_counter()
+    result = asyncio.run(sweep(
+        hosts, port,
+        discoveryConfig.concurrency,
+        discoveryConfig.connect_timeout,
+        discoveryConfig.reply_timeout,
+        deadline or discoveryConfig.deadline,
+        discoveryConfig.max_reply_bytes
+    ))
+    printers = sorted(result["found"], key=lambda printer: ipaddress.ip_address(printer["ip"]))
+    seconds = time.perf_counter() - start
+    logger.info("Discovery of %s: %d printers in %d hosts (%d unfinished) in %.2f s",
+                cidr, len(printers), result["scanned"], result["unfinished"], seconds)
+    return {
+        "cidr": cidr,
+        "scanned": result["scanned"],
+        "unfinished": result["unfinished"],
+        "seconds": round(seconds, 3),
+        "printers": printers
+    }
@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from backend.databaseModule.assets import asset_id_from_reference
+
+PRINTER_FIELDS = ("ip", "name", "dpi", "width", "height")
+NUMERIC_FIELDS = ("dpi", "width", "height")
+
+class PrinterImportError(ValueError):
+    """Import document that cannot be read at all (as opposed to single bad rows)"""
+
+def printers_to_csv(printers: List[Dict[str, Any]]) -> str:
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=PRINTER_FIELDS, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(printers)
+    return output.getvalue()
+
+def parse_printers_csv(text: str) -> List[Dict[str, Any]]:
+    """Rows of a CSV file with an ip,name,dpi,width,height header (column order is free)"""
+    reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+    missing = [field for field in PRINTER_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        raise PrinterImportError(f"CSV header is missing: {', '.join(missing)}")
+    return [dict(row) for row in reader]
+
+def layout_asset_ids(settings_data: Dict[str, Any]) -> List[str]:
+    """Asset ids referenced by the icons of a layout"""
+    ids = []
+    for icon_item in settings_data.get("iconItems", []):
+        asset_id = icon_item.get("assetId") or asset_id_from_reference(icon_item.get("iconFile") or "")
+        if asset_id and asset_id not in ids:
+            ids.append(asset_id)
+    return ids
+
+def _printer_row(row: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    if not isinstance(row, dict):
+        return None, "Row must be an object"
+    printer = {}
+    for field in PRINTER_FIELDS:
+        value = row.get(field)
+        value = value.strip() if isinstance(value, str) else value
+        if value in (None, ""):
+            return None, f"Missing {field}"
+        if field in NUMERIC_FIELDS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                return None, f"{field} must be an integer"
+            if value <= 0:
+                return None, f"{field} must be positive"
+        else:
+            value = str(value)
+        printer[field] = value
+    return printer, None
+
+def _compile_layout(printer: Dict[str, Any], settings_data: Any, asset_store) -> Dict[str, Any]:
+    from backend.layoutCompiler import LayoutCompiler, LayoutError
+    if isinstance(settings_data, str):
+        try:
+            settings_data = json.loads(settings_data)
+        except ValueError:
+            raise LayoutError(["Layout is not valid JSON"])
+    if not isinstance(settings_data, dict):
+        raise LayoutError(["Layout must be an object"])
+    settings_data = dict(settings_data)
+    settings_data["iconItems"] = asset_store.externalize_icon_items(settings_data.get("iconItems", []))
+    # Geometry in the file is never trusted, every layout is checked against the printer it lands on
+    return LayoutCompiler(printer["width"], printer["height"], printer["dpi"], asset_store).compile(settings_data)
+
+def validate_printers(rows: List[Any], asset_store) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str, str]], List[Dict[str, Any]]]:
+    """
+    Check import rows one by one
+
+    Nothing is written: pass a StagedAssets as asset_store and commit its rows together with
+    the printers. Returns (printers, layouts as (printer ip, name, settings JSON), errors). A row with an
+    error is left out together with its layouts; errors carry the 1-based row number.
+    """
+    from backend.layoutCompiler import LayoutError
+    printers, layouts, errors = [], [], []
+    seen: Dict[str, int] = {}
+    for number, row in enumerate(rows, start=1):
+        printer, error = _printer_row(row)
+        if printer and printer["ip"] in seen:
+            error = f"Duplicate IP, already in row {seen[printer['ip']]}"
+        if error:
+            errors.append({"row": number, "ip": row.get("ip") if isinstance(row, dict) else None, "error": error})
+            continue
+        seen[printer["ip"]] = number
+
+        row_layouts = row.get("layouts") or {}
+        if not isinstance(row_layouts, dict):
+            errors.append({"row": number, "ip": printer["ip"], "error": "layouts must be an object of name -> layout"})
+            continue
+        compiled, layout_errors = [], []
+        for name, settings_data in row_layouts.items():
+            try:
+                compiled.append((printer["ip"], str(name), json.dumps(_compile_layout(printer, settings_data, asset_store))))
+            except LayoutError as e:
+                layout_errors.append(f"layout {name}: {'; '.join(e.problems)}")
+        if layout_errors:
+            errors.append({"row": number, "ip": printer["ip"], "error": "Invalid " + "; ".join(layout_errors)})
+            continue
+        printers.append(printer)
+        layouts.extend(compiled)
+    return printers, layouts, errors
@@ -0,0 +1,121 @@
+from typing import Optional, Tuple
+from PIL import Image, ImageChops, ImageOps
+from backend.configModule import RenderConfig
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the Pillow backend covers everything
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+
+COMPOSITE_REPLACE = "replace"  # tile pixels overwrite the label (Image.paste semantics)
+COMPOSITE_OR = "or"            # black pixels of tile and label are combined
+
+# Pixel value -> binary digit; values below 128 are black, as in Pillow's 1-bit conversion
+_WHITE_DIGITS = bytes(ord("0") if value < 128 else ord("1") for value in range(256))
+_BLACK_DIGITS = bytes(ord("1") if value < 128 else ord("0") for value in range(256))
+
+def _pad_mask(width: int) -> int:
+    """Bits of the last byte in a packed row that lie past the image width"""
+    return (1 << (8 - width % 8)) - 1 if width % 8 else 0
+
+class PillowRaster:
+    """Raster operations on a LabelBuffer using Pillow and the standard library only"""
+
+    name = "pillow"
+
+    def paste(self, label_buffer, tile: Image.Image, x: int, y: int, composite: str = COMPOSITE_REPLACE):
+        """Composite a 1-bit tile into the label at (x, y)"""
+        if composite == COMPOSITE_OR:
+            box = (x, y, x + tile.width, y + tile.height)
+            region = label_buffer.image.crop(box)
+            # 0 is black, so the darker pixel is the union of ink
+            label_buffer.image.paste(ImageChops.darker(region, tile.convert("L")), box)
+        else:
+            label_buffer.image.paste(tile, (x, y))
+
+    def pack_rows(self, label_buffer, box: Tuple[int, int, int, int] = None, invert: bool = False) -> bytes:
+        """Rows packed MSB first; 1 = white unless invert (for printers where 1 = black)"""
+        # Read straight from the pooled bytearray: pixels become "0"/"1" digits and one
+        # int() parse packs them, no intermediate image per label
+        width = label_buffer.width_px
+        left, top, right, bottom = box if box is not None else (0, 0, width, label_buffer.height_px)
+        pad = -(right - left) % 8
+        if left == 0 and right == width and not pad:
+            pixels = label_buffer.data[top * width:bottom * width]
+        else:
+            # Padding pixels past the right edge are white, not printed dots
+            padding = b"\xff" * pad
+            data = memoryview(label_buffer.data)
+            pixels = padding.join(data[row + left:row + right] for row in range(top * width, bottom * width, width))
+            pixels += padding
+        digits = pixels.translate(_BLACK_DIGITS if invert else _WHITE_DIGITS)
+        length = len(digits) // 8
+        return int(digits, 2).to_bytes(length, "big") if length else b""
+
+    def content_bounds(self, label_buffer) -> Optional[Tuple[int, int, int, int]]:
+        """(left, top, right, bottom) of all black pixels, None for a blank label"""
+        return ImageOps.invert(label_buffer.image).getbbox()
+
+class NumpyRaster:
+    """Vectorized raster operations on a LabelBuffer's pixels"""
+
+    name = "numpy"
+
+    def as_array(self, label_buffer):
+        """(height, width) uint8 copy of the label buffer"""
+        return np.asarray(label_buffer.image)
+
+    def paste(self, label_buffer, tile: Image.Image, x: int, y: int, composite: str = COMPOSITE_REPLACE):
+        """Composite a 1-bit tile into the label at (x, y), clipped to the label"""
+        width, height = label_buffer.size
+        left, top = max(x, 0), max(y, 0)
+        right, bottom = min(x + tile.width, width), min(y + tile.height, height)
+        if left >= right or top >= bottom:
+            return
+        source = np.asarray(tile.convert("L"), dtype=np.uint8)[top - y:bottom - y, left - x:right - x]
+        if composite == COMPOSITE_OR:
+            # 0/255 pixels: AND keeps black wherever either side is black
+            source = np.bitwise_and(np.asarray(label_buffer.image.crop((left, top, right, bottom))), source)
+        label_buffer.image.paste(Image.fromarray(source), (left, top))
+
+    def pack_rows(self, label_buffer, box: Tuple[int, int, int, int] = None, invert: bool = False) -> bytes:
+        """Rows packed MSB first; 1 = white unless invert (for printers where 1 = black)"""
+        pixels = self.as_array(label_buffer)
+        if box is not None:
+            left, top, right, bottom = box
+            pixels = pixels[top:bottom, left:right]
+        bits = pixels == 0 if invert else pixels != 0
+        packed = np.packbits(bits, axis=1)
+        pad_mask = _pad_mask(pixels.shape[1])
+        if pad_mask and not invert:
+            # Padding bits past the right edge must be white, not printed dots
+            packed[:, -1] |= pad_mask
+        return packed.tobytes()
+
+    def content_bounds(self, label_buffer) -> Optional[Tuple[int, int, int, int]]:
+        """(left, top, right, bottom) of all black pixels, None for a blank label"""
+        ink = self.as_array(label_buffer) == 0
+        rows = np.flatnonzero(ink.any(axis=1))
+        if rows.size == 0:
+            return None
+        columns = np.flatnonzero(ink.any(axis=0))
+        return int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1
+
+_backends = {}
+
+def get_raster_backend(name: str = None):
+    """
+    Raster backend by name: 'numpy', 'pillow' or 'auto' (NumPy when installed)
+
+    Falls back to Pillow when NumPy is requested but not installed.
+    """
+    name = name or RenderConfig().raster_backend
+    if name == "auto":
+        name = "numpy" if NUMPY_AVAILABLE else "pillow"
+    if name == "numpy" and not NUMPY_AVAILABLE:
+        name = "pillow"
+    if name not in _backends:
+        _backends[name] = NumpyRaster() if name == "numpy" else PillowRaster()
+    return _backends[name]
@@ -0,0 +1,77 @@
+import zlib
+from io import BytesIO
+from typing import Iterable, List, Optional
+from backend.requestProfiler import profile_stage, STAGE_ENCODE
+
+ENCODING_RAW = "raw"    # BITMAP x,y,w,h,0,<packed rows>
+ENCODING_ZLIB = "zlib"  # BITMAP x,y,w,h,3,<length>,<zlib stream> (TSPL2 firmware with compressed bitmap support)
+ENCODING_PCX = "pcx"    # DOWNLOAD "LABEL.PCX" (RLE) + PUTPCX x,y
+ENCODINGS = (ENCODING_RAW, ENCODING_ZLIB, ENCODING_PCX)
+
+PCX_FILENAME = "LABEL.PCX"
+
+class EncodedRaster:
+    """
+    TSPL for one label image
+
+    preamble is sent before SIZE/CLS (file downloads), body is placed after CLS.
+    """
+
+    def __init__(self, encoding: str, preamble: bytes, body: bytes):
+        self.encoding = encoding
+        self.preamble = preamble
+        self.body = body
+
+    def __len__(self) -> int:
+        return len(self.preamble) + len(self.body)
+
+def _encode_raw(x: int, y: int, row_bytes: int, height: int, data: bytes) -> EncodedRaster:
+    header = f"BITMAP {x},{y},{row_bytes},{height},0,".encode("ascii")
+    return EncodedRaster(ENCODING_RAW, b"", header + data + b"\n")
+
+def _encode_zlib(x: int, y: int, row_bytes: int, height: int, data: bytes) -> EncodedRaster:
+    compressed = zlib.compress(data, 6)
+    header = f"BITMAP {x},{y},{row_bytes},{height},3,{len(compressed)},".encode("ascii")
+    return EncodedRaster(ENCODING_ZLIB, b"", header + compressed + b"\n")
+
+def pcx_file(row_bytes: int, height: int, data: bytes) -> bytes:
+    """1-bit PCX file of packed rows, for DOWNLOAD + PUTPCX"""
+    # PCX run-length encodes each scanline, long white runs collapse to 2 bytes per 63
+    from PIL import Image  # Pillow loads with the first render, not at startup
+    img = Image.frombytes("1", (row_bytes * 8, height), data)
+    buffer = BytesIO()
+    img.save(buffer, format="PCX")
+    return buffer.getvalue()
+
+def _encode_pcx(x: int, y: int, row_bytes: int, height: int, data: bytes) -> EncodedRaster:
+    pcx = pcx_file(row_bytes, height, data)
+    preamble = f'DOWNLOAD "{PCX_FILENAME}",{len(pcx)},'.encode("ascii") + pcx + b"\n"
+    return EncodedRaster(ENCODING_PCX, preamble, f'PUTPCX {x},{y},"{PCX_FILENAME}"\n'.encode("ascii"))
+
+_encoders = {
+    ENCODING_RAW: _encode_raw,
+    ENCODING_ZLIB: _encode_zlib,
+    ENCODING_PCX: _encode_pcx,
+}
+
+@profile_stage(STAGE_ENCODE)
+def encode_region(x: int, y: int, row_bytes: int, height: int, data: bytes, encodings: Iterable[str] = (ENCODING_RAW,)) -> Optional[EncodedRaster]:
+    """
+    Encode a packed region with every allowed encoding and keep the smallest
+
+    Raw is always a candidate so there is a fallback when the others fail or grow the data.
+    Returns None for an empty region.
+    """
+    if not height or not row_bytes:
+        return None
+    candidates: List[EncodedRaster] = []
+    for encoding in dict.fromkeys([ENCODING_RAW, *encodings]):
+        encoder = _encoders.get(encoding)
+        if encoder is None:
+            continue
+        try:
+            candidates.append(encoder(x, y, row_bytes, height, data))
+        except Exception:
+            if encoding == ENCODING_RAW:
+                raise
+    return min(candidates, key=len)
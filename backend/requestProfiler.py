@@ -0,0 +1,404 @@
+import io
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import wraps
+from typing import Any, Dict, List, Optional
+from backend.configModule import ProfilingConfig
+
+logger = logging.getLogger(__name__)
+
+STAGE_DB = "db"          # DatabaseModule statements (printers.py, printJobs.py, ...)
+STAGE_RENDER = "render"  # BitmapGenerator label renders
+STAGE_ENCODE = "encode"  # raster encoding of packed regions
+STAGE_SEND = "send"      # printer manager calls, including the wait for the printer's lock
+STAGES = (STAGE_DB, STAGE_RENDER, STAGE_ENCODE, STAGE_SEND)
+
+MODE_CPROFILE = "cprofile"  # deterministic, every call of the request thread
+MODE_SAMPLE = "sample"      # stack samples of the request and its dispatch threads, for flame graphs
+MODES = (MODE_CPROFILE, MODE_SAMPLE)
+
+SESSION_ARMED = "armed"
+SESSION_DONE = "done"
+SESSION_CANCELLED = "cancelled"
+SESSION_EXPIRED = "expired"
+
+class _Local(threading.local):
+    state = None  # _ThreadState while the thread works for a profiled request
+
+_local = _Local()
+# cProfile hooks the interpreter, only one capture can use it at a time (one at all from Python 3.12)
+_cprofile_lock = threading.Lock()
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+class _Span:
+    def __init__(self, state: "_ThreadState", stage: str):
+        self.state = state
+        self.stage = stage
+        self.entry = None
+
+    def __enter__(self):
+        stack = self.state.stack
+        # A stage inside the same stage (render_regions -> render_frontend_data) is counted once
+        if not stack or stack[-1][0] != self.stage:
+            self.entry = [self.stage, time.perf_counter(), 0.0]
+            stack.append(self.entry)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.entry is not None:
+            stack = self.state.stack
+            stack.pop()
+            elapsed = time.perf_counter() - self.entry[1]
+            if stack:
+                stack[-1][2] += elapsed
+            self.state.capture.add_span(self.stage, elapsed, elapsed - self.entry[2])
+        return False
+
+class _ThreadState:
+    """A thread working for a profiled request, with its open stage spans"""
+
+    def __init__(self, capture: "RequestCapture"):
+        self.capture = capture
+        self.stack: List[list] = []  # [stage, start, seconds of nested stages]
+
+class RequestCapture:
+    """Profile of one request: stage times, and its cProfile or stack samples"""
+
+    def __init__(self, session: "ProfileSession", method: str, route: str, path: str):
+        self.session = session
+        self.method = method
+        self.route = route
+        self.path = path
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.status = None
+        self.stages: Dict[str, List[float]] = {}  # stage -> [spans, seconds, self seconds]
+        self.profile = None
+        self._lock = threading.Lock()
+
+    def add_span(self, stage: str, seconds: float, own: float):
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += own
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {stage: {"spans": spans, "ms": round(seconds * 1000, 2), "self_ms": round(own * 1000, 2)}
+                      for stage, (spans, seconds, own) in self.stages.items()}
+        return {
+            "method": self.method,
+            "route": self.route,
+            "path": self.path,
+            "status": self.status,
+            "ms": round(self.seconds * 1000, 2) if self.seconds is not None else None,
+            "stages": stages
+        }
+
+class ProfileSession:
+    """The next `requests` requests of a route (optionally of one job) profiled in one mode"""
+
+    def __init__(self, route: str, requests: int, mode: str, method: Optional[str], job: Optional[str],
+                 interval: float, expires_in: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.route = route
+        self.requests = requests
+        self.mode = mode
+        self.method = method
+        self.job = job
+        self.interval = interval
+        self.created = time.time()
+        self.expires = time.monotonic() + expires_in
+        self.state = SESSION_ARMED
+        self.started = 0  # requests picked up, finished or not
+        self.captures: List[RequestCapture] = []
+        self.stats = None  # pstats.Stats of every finished cProfile capture
+        self.samples: Counter = Counter()  # collapsed stack -> samples
+        self.skipped = 0  # matching requests not profiled because cProfile was busy
+
+    def matches(self, method: str, route: str, view_args: Dict[str, Any]) -> bool:
+        if self.state != SESSION_ARMED or self.started >= self.requests or route != self.route:
+            return False
+        if self.method and method != self.method:
+            return False
+        return not self.job or str((view_args or {}).get("job_id")) == self.job
+
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        totals: Dict[str, Dict[str, float]] = {}
+        for capture in self.captures:
+            for stage, entry in capture.summary()["stages"].items():
+                total = totals.setdefault(stage, {"spans": 0, "ms": 0.0, "self_ms": 0.0})
+                for key in total:
+                    total[key] = round(total[key] + entry[key], 2)
+        return totals
+
+    def summary(self, with_requests: bool = False) -> Dict[str, Any]:
+        summary = {
+            "id": self.id,
+            "state": self.state,
+            "route": self.route,
+            "method": self.method,
+            "job": self.job,
+            "mode": self.mode,
+            "requests": self.requests,
+            "profiled": len(self.captures),
+            "skipped": self.skipped,
+            "created": self.created,
+            "stages": self.stage_totals(),
+        }
+        if self.mode == MODE_SAMPLE:
+            summary["interval_ms"] = round(self.interval * 1000, 2)
+            summary["samples"] = sum(self.samples.values())
+        if with_requests:
+            summary["captures"] = [capture.summary() for capture in self.captures]
+        return summary
+
+def _frame_name(code) -> str:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+class RequestProfiler:
+    """
+    Profiles the next N requests of a route on demand, from the admin API
+
+    Off, the per-request cost is one check of the armed sessions and a stage span is a
+    thread-local lookup. A profiled request runs under cProfile (its thread only) or is
+    sampled every few milliseconds together with the dispatch threads working for it.
+    Both record how long the request spent in the db, render, encode and send stages;
+    samples carry their stage as the first frame of the collapsed stack.
+    """
+
+    def __init__(self):
+        self.config = ProfilingConfig()
+        self.sessions: Dict[str, ProfileSession] = {}
+        self._armed: List[ProfileSession] = []
+        self._threads: Dict[int, _ThreadState] = {}  # thread id -> state, what the sampler reads
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    def arm(self, route: str, requests: int = 1, mode: str = MODE_CPROFILE, method: str = None, job: str = None,
+            interval_ms: float = None) -> ProfileSession:
+        """Profile the next requests of route; raises ValueError for bad arguments"""
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if not route or not route.startswith("/"):
+            raise ValueError("route must be a URL rule such as /api/printer/print")
+        if not 1 <= requests <= self.config.max_requests:
+            raise ValueError(f"requests must be between 1 and {self.config.max_requests}")
+        interval = (interval_ms or self.config.sample_interval_ms) / 1000
+        if interval < self.config.min_sample_interval_ms / 1000:
+            raise ValueError(f"interval_ms must be at least {self.config.min_sample_interval_ms}")
+        session = ProfileSession(route, requests, mode, method.upper() if method else None, job, interval,
+                                 self.config.armed_timeout)
+        with self._lock:
+            self._expire()
+            self.sessions[session.id] = session
+            self._armed.append(session)
+            # Forget the oldest finished sessions
+            finished = [key for key, old in self.sessions.items() if old.state != SESSION_ARMED]
+            for key in finished[:max(0, len(self.sessions) - self.config.keep_sessions)]:
+                del self.sessions[key]
+            if mode == MODE_SAMPLE and self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                self._sampler.start()
+        logger.info("Profiling the next %d %s requests of %s (%s)", requests, method or "", route, mode)
+        return session
+
+    def cancel(self, session_id: str) -> Optional[ProfileSession]:
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None and session.state == SESSION_ARMED:
+                session.state = SESSION_CANCELLED
+                self._armed.remove(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[ProfileSession]:
+        with self._lock:
+            return self.sessions.get(session_id)
+
+    def list_sessions(self) -> List[ProfileSession]:
+        with self._lock:
+            self._expire()
+            return list(self.sessions.values())
+
+    def _expire(self):
+        now = time.monotonic()
+        for session in [session for session in self._armed if session.expires < now]:
+            session.state = SESSION_EXPIRED
+            self._armed.remove(session)
+
+    # Request hooks
+
+    def start_request(self, method: str, route: str, path: str, view_args: Dict[str, Any] = None) -> Optional[RequestCapture]:
+        """Called before every request, starts a capture when an armed session wants this one"""
+        if not self._armed:
+            return None
+        with self._lock:
+            session = next((session for session in self._armed if session.matches(method, route, view_args)), None)
+            if session is None:
+                return None
+            if session.mode == MODE_CPROFILE and not _cprofile_lock.acquire(blocking=False):
+                session.skipped += 1
+                return None
+            session.started += 1
+        capture = RequestCapture(session, method, route, path)
+        if session.mode == MODE_CPROFILE:
+            import cProfile
+            capture.profile = cProfile.Profile()
+            try:
+                capture.profile.enable()
+            except ValueError as e:  # a debugger or coverage tool holds the profiling hook
+                logger.warning("cProfile unavailable, profiling %s with stage times only: %s", route, e)
+                capture.profile = None
+                _cprofile_lock.release()
+        self._activate(capture)
+        return capture
+
+    def finish_request(self, capture: Optional[RequestCapture], status: Optional[int]):
+        """Called when the request is torn down, also after errors"""
+        if capture is None:
+            return
+        session = capture.session
+        if capture.profile is not None:
+            capture.profile.disable()
+            _cprofile_lock.release()
+        capture.seconds = time.perf_counter() - capture.started
+        capture.status = status
+        self._deactivate()
+        with self._lock:
+            if capture.profile is not None:
+                import pstats
+                if session.stats is None:
+                    session.stats = pstats.Stats(capture.profile, stream=io.StringIO())
+                else:
+                    session.stats.add(capture.profile)
+                capture.profile = None
+            session.captures.append(capture)
+            if len(session.captures) >= session.requests and session.state == SESSION_ARMED:
+                session.state = SESSION_DONE
+                self._armed.remove(session)
+        if session.state == SESSION_DONE:
+            logger.info("Profile %s of %s finished: %s", session.id, session.route, session.stage_totals())
+
+    def bind(self, func):
+        """func that, run on another thread, works for the caller's profiled request (dispatch workers)"""
+        state = _local.state
+        if state is None:
+            return func
+        capture = state.capture
+
+        @wraps(func)
+        def bound(*args, **kwargs):
+            self._activate(capture)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._deactivate()
+        return bound
+
+    def _activate(self, capture: RequestCapture):
+        state = _ThreadState(capture)
+        _local.state = state
+        with self._lock:
+            self._threads[threading.get_ident()] = state
+
+    def _deactivate(self):
+        _local.state = None
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    # Sampling
+
+    def _sample_loop(self):
+        """Runs while any sample session is armed or still being captured"""
+        while True:
+            with self._lock:
+                self._expire()
+                threads = [(ident, state) for ident, state in self._threads.items() if state.capture.session.mode == MODE_SAMPLE]
+                waiting = [session for session in self._armed if session.mode == MODE_SAMPLE]
+                if not threads and not waiting:
+                    self._sampler = None
+                    return
+            interval = min([session.interval for session in waiting] +
+                           [state.capture.session.interval for _, state in threads])
+            if threads:
+                frames = sys._current_frames()
+                for ident, state in threads:
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self._sample(state, frame)
+            time.sleep(interval)
+
+    def _sample(self, state: _ThreadState, frame):
+        names = []
+        while frame is not None and len(names) < self.config.max_stack_depth:
+            names.append(_frame_name(frame.f_code))
+            frame = frame.f_back
+        stage = state.stack[-1][0] if state.stack else "other"
+        capture = state.capture
+        stack = ";".join([f"{capture.method} {capture.route}", f"[{stage}]", *reversed(names)])
+        with self._lock:
+            capture.session.samples[stack] += 1
+
+    # Reports
+
+    def pstats_text(self, session: ProfileSession, sort: str = "cumulative", limit: int = 40) -> str:
+        """pstats report sorted by sort; raises ValueError for a sort key pstats doesn't know"""
+        import pstats
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            raise ValueError(f"sort must be one of {', '.join(sorted(pstats.Stats.sort_arg_dict_default))}")
+        if session.stats is None:
+            return "No cProfile data: no request finished yet, or the session samples stacks\n"
+        output = io.StringIO()
+        with self._lock:
+            session.stats.stream = output
+            session.stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def pstats_dump(self, session: ProfileSession) -> Optional[bytes]:
+        """Stats in the marshal format of pstats.dump_stats, for snakeviz or gprof2dot"""
+        if session.stats is None:
+            return None
+        import marshal
+        with self._lock:
+            return marshal.dumps(session.stats.stats)
+
+    def collapsed(self, session: ProfileSession) -> str:
+        """Samples as collapsed stacks ("frame;frame;frame count"), the input of flamegraph.pl and speedscope"""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in session.samples.most_common())
+
+def profile_stage(stage: str):
+    """Decorator tagging a function's time with a stage for profiled requests"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            state = _local.state
+            if state is None:
+                return func(*args, **kwargs)
+            with _Span(state, stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def stage_span(stage: str):
+    """Context manager tagging a block's time with a stage for profiled requests"""
+    state = _local.state
+    return _NO_SPAN if state is None else _Span(state, stage)
+
+# Global request profiler
+request_profiler = RequestProfiler()
@@ -0,0 +1,131 @@
+import importlib.abc
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+from backend.configModule import StartupConfig
+
+logger = logging.getLogger(__name__)
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps the real loader of a module and records how long executing it took"""
+
+    def __init__(self, loader, profile: "StartupProfile"):
+        self.loader = loader
+        self.profile = profile
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.profile._import_started()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profile._import_finished(module.__name__)
+
+    def __getattr__(self, name):
+        # get_resource_reader, is_package... are answered by the real loader
+        return getattr(self.loader, name)
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    def __init__(self, profile: "StartupProfile"):
+        self.profile = profile
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self.profile)
+                return spec
+        return None
+
+class StartupProfile:
+    """
+    Optional report of where startup time goes (HERA_STARTUP_PROFILE=1)
+
+    Records the self and cumulative time of every module imported after install(),
+    named startup phases and the time until the first request was answered. Disabled,
+    phase() and first_request() cost a flag check.
+    """
+
+    def __init__(self):
+        self.enabled = StartupConfig().profile
+        self.started = time.perf_counter()
+        self.imports: Dict[str, List[float]] = {}  # module -> [self seconds, cumulative seconds]
+        self.phases: List[tuple] = []
+        self.first_request_seconds = None
+        self._local = threading.local()  # per thread stack of [start, seconds spent in nested imports]
+
+    def install(self):
+        """Time the imports that follow, call before the application modules are imported"""
+        if self.enabled and not any(isinstance(finder, _ImportTimer) for finder in sys.meta_path):
+            sys.meta_path.insert(0, _ImportTimer(self))
+
+    def uninstall(self):
+        sys.meta_path[:] = [finder for finder in sys.meta_path if not isinstance(finder, _ImportTimer)]
+
+    def _import_stack(self) -> List[List[float]]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _import_started(self):
+        self._import_stack().append([time.perf_counter(), 0.0])
+
+    def _import_finished(self, name: str):
+        stack = self._import_stack()
+        start, nested = stack.pop()
+        cumulative = time.perf_counter() - start
+        self.imports[name] = [cumulative - nested, cumulative]
+        if stack:
+            stack[-1][1] += cumulative
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def first_request(self):
+        """Called after every response, reports once when the first one is out"""
+        if self.enabled and self.first_request_seconds is None:
+            self.first_request_seconds = time.perf_counter() - self.started
+            self.uninstall()
+            self.log_report()
+
+    def report(self, top: int = None) -> Dict[str, Any]:
+        top = top or StartupConfig().report_top
+        slowest = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        return {
+            "imports": len(self.imports),
+            "slowest_imports": [
+                {"module": name, "self_ms": round(own * 1000, 1), "cumulative_ms": round(cumulative * 1000, 1)}
+                for name, (own, cumulative) in slowest
+            ],
+            "phases": [{"phase": name, "ms": round(seconds * 1000, 1)} for name, seconds in self.phases],
+            "first_request_ms": round(self.first_request_seconds * 1000, 1) if self.first_request_seconds is not None else None
+        }
+
+    def log_report(self):
+        report = self.report()
+        logger.info("Startup: first request answered after %s ms, %d modules imported",
+                    report["first_request_ms"], report["imports"])
+        for phase in report["phases"]:
+            logger.info("Startup phase %s: %.1f ms", phase["phase"], phase["ms"])
+        for entry in report["slowest_imports"]:
+            logger.info("Startup import %s: %.1f ms self, %.1f ms cumulative",
+                        entry["module"], entry["self_ms"], entry["cumulative_ms"])
+
+# Global startup profile
+startup_profile = StartupProfile()
@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from threading import Thread
+from typing import Dict, Optional
+from flask import Response
+from backend.configModule import FrontendConfig
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always offered
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.html"
+# CRA puts a content hash in every bundle name: static/js/main.1a2b3c4d.js
+HASHED_NAME_PATTERN = re.compile(r"^static/.+\.[0-9a-f]{8,}\.")
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/manifest+json",
+                      "image/svg+xml")
+
+class StaticAsset:
+    """One file of the frontend build held in memory with its precompressed variants"""
+
+    def __init__(self, path: str, data: bytes):
+        self.path = path
+        self.data = data
+        self.mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = hashlib.sha1(data).hexdigest()[:16]
+        # Hashed names change with their content, so browsers may keep them forever
+        self.immutable = bool(HASHED_NAME_PATTERN.match(path))
+        self.encoded: Dict[str, bytes] = {}  # content coding -> body, filled in by precompress
+
+    @property
+    def compressible(self) -> bool:
+        return self.mime.startswith(COMPRESSIBLE_TYPES)
+
+class StaticAssets:
+    """
+    The React build served from memory
+
+    Files are read once at startup and every compressible file is precompressed with gzip
+    (and Brotli when installed) in a background thread; until a variant is ready the file
+    goes out uncompressed. Hashed bundles are sent as immutable, index.html and the other
+    unhashed files are revalidated with their ETag. A new frontend build needs a restart.
+    """
+
+    def __init__(self, build_path: str):
+        self.build_path = build_path
+        self.config = FrontendConfig()
+        self.assets: Dict[str, StaticAsset] = {}
+
+    def load(self):
+        """Read the build into memory"""
+        assets = {}
+        for directory, _, filenames in os.walk(self.build_path):
+            for filename in filenames:
+                full_path = os.path.join(directory, filename)
+                path = os.path.relpath(full_path, self.build_path).replace(os.sep, "/")
+                try:
+                    with open(full_path, "rb") as file:
+                        assets[path] = StaticAsset(path, file.read())
+                except OSError as e:
+                    logger.warning("Static file %s could not be read: %s", full_path, e)
+        self.assets = assets
+        if INDEX_FILE not in assets:
+            logger.warning("Frontend build not found in %s", self.build_path)
+        return self
+
+    def start(self):
+        """Load now, compress in the background"""
+        self.load()
+        if self.config.precompress and self.assets:
+            Thread(target=self.precompress, name="static-compress", daemon=True).start()
+        return self
+
+    def precompress(self):
+        original = compressed = 0
+        for asset in list(self.assets.values()):
+            if not asset.compressible or len(asset.data) < self.config.compress_min_bytes:
+                continue
+            variants = {"gzip": gzip.compress(asset.data, self.config.gzip_level, mtime=0)}
+            if brotli is not None:
+                variants["br"] = brotli.compress(asset.data, quality=self.config.brotli_quality)
+            for encoding, body in variants.items():
+                # Store only what actually saves bytes
+                if len(body) < len(asset.data):
+                    asset.encoded[encoding] = body
+            original += len(asset.data)
+            compressed += min([len(asset.data), *map(len, asset.encoded.values())])
+        logger.info("Static files precompressed: %d KiB -> %d KiB%s", original // 1024, compressed // 1024,
+                    "" if brotli is not None else " (gzip only, brotli not installed)")
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path.lstrip("/"))
+
+    def response(self, asset: StaticAsset, request) -> Response:
+        """Response for a GET of asset, compressed as the client allows, 304 when its copy is current"""
+        encoding = None
+        for candidate in ("br", "gzip"):
+            if candidate in asset.encoded and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        response = Response(asset.encoded[encoding] if encoding else asset.data, mimetype=asset.mime)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if asset.encoded:
+            response.vary.add("Accept-Encoding")
+        # Each encoding is a different byte sequence and gets its own strong ETag
+        response.set_etag(f"{asset.etag}-{encoding}" if encoding else asset.etag)
+        if asset.immutable:
+            response.headers["Cache-Control"] = f"public, max-age={self.config.immutable_max_age}, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
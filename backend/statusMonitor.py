@@ -0,0 +1,113 @@
+import logging
+import time
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional
+from backend.configModule import PrinterConfig
+from backend.eventBus import event_bus, EVENT_PRINTER_STATUS
+from backend.tscPrinterModule import printer_manager
+
+logger = logging.getLogger(__name__)
+
+class PrinterStatusMonitor:
+    """
+    Probes every configured printer in the background and keeps their last known state
+
+    Requests read the cached state instead of opening a TCP probe per printer per call,
+    and online/offline transitions are published on the event bus.
+    """
+
+    def __init__(self, manager=printer_manager, bus=event_bus, interval: float = None, timeout: float = None):
+        printerConfig = PrinterConfig()
+        self.manager = manager
+        self.bus = bus
+        self.interval = interval or printerConfig.status_interval
+        self.timeout = timeout or printerConfig.status_timeout
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._list_printers: Callable[[], List[str]] = lambda: []
+
+    def start(self, list_printers: Callable[[], List[str]]):
+        """Poll the IPs returned by list_printers every interval seconds"""
+        self._list_printers = list_printers
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name="printer-status", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error("Printer status poll failed: %s", e)
+            self._stop.wait(self.interval)
+
+    def poll_once(self):
+        """Probe all printers in parallel"""
+        ips = list(dict.fromkeys(self._list_printers()))
+        for ip, is_online in self.manager.check_printers(ips, 9100, self.timeout).items():
+            self._update(ip, is_online)
+        with self._lock:
+            for ip in set(self._status) - set(ips):
+                del self._status[ip]
+
+    def _update(self, ip: str, is_online: bool) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            previous = self._status.get(ip)
+            changed = previous is None or previous["is_online"] != is_online
+            status = {
+                "ip": ip,
+                "port": 9100,
+                "is_online": is_online,
+                "status": "Online" if is_online else "Offline",
+                "checked_at": now,
+                "changed_at": now if changed else previous["changed_at"]
+            }
+            self._status[ip] = status
+        if changed:
+            logger.info("Printer %s is %s", ip, status["status"].lower())
+            self.bus.publish(EVENT_PRINTER_STATUS, **status)
+        return dict(status)
+
+    def refresh(self, ip: str) -> Dict[str, Any]:
+        """Probe one printer now"""
+        return self._update(ip, self.manager.check_printer_connection(ip, 9100, self.timeout))
+
+    def get_status(self, ip: str) -> Dict[str, Any]:
+        """Cached status, probed once when the printer hasn't been seen yet"""
+        with self._lock:
+            status = self._status.get(ip)
+        return dict(status) if status else self.refresh(ip)
+
+    def get_statuses(self, ips: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Cached status of several printers, unknown ones probed in parallel"""
+        with self._lock:
+            result = {ip: dict(self._status[ip]) for ip in ips if ip in self._status}
+        unknown = [ip for ip in dict.fromkeys(ips) if ip not in result]
+        for ip, is_online in self.manager.check_printers(unknown, 9100, self.timeout).items():
+            result[ip] = self._update(ip, is_online)
+        return result
+
+    def known_status(self, ip: str) -> Optional[bool]:
+        """Cached online flag without probing, None when unknown"""
+        with self._lock:
+            status = self._status.get(ip)
+        return status["is_online"] if status else None
+
+    def forget(self, ip: str):
+        with self._lock:
+            self._status.pop(ip, None)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(status) for status in self._status.values()]
+
+# Global printer status monitor
+printer_status_monitor = PrinterStatusMonitor()
@@ -0,0 +1,161 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from PIL import ImageFont
+
+FIT_NONE = "none"      # keep the font size, lines that don't fit the box are dropped
+FIT_SHRINK = "shrink"  # largest font size between minFontSize and fontSize that fits the box
+FIT_MODES = (FIT_NONE, FIT_SHRINK)
+ALIGNMENTS = ("left", "center", "right")
+VERTICAL_ALIGNMENTS = ("top", "middle", "bottom")
+MIN_FONT_SIZE = 8  # smallest size shrink-to-fit goes down to unless the item sets minFontSize
+
+class GlyphMetrics:
+    """
+    Advance widths of one font at one size, asked from FreeType once per character
+
+    Line widths are sums of cached advances, so wrapping and auto-fit can try many
+    candidate breaks and sizes without measuring whole strings. Pillow's basic layout
+    never makes a line wider than its summed advances; with raqm, kerning and shaping
+    can, so layout_text measures the lines it finally picks near the edge of the box.
+    """
+
+    def __init__(self, font):
+        self.font = font
+        if hasattr(font, "getmetrics"):
+            self.ascent, self.descent = font.getmetrics()
+        else:  # bitmap default font
+            left, top, right, bottom = font.getbbox("Ag")
+            self.ascent, self.descent = bottom, 0
+        self.line_height = self.ascent + self.descent
+        self.shaped = getattr(font, "layout_engine", ImageFont.Layout.BASIC) == ImageFont.Layout.RAQM
+        self._advances: Dict[str, float] = {}
+
+    def width(self, text: str) -> float:
+        advances = self._advances
+        total = 0.0
+        for char in text:
+            advance = advances.get(char)
+            if advance is None:
+                advance = advances[char] = self.font.getlength(char, mode="1")
+            total += advance
+        return total
+
+    def exact_width(self, text: str) -> float:
+        """Width including kerning, one FreeType layout of the whole string"""
+        return self.font.getlength(text, mode="1")
+
+class TextLayout:
+    """Lines of a text item placed in its box: (text, x offset, y offset) in pixels"""
+
+    def __init__(self, font_size: int, line_height: int, lines: List[Tuple[str, int, int]], width: int, height: int,
+                 truncated: bool):
+        self.font_size = font_size
+        self.line_height = line_height
+        self.lines = lines
+        self.width = width
+        self.height = height
+        self.truncated = truncated  # text was cut because the box is too small
+
+def wrap_text(text: str, max_width: Optional[float], metrics: GlyphMetrics) -> List[str]:
+    """Greedy word wrap; words wider than the line are broken between characters"""
+    lines = []
+    space = metrics.width(" ")
+    for paragraph in text.split("\n"):
+        if max_width is None:
+            lines.append(paragraph)
+            continue
+        line, line_width = "", 0.0
+        for word in paragraph.split(" "):
+            word_width = metrics.width(word)
+            if line and line_width + space + word_width <= max_width:
+                line, line_width = f"{line} {word}", line_width + space + word_width
+                continue
+            if line:
+                lines.append(line)
+            line, line_width = word, word_width
+            while line_width > max_width and len(line) > 1:
+                # Break the word at the last character that still fits
+                cut, cut_width = 1, metrics.width(line[0])
+                while cut < len(line) and cut_width + metrics.width(line[cut]) <= max_width:
+                    cut_width += metrics.width(line[cut])
+                    cut += 1
+                lines.append(line[:cut])
+                line = line[cut:]
+                line_width = metrics.width(line)
+        lines.append(line)
+    return lines
+
+def _overflows(line: str, metrics: GlyphMetrics, width: int, exact: bool) -> bool:
+    line_width = metrics.width(line)
+    if line_width > width:
+        return True
+    # Kerning moves a line by a few pixels at most, only shaped lines near the edge are measured exactly
+    return (exact and metrics.shaped and line_width > width - metrics.line_height
+            and metrics.exact_width(line) > width)
+
+def _fits(lines: List[str], metrics: GlyphMetrics, width: Optional[int], height: Optional[int], line_spacing: float,
+          exact: bool = False) -> bool:
+    if width is not None and any(_overflows(line, metrics, width, exact) for line in lines):
+        return False
+    return height is None or _block_height(len(lines), metrics, line_spacing) <= height
+
+def _block_height(line_count: int, metrics: GlyphMetrics, line_spacing: float) -> int:
+    if not line_count:
+        return 0
+    return round(metrics.line_height * line_spacing * (line_count - 1)) + metrics.line_height
+
+def layout_text(text: str, metrics_for: Callable[[int], GlyphMetrics], font_size: int, width: Optional[int] = None,
+                height: Optional[int] = None, wrap: bool = True, fit: str = FIT_NONE, min_font_size: int = None,
+                align: str = "left", vertical_align: str = "top", line_spacing: float = 1.0) -> TextLayout:
+    """
+    Break text into lines and place them in a width x height box
+
+    metrics_for(size) returns the GlyphMetrics of the item's font at a size. With fit
+    "shrink" the largest size from min_font_size to font_size whose lines fit is picked by
+    binary search. Lines that still don't fit the height are dropped (truncated).
+    """
+    min_font_size = max(1, min(min_font_size or MIN_FONT_SIZE, font_size))
+
+    def lines_at(size: int) -> Tuple[GlyphMetrics, List[str]]:
+        metrics = metrics_for(size)
+        return metrics, wrap_text(text, width if wrap else None, metrics)
+
+    size = font_size
+    metrics, lines = lines_at(size)
+    if fit == FIT_SHRINK and not _fits(lines, metrics, width, height, line_spacing):
+        low, high, size = min_font_size, font_size - 1, min_font_size
+        while low <= high:
+            middle = (low + high) // 2
+            candidate_metrics, candidate_lines = lines_at(middle)
+            if _fits(candidate_lines, candidate_metrics, width, height, line_spacing):
+                size, low = middle, middle + 1
+            else:
+                high = middle - 1
+        metrics, lines = lines_at(size)
+        # Summed advances leave out kerning, step down while a shaped line still overflows
+        while size > min_font_size and not _fits(lines, metrics, width, height, line_spacing, exact=True):
+            size -= 1
+            metrics, lines = lines_at(size)
+
+    truncated = False
+    if height is not None:
+        step = metrics.line_height * line_spacing
+        max_lines = int((height - metrics.line_height) // step) + 1 if height >= metrics.line_height else 0
+        if len(lines) > max_lines:
+            lines, truncated = lines[:max(max_lines, 1)], True
+
+    block_height = _block_height(len(lines), metrics, line_spacing)
+    box_height = height if height is not None else block_height
+    top = 0
+    if vertical_align == "middle":
+        top = (box_height - block_height) // 2
+    elif vertical_align == "bottom":
+        top = box_height - block_height
+    placed = []
+    for index, line in enumerate(lines):
+        left = 0
+        if width is not None and align != "left":
+            free = width - metrics.width(line)
+            left = int(free // 2) if align == "center" else int(free)
+        placed.append((line, left, top + round(index * metrics.line_height * line_spacing)))
+    box_width = width if width is not None else int(max((metrics.width(line) for line in lines), default=0))
+    return TextLayout(size, metrics.line_height, placed, box_width, box_height, truncated)
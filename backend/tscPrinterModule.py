@@ -1,54 +1,75 @@
+import select
 import socket
 import time
-from threading import Thread
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, RLock
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from backend.metricsModule import printer_socket_seconds, printer_errors_total, printer_bytes_total
+from backend.configModule import RenderConfig, PrinterConfig
+from backend.requestProfiler import profile_stage, STAGE_SEND
+from backend.tsplCommands import PrinterUnreachable, bmp_commands, regions_commands, text_commands, template_download, template_commands
+
+logger = logging.getLogger(__name__)
 
 class TSCPrinter:
     def __init__(self, printer_ip: str = "192.168.1.200", printer_port: int = 9100):
         self.printer_ip = printer_ip
         self.printer_port = printer_port
         self.socket = None
+        self.lock = RLock()  # one job at a time on the shared socket
+        self.renderConfig = RenderConfig()
+        self.raster_encodings = PrinterConfig().raster_encodings
+        self.downloaded_files = set()  # files stored in printer DRAM during this connection
 
     def connect_printer(self):
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.printer_ip, self.printer_port))
+            with printer_socket_seconds.time(printer=self.printer_ip, operation="connect"):
+                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self.socket.connect((self.printer_ip, self.printer_port))
+            # A new connection may follow a power cycle, which clears DRAM
+            self.downloaded_files = set()
             return True
         except Exception as e:
-            print(f"connect_printer Exception for {self.printer_ip}: {e}")
+            printer_errors_total.inc(printer=self.printer_ip, operation="connect")
+            logger.error("connect_printer Exception for %s: %s", self.printer_ip, e)
             return False
 
     def disconnect_printer(self):
         """Disconnect from printer"""
+        sock, self.socket = self.socket, None
         try:
-            if self.socket:
-                self.socket.close()
-                self.socket = None
+            if sock:
+                sock.close()
         except Exception as e:
-            print(f"disconnect_printer Exception: {e}")
+            logger.warning("disconnect_printer Exception: %s", e)
 
     def check_connection(self, timeout: int = 3) -> bool:
         """Check if printer is online and reachable"""
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            result = sock.connect_ex((self.printer_ip, self.printer_port))
-            sock.close()
+            with printer_socket_seconds.time(printer=self.printer_ip, operation="probe"):
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.settimeout(timeout)
+                result = sock.connect_ex((self.printer_ip, self.printer_port))
+                sock.close()
             return result == 0
         except Exception as e:
-            print(f"Connection check error for {self.printer_ip}: {e}")
+            logger.warning("Connection check error for %s: %s", self.printer_ip, e)
             return False
 
     def is_connected(self) -> bool:
-        """Check if socket is connected"""
+        """Check if socket is connected and the printer hasn't closed its end"""
         try:
             if self.socket:
-                # Try to send a small packet to check connection
-                self.socket.send(b'')
+                # A closed connection reads as readable with no data; sending b'' succeeds on it
+                readable, _, _ = select.select([self.socket], [], [], 0)
+                if readable and not self.socket.recv(1, socket.MSG_PEEK):
+                    self.disconnect_printer()
+                    return False
                 return True
-        except:
-            self.socket = None
+        except OSError:
+            self.disconnect_printer()
         return False
 
     def wait_response(self):
@@ -56,11 +77,11 @@ class TSCPrinter:
             try:
                 response = self.socket.recv(1024)
                 if response:
-                    print(f"Yanıt: {response.decode('utf-8', errors='ignore').strip()}")
+                    logger.info("Yanıt: %s", response.decode('utf-8', errors='ignore').strip())
                 else:
-                    print("Yanıt Alınmadı.")
+                    logger.info("Yanıt Alınmadı.")
             except Exception as e:
-                print("wait_response Exception:",e)
+                logger.error("wait_response Exception: %s", e)
 
             time.sleep(0.1)
 
@@ -75,13 +96,13 @@ class TSCPrinter:
             ]
             
             for cmd in test_commands:
-                print(f"📤 Socket komut: {cmd.decode().strip()}")
+                logger.debug("Socket komut: %s", cmd.decode().strip())
                 self.socket.send(cmd)
                 time.sleep(0.5)
         except Exception as e:
-            print("send_test Exception:",e)
+            logger.error("send_test Exception: %s", e)
 
-    def send_bmp(self, bmp_path: str = "logo.bmp", width_mm: int = 100, height_mm: int = 29):
+    def send_bmp(self, bmp_path: str = "logo.bmp", width_mm: int = 100, height_mm: int = 29, sets: int = 1, copies: int = 1):
         """
         Send BMP file to printer and print it
         
@@ -89,81 +110,179 @@ class TSCPrinter:
             bmp_path: Path to BMP file
             width_mm: Label width in mm
             height_mm: Label height in mm
+            sets: Number of label sets (PRINT m)
+            copies: Copies of each set (PRINT m,n)
         """
         try:
             if not self.is_connected():
                 if not self.connect_printer():
-                    raise Exception(f"Could not connect to printer {self.printer_ip}")
+                    raise PrinterUnreachable(f"Could not connect to printer {self.printer_ip}")
             
             bmp_file = Path(bmp_path)
             if not bmp_file.exists():
                 raise Exception(f"BMP file not found: {bmp_path}")
             
-            #fname = bmp_file.name.upper()
-            fname = "LOGO.BMP"
-            bmp_bytes = bmp_file.read_bytes()
-            
             # TSPL command to download and print the BMP
-            tspl_after_download = f"""
-SIZE {width_mm} mm,{height_mm} mm
-DIRECTION 1
-CLS
-PUTBMP 0,0,"{fname}"
-PRINT 1
-""".lstrip().encode("ascii")
-            
-            header = f'DOWNLOAD "{fname}",{len(bmp_bytes)},'.encode("ascii")
+            download, tspl_after_download = bmp_commands(bmp_file.read_bytes(), width_mm, height_mm, sets, copies)
             
             # Send BMP file to printer
-            self.socket.sendall(header + bmp_bytes + b"\n")
+            with printer_socket_seconds.time(printer=self.printer_ip, operation="send"):
+                self.socket.sendall(download)
             time.sleep(0.5)  # Wait a bit for download
             
             # Send print command
-            self.socket.sendall(tspl_after_download)
-            print(f"Successfully sent {bmp_path} to printer {self.printer_ip}")
+            with printer_socket_seconds.time(printer=self.printer_ip, operation="send"):
+                self.socket.sendall(tspl_after_download)
+            logger.info("Successfully sent %s to printer %s (%d x %d)", bmp_path, self.printer_ip, sets, copies)
             return True
             
+        except PrinterUnreachable:
+            raise
         except Exception as e:
-            print(f"send_bmp Exception for {self.printer_ip}: {e}")
+            printer_errors_total.inc(printer=self.printer_ip, operation="send")
+            # The stream may have stopped mid-command, the next job starts on a new connection
+            self.disconnect_printer()
+            logger.error("send_bmp Exception for %s: %s", self.printer_ip, e)
             return False
 
-    def send_text(self, text: str, x: int = 10, y: int = 10, width_mm: int = 100, height_mm: int = 29):
+    def send_regions(self, regions: List[tuple], width_mm: int = 100, height_mm: int = 29, copies: int = 1):
+        """
+        Print several rendered labels in one pipelined TSPL session
+        
+        Args:
+            regions: Packed label regions (x, y, row_bytes, height, data), see LabelBuffer.packed_region
+            width_mm: Label width in mm
+            height_mm: Label height in mm
+            copies: Copies of each label (PRINT 1,n)
+        """
+        try:
+            if not self.is_connected():
+                if not self.connect_printer():
+                    raise PrinterUnreachable(f"Could not connect to printer {self.printer_ip}")
+            
+            commands = regions_commands(regions, width_mm, height_mm, copies, self.raster_encodings, self.printer_ip)
+            
+            # Single write: no file download, no wait between download and print
+            with printer_socket_seconds.time(printer=self.printer_ip, operation="send"):
+                self.socket.sendall(commands)
+            logger.info("Successfully sent %d labels x %d copies to printer %s", len(regions), copies, self.printer_ip)
+            return True
+            
+        except PrinterUnreachable:
+            raise
+        except Exception as e:
+            printer_errors_total.inc(printer=self.printer_ip, operation="send")
+            # The stream may have stopped mid-command, the next job starts on a new connection
+            self.disconnect_printer()
+            logger.error("send_regions Exception for %s: %s", self.printer_ip, e)
+            return False
+
+    def send_label_buffer(self, label_buffer, width_mm: int = 100, height_mm: int = 29, copies: int = 1):
+        """
+        Send a rendered LabelBuffer and print it, using the most compact raster encoding
+        
+        Args:
+            label_buffer: LabelBuffer from BitmapGenerator.render_frontend_data
+            width_mm: Label width in mm
+            height_mm: Label height in mm
+            copies: Copies of the label
+        """
+        # Only the inked region is sent, CLS already cleared the rest of the label
+        region = label_buffer.packed_region(self.renderConfig.crop_blank_margins)
+        return self.send_regions([region], width_mm, height_mm, copies)
+
+    def send_text(self, text: str, x: int = 10, y: int = 10, width_mm: int = 100, height_mm: int = 29,
+                  sets: int = 1, copies: int = 1, counter_start: str = None, counter_step: int = 1):
         """
         Send text to printer and print it
         
         Args:
-            text: Text to print
+            text: Text to print (prefix of the serial when counter_start is given)
             x: X coordinate
             y: Y coordinate
             width_mm: Label width in mm
             height_mm: Label height in mm
+            sets: Number of labels (PRINT m); with a counter each set gets the next serial
+            copies: Copies of each label (PRINT m,n)
+            counter_start: First serial, incremented by the printer with SET COUNTER
+            counter_step: Serial increment per set
         """
         try:
             if not self.is_connected():
                 if not self.connect_printer():
-                    raise Exception(f"Could not connect to printer {self.printer_ip}")
+                    raise PrinterUnreachable(f"Could not connect to printer {self.printer_ip}")
             
-            tspl_command = f"""
-SIZE {width_mm} mm, {height_mm} mm
-DIRECTION 1
-CLS
-TEXT {x},{y},"2",0,1,1,"{text}"
-PRINT 1
-""".lstrip().encode("ascii")
+            tspl_command = text_commands(text, x, y, width_mm, height_mm, sets, copies, counter_start, counter_step)
             
-            self.socket.sendall(tspl_command)
-            print(f"Successfully sent text '{text}' to printer {self.printer_ip}")
+            with printer_socket_seconds.time(printer=self.printer_ip, operation="send"):
+                self.socket.sendall(tspl_command)
+            logger.info("Successfully sent text '%s' to printer %s (%d x %d)", text, self.printer_ip, sets, copies)
             return True
             
+        except PrinterUnreachable:
+            raise
         except Exception as e:
-            print(f"send_text Exception for {self.printer_ip}: {e}")
+            printer_errors_total.inc(printer=self.printer_ip, operation="send")
+            # The stream may have stopped mid-command, the next job starts on a new connection
+            self.disconnect_printer()
+            logger.error("send_text Exception for %s: %s", self.printer_ip, e)
+            return False
+
+    def send_template(self, filename: str, region: tuple, program, count: int = 1, copies: int = 1,
+                      width_mm: int = 100, height_mm: int = 29):
+        """
+        Print a run of labels whose variable fields are filled in by the printer
+        
+        Args:
+            filename: Printer file name of the static image, see tsplTemplate.template_filename
+            region: Packed static region (x, y, row_bytes, height, data)
+            program: tsplTemplate.TemplateProgram with the counter setup and variable fields
+            count: Number of labels (PRINT m), counters advance after every label
+            copies: Copies of each label (PRINT m,n)
+            width_mm: Label width in mm
+            height_mm: Label height in mm
+        """
+        try:
+            if not self.is_connected():
+                if not self.connect_printer():
+                    raise PrinterUnreachable(f"Could not connect to printer {self.printer_ip}")
+            
+            # The static image is uploaded once, later runs only send the commands
+            download = template_download(filename, region) if filename not in self.downloaded_files else b""
+            if download:
+                printer_bytes_total.inc(len(download), printer=self.printer_ip, encoding="template")
+            commands = template_commands(filename, region, program, count, copies, width_mm, height_mm)
+            
+            with printer_socket_seconds.time(printer=self.printer_ip, operation="send"):
+                self.socket.sendall(download + commands)
+            if download:
+                self.downloaded_files.add(filename)
+            logger.info("Successfully sent template %s to printer %s (%d x %d)", filename, self.printer_ip, count, copies)
+            return True
+            
+        except PrinterUnreachable:
+            raise
+        except Exception as e:
+            # The printer may have lost its files, upload again next time
+            self.downloaded_files = set()
+            printer_errors_total.inc(printer=self.printer_ip, operation="send")
+            # The stream may have stopped mid-command, the next job starts on a new connection
+            self.disconnect_printer()
+            logger.error("send_template Exception for %s: %s", self.printer_ip, e)
             return False
 
 class PrinterManager:
-    """Manager class for handling multiple printers"""
+    """
+    Manager class for handling multiple printers
+
+    print_* return True once the job is sent and False when sending failed part way, so
+    the printer may have printed some of it. They raise PrinterUnreachable when no
+    connection could be opened and nothing was sent.
+    """
     
     def __init__(self):
         self.printers = {}  # Cache for printer connections
+        self.probe_executor = None
     
     def get_printer(self, ip: str, port: int = 9100) -> TSCPrinter:
         """Get or create a printer instance"""
@@ -177,6 +296,30 @@ class PrinterManager:
         printer = self.get_printer(ip, port)
         return printer.check_connection(timeout)
     
+    def check_printers(self, ips: List[str], port: int = 9100, timeout: float = 3) -> Dict[str, bool]:
+        """Probe several printers in parallel"""
+        if not ips:
+            return {}
+        return dict(zip(ips, self._probe_pool().map(lambda ip: self.check_printer_connection(ip, port, timeout), ips)))
+
+    def connect_printers(self, ips: List[str], port: int = 9100, timeout: float = 3) -> Dict[str, bool]:
+        """Open job connections ahead of the first job; printers that don't answer a probe are skipped"""
+        def connect(ip):
+            printer = self.get_printer(ip, port)
+            # Probe first, connect_printer itself waits for the OS connect timeout
+            if not printer.check_connection(timeout):
+                return False
+            with printer.lock:
+                return printer.is_connected() or printer.connect_printer()
+        if not ips:
+            return {}
+        return dict(zip(ips, self._probe_pool().map(connect, ips)))
+
+    def _probe_pool(self) -> ThreadPoolExecutor:
+        if self.probe_executor is None:
+            self.probe_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="printer-probe")
+        return self.probe_executor
+    
     def get_printer_status(self, ip: str, port: int = 9100) -> Dict[str, Any]:
         """Get printer status including connection info"""
         is_online = self.check_printer_connection(ip, port)
@@ -187,15 +330,42 @@ class PrinterManager:
             "status": "Online" if is_online else "Offline"
         }
     
-    def print_bmp(self, ip: str, bmp_path: str, width_mm: int = 100, height_mm: int = 29, port: int = 9100) -> bool:
+    @profile_stage(STAGE_SEND)
+    def print_bmp(self, ip: str, bmp_path: str, width_mm: int = 100, height_mm: int = 29, port: int = 9100, sets: int = 1, copies: int = 1) -> bool:
         """Print BMP file to specified printer"""
         printer = self.get_printer(ip, port)
-        return printer.send_bmp(bmp_path, width_mm, height_mm)
+        with printer.lock:
+            return printer.send_bmp(bmp_path, width_mm, height_mm, sets, copies)
+    
+    @profile_stage(STAGE_SEND)
+    def print_label_buffer(self, ip: str, label_buffer, width_mm: int = 100, height_mm: int = 29, port: int = 9100, copies: int = 1) -> bool:
+        """Print a rendered LabelBuffer to specified printer"""
+        printer = self.get_printer(ip, port)
+        with printer.lock:
+            return printer.send_label_buffer(label_buffer, width_mm, height_mm, copies)
+    
+    @profile_stage(STAGE_SEND)
+    def print_regions(self, ip: str, regions: List[tuple], width_mm: int = 100, height_mm: int = 29, port: int = 9100, copies: int = 1) -> bool:
+        """Print rendered label regions to specified printer in one session"""
+        printer = self.get_printer(ip, port)
+        with printer.lock:
+            return printer.send_regions(regions, width_mm, height_mm, copies)
+    
+    @profile_stage(STAGE_SEND)
+    def print_template(self, ip: str, filename: str, region: tuple, program, count: int = 1, copies: int = 1,
+                       width_mm: int = 100, height_mm: int = 29, port: int = 9100) -> bool:
+        """Print a template run with printer-side variables to specified printer"""
+        printer = self.get_printer(ip, port)
+        with printer.lock:
+            return printer.send_template(filename, region, program, count, copies, width_mm, height_mm)
     
-    def print_text(self, ip: str, text: str, x: int = 10, y: int = 10, width_mm: int = 100, height_mm: int = 29, port: int = 9100) -> bool:
+    @profile_stage(STAGE_SEND)
+    def print_text(self, ip: str, text: str, x: int = 10, y: int = 10, width_mm: int = 100, height_mm: int = 29, port: int = 9100,
+                   sets: int = 1, copies: int = 1, counter_start: str = None, counter_step: int = 1) -> bool:
         """Print text to specified printer"""
         printer = self.get_printer(ip, port)
-        return printer.send_text(text, x, y, width_mm, height_mm)
+        with printer.lock:
+            return printer.send_text(text, x, y, width_mm, height_mm, sets, copies, counter_start, counter_step)
     
     def disconnect_all(self):
         """Disconnect all cached printers"""
@@ -204,4 +374,8 @@ class PrinterManager:
         self.printers.clear()
 
 # Global printer manager instance
-printer_manager = PrinterManager()
+if PrinterConfig().driver == "asyncio":
+    from backend.asyncPrinterModule import AsyncPrinterManager
+    printer_manager = AsyncPrinterManager()
+else:
+    printer_manager = PrinterManager()
@@ -0,0 +1,81 @@
+from typing import List, Tuple
+from backend.metricsModule import printer_bytes_total
+from backend.rasterEncoder import encode_region, pcx_file
+
+# TSPL byte streams shared by the blocking and the asyncio printer drivers
+
+BMP_FILENAME = "LOGO.BMP"
+STATUS_QUERY = b"\x1b!?"  # <ESC>!? answers one status byte, 0x00 = ready
+
+class PrinterUnreachable(ConnectionError):
+    """No connection to the printer, nothing of the job was sent (safe to send elsewhere)"""
+
+def bmp_commands(bmp_bytes: bytes, width_mm: int, height_mm: int, sets: int, copies: int) -> Tuple[bytes, bytes]:
+    """(download, print) streams for a BMP file; the printer needs a moment between the two"""
+    header = f'DOWNLOAD "{BMP_FILENAME}",{len(bmp_bytes)},'.encode("ascii")
+    tspl_after_download = f"""
+SIZE {width_mm} mm,{height_mm} mm
+DIRECTION 1
+CLS
+PUTBMP 0,0,"{BMP_FILENAME}"
+PRINT {sets},{copies}
+""".lstrip().encode("ascii")
+    return header + bmp_bytes + b"\n", tspl_after_download
+
+def regions_commands(regions: List[tuple], width_mm: int, height_mm: int, copies: int,
+                     encodings: List[str], printer_ip: str) -> bytes:
+    """One pipelined session printing every region, each in its most compact raster encoding"""
+    # Label setup once, then CLS / image / PRINT per label; the printer runs
+    # the whole stream at mechanical speed without host round trips
+    setup = f"SIZE {width_mm} mm,{height_mm} mm\nDIRECTION 1\n".encode("ascii")
+    commands = []
+    for index, region in enumerate(regions):
+        encoded = encode_region(*region, encodings=encodings)
+        if encoded:
+            printer_bytes_total.inc(len(encoded), printer=printer_ip, encoding=encoded.encoding)
+        if encoded and encoded.preamble:
+            # A DOWNLOAD goes before SIZE/CLS, the setup is repeated after it
+            commands.extend((encoded.preamble, setup))
+        elif index == 0:
+            commands.append(setup)
+        commands.append(b"CLS\n")
+        if encoded:
+            commands.append(encoded.body)
+        commands.append(f"PRINT 1,{copies}\n".encode("ascii"))
+    return b"".join(commands)
+
+def text_commands(text: str, x: int, y: int, width_mm: int, height_mm: int, sets: int, copies: int,
+                  counter_start: str = None, counter_step: int = 1) -> bytes:
+    if counter_start is not None:
+        # The firmware increments @0 after every set, one command prints the whole run
+        content = f'"{text}"+@0' if text else "@0"
+        counter = f'SET COUNTER @0 {counter_step}\n@0 = "{counter_start}"\n'
+    else:
+        content = f'"{text}"'
+        counter = ""
+
+    return f"""
+SIZE {width_mm} mm, {height_mm} mm
+DIRECTION 1
+{counter}CLS
+TEXT {x},{y},"2",0,1,1,{content}
+PRINT {sets},{copies}
+""".lstrip().encode("ascii")
+
+def template_download(filename: str, region: tuple) -> bytes:
+    """DOWNLOAD of the static template image as PCX, empty when the static layer is blank"""
+    x, y, row_bytes, height, data = region
+    if not height:
+        return b""
+    pcx = pcx_file(row_bytes, height, data)
+    return f'DOWNLOAD "{filename}",{len(pcx)},'.encode("ascii") + pcx + b"\n"
+
+def template_commands(filename: str, region: tuple, program, count: int, copies: int, width_mm: int, height_mm: int) -> bytes:
+    """Template run placing the downloaded image under the printer-side variable fields"""
+    x, y, row_bytes, height, data = region
+    lines = [f"SIZE {width_mm} mm,{height_mm} mm", "DIRECTION 1", *program.setup, "CLS"]
+    if height:
+        lines.append(f'PUTPCX {x},{y},"{filename}"')
+    lines.extend(program.fields)
+    lines.append(f"PRINT {count},{copies}")
+    return ("\n".join(lines) + "\n").encode("ascii")
@@ -0,0 +1,182 @@
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+VARIABLE_COUNTER = "counter"  # serial incremented by the printer after every label (SET COUNTER @n)
+VARIABLE_DATE = "date"        # printer clock, DATE$
+VARIABLE_TIME = "time"        # printer clock, TIME$
+VARIABLE_TYPES = (VARIABLE_COUNTER, VARIABLE_DATE, VARIABLE_TIME)
+
+MAX_COUNTERS = 10  # @0..@9 are available on every TSPL firmware
+
+# Layout barcode formats -> TSPL BARCODE code types
+TSPL_BARCODE_TYPES = {
+    "code128": "128",
+    "code39": "39",
+    "ean13": "EAN13"
+}
+
+class TemplateError(ValueError):
+    """Variables that cannot be mapped onto printer-side TSPL variables"""
+
+class TemplateProgram:
+    """
+    TSPL for the variable part of a template run
+
+    setup goes before CLS (counter declarations and start values), fields after the
+    static image (TEXT / BARCODE commands reading the variables).
+    """
+
+    def __init__(self):
+        self.setup: List[str] = []
+        self.fields: List[str] = []
+        self.counters: Dict[str, Tuple[str, int]] = {}  # variable key -> (start, step)
+
+    def last_values(self, count: int) -> Dict[str, Optional[str]]:
+        """Value each counter shows on the last of count labels (None for non-numeric starts)"""
+        return {key: counter_value(start, step, count - 1) for key, (start, step) in self.counters.items()}
+
+def counter_value(start: str, step: int, index: int) -> Optional[str]:
+    """Counter value after index increments, keeping the zero padding of start"""
+    if not start.isdigit():
+        return None
+    return str(int(start) + step * index).zfill(len(start))
+
+def offset_variables(variables: Dict[str, Any], offset: int) -> Dict[str, Any]:
+    """Copy of template variables with every counter advanced by offset labels (for split runs)"""
+    if not offset or not variables:
+        return variables
+    result = {}
+    for section in ("values", "barcodes"):
+        result[section] = {}
+        for key, spec in (variables.get(section) or {}).items():
+            if (spec or {}).get("type", VARIABLE_COUNTER) == VARIABLE_COUNTER:
+                start = str(spec.get("start", "1"))
+                value = counter_value(start, int(spec.get("step", 1)), offset)
+                if value is None:
+                    raise TemplateError(f"Counter start {start!r} is not numeric and cannot be split across printers")
+                spec = {**spec, "start": value}
+            result[section][key] = spec
+    return result
+
+def template_counters(variables: Dict[str, Any]) -> Dict[str, Tuple[Optional[str], int]]:
+    """Counter variables by key ("values.<id>" / "barcodes.<id>") -> (start or None when not given, step)"""
+    counters = {}
+    for section in ("values", "barcodes"):
+        for key, spec in ((variables or {}).get(section) or {}).items():
+            if (spec or {}).get("type", VARIABLE_COUNTER) == VARIABLE_COUNTER:
+                start = (spec or {}).get("start")
+                counters[f"{section}.{key}"] = (None if start is None else str(start), int((spec or {}).get("step", 1)))
+    return counters
+
+def with_counter_starts(variables: Dict[str, Any], starts: Dict[str, str]) -> Dict[str, Any]:
+    """Copy of template variables with the counters keyed in starts set to those start values"""
+    result = {}
+    for section in ("values", "barcodes"):
+        result[section] = {}
+        for key, spec in ((variables or {}).get(section) or {}).items():
+            start = starts.get(f"{section}.{key}")
+            result[section][key] = {**(spec or {}), "start": start} if start is not None else spec
+    return result
+
+def _quote(text: str) -> str:
+    if '"' in text:
+        raise TemplateError("Template text cannot contain double quotes")
+    return f'"{text}"'
+
+def split_template(settings_data: Dict[str, Any], variables: Dict[str, Any]) -> Tuple[Dict[str, Any], List[tuple]]:
+    """
+    Separate the static part of a layout from the items the printer fills in
+
+    variables: {"values": {valueId: spec}, "barcodes": {barcode id: spec}} where spec is
+    {"type": "counter", "start": "000001", "step": 1, "prefix": "SN"} or {"type": "date"|"time", "prefix": ""}.
+    Returns (static settings, [(key, kind, item, spec)]) with kind "text" or "barcode".
+    """
+    values = (variables or {}).get("values", {})
+    barcodes = {str(key): spec for key, spec in (variables or {}).get("barcodes", {}).items()}
+    static = dict(settings_data)
+    variable_items = []
+
+    static["valueItems"] = []
+    for item in settings_data.get("valueItems", []):
+        value_id = item.get("valueId")
+        if value_id in values:
+            variable_items.append((f"values.{value_id}", "text", item, values[value_id]))
+        else:
+            static["valueItems"].append(item)
+
+    static["barcodeItems"] = []
+    for item in settings_data.get("barcodeItems", []):
+        barcode_id = str(item.get("id"))
+        if barcode_id in barcodes:
+            variable_items.append((f"barcodes.{barcode_id}", "barcode", item, barcodes[barcode_id]))
+        else:
+            static["barcodeItems"].append(item)
+
+    unknown = set(values) - {item.get("valueId") for item in settings_data.get("valueItems", [])}
+    unknown |= set(barcodes) - {str(item.get("id")) for item in settings_data.get("barcodeItems", [])}
+    if unknown:
+        raise TemplateError(f"Unknown template fields: {', '.join(sorted(map(str, unknown)))}")
+    return static, variable_items
+
+def _expression(spec: Dict[str, Any], program: TemplateProgram, key: str) -> Tuple[str, str]:
+    """TSPL string expression for a variable and a sample value for sizing"""
+    kind = spec.get("type", VARIABLE_COUNTER)
+    prefix = str(spec.get("prefix", ""))
+    if kind == VARIABLE_COUNTER:
+        if len(program.counters) >= MAX_COUNTERS:
+            raise TemplateError(f"At most {MAX_COUNTERS} counters per template")
+        start = str(spec.get("start", "1"))
+        step = int(spec.get("step", 1))
+        counter = f"@{len(program.counters)}"
+        program.counters[key] = (start, step)
+        program.setup.append(f"SET COUNTER {counter} {step}")
+        program.setup.append(f"{counter} = {_quote(start)}")
+        variable, sample = counter, start
+    elif kind == VARIABLE_DATE:
+        variable, sample = "DATE$", "00/00/00"
+    elif kind == VARIABLE_TIME:
+        variable, sample = "TIME$", "00:00:00"
+    else:
+        raise TemplateError(f"Unsupported variable type: {kind}")
+    expression = f"{_quote(prefix)}+{variable}" if prefix else variable
+    return expression, prefix + sample
+
+def _barcode_command(item: Dict[str, Any], expression: str, sample: str) -> str:
+    barcode_format = str(item.get("format", "code128")).lower()
+    code_type = TSPL_BARCODE_TYPES.get(barcode_format)
+    if code_type is None:
+        raise TemplateError(f"Unsupported barcode type: {barcode_format}")
+    # The printer draws modules in whole dots, pick the narrow bar that fills the layout width best
+    if barcode_format == "ean13":
+        modules, ratio = 95, 1
+    elif barcode_format == "code39":
+        modules, ratio = 16 * (len(sample) + 2), 3
+    else:
+        modules, ratio = 11 * (len(sample) + 3) + 2, 1
+    width = item.get("width") or modules * 2
+    narrow = max(1, round(width / modules))
+    height = max(1, int(item.get("height") or 100))
+    return f"BARCODE {item.get('x', 0)},{item.get('y', 0)},\"{code_type}\",{height},2,0,{narrow},{narrow * ratio},{expression}"
+
+def compile_template(variable_items: List[tuple], dpi: int) -> TemplateProgram:
+    """
+    TSPL commands that draw the variable items with printer-side variables
+
+    Text uses the scalable font "0" sized in points from the layout's pixel size, barcodes
+    are drawn by the firmware. Both approximate the host renderer's placement.
+    """
+    program = TemplateProgram()
+    for key, kind, item, spec in variable_items:
+        expression, sample = _expression(spec or {}, program, key)
+        if kind == "barcode":
+            program.fields.append(_barcode_command(item, expression, sample))
+        else:
+            points = max(1, round(item.get("fontSize", 12) * 72 / dpi))
+            program.fields.append(f"TEXT {item.get('x', 0)},{item.get('y', 0)},\"0\",0,{points},{points},{expression}")
+    return program
+
+def template_filename(region: tuple) -> str:
+    """8.3 printer file name derived from the static image, so unchanged layouts are not re-uploaded"""
+    x, y, row_bytes, height, data = region
+    digest = hashlib.sha1(f"{x},{y},{row_bytes},{height},".encode("ascii") + data).hexdigest()
+    return f"T{digest[:7].upper()}.PCX"
@@ -0,0 +1,130 @@
+import json
+import logging
+import time
+from threading import Lock, Thread
+from typing import Any, Dict, Optional, Tuple
+from backend.configModule import PrinterConfig, WarmUpConfig
+from backend.metricsModule import render_source, SOURCE_WARMUP
+from backend.rasterEncoder import encode_region
+from backend.tscPrinterModule import printer_manager
+from backend.tsplTemplate import TemplateError, split_template
+
+logger = logging.getLogger(__name__)
+
+WARMUP_PENDING = "pending"
+WARMUP_RUNNING = "running"
+WARMUP_DONE = "done"
+WARMUP_DISABLED = "disabled"
+
+class WarmUp:
+    """
+    Background pass at startup that pays the first-label costs before a job does
+
+    Imports the rendering stack, renders and encodes every saved layout once (filling the
+    font, barcode, icon and label buffer caches), pre-renders template static layers with the
+    variables their last job used and opens printer connections. Jobs that arrive in
+    the meantime simply render cold; progress is reported on /api/health. Warm-up renders
+    are counted in render_label_seconds with source="warmup".
+    """
+
+    def __init__(self, manager=printer_manager):
+        self.manager = manager
+        self.config = WarmUpConfig()
+        self.raster_encodings = PrinterConfig().raster_encodings
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+        self._progress: Dict[str, Any] = {
+            "state": WARMUP_PENDING if self.config.enabled else WARMUP_DISABLED,
+            "stage": None,
+            "layouts_done": 0,
+            "layouts_total": 0,
+            "static_layers": 0,
+            "printers_connected": 0,
+            "printers_total": 0,
+            "errors": 0,
+            "seconds": None
+        }
+
+    def start(self, application):
+        """Warm up in a background thread, once"""
+        if not self.config.enabled or self._thread is not None:
+            return
+        self._thread = Thread(target=self._run, args=(application,), name="warm-up", daemon=True)
+        self._thread.start()
+
+    def progress(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._progress)
+
+    def _update(self, **fields):
+        with self._lock:
+            for key, value in fields.items():
+                self._progress[key] = value
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._progress[key] += amount
+
+    def _run(self, application):
+        start = time.perf_counter()
+        self._update(state=WARMUP_RUNNING, stage="imports")
+        try:
+            from backend.bitmapGenerator import BitmapGenerator
+            printers = {printer["ip"]: printer for printer in application.printers.get_all_printers()}
+            layouts = application.printers.get_all_bitmap_settings()
+            last_templates = self._last_templates(application)
+            self._update(stage="layouts", layouts_total=len(layouts), printers_total=len(printers))
+            with render_source(SOURCE_WARMUP):
+                for row in layouts:
+                    self._render_layout(BitmapGenerator, application, printers.get(row["printer_ip"]), row, last_templates)
+                    self._count("layouts_done")
+
+            if self.config.connect_printers and printers:
+                self._update(stage="printers")
+                connected = self.manager.connect_printers(list(printers), timeout=self.config.probe_timeout)
+                self._update(printers_connected=sum(connected.values()))
+        except Exception as e:
+            self._count("errors")
+            logger.exception("Warm-up failed: %s", e)
+        seconds = time.perf_counter() - start
+        progress = self.progress()
+        self._update(state=WARMUP_DONE, stage=None, seconds=round(seconds, 3))
+        logger.info("Warm-up finished in %.2f s: %d layouts, %d static layers, %d of %d printers connected, %d errors",
+                    seconds, progress["layouts_done"], progress["static_layers"], progress["printers_connected"],
+                    progress["printers_total"], progress["errors"])
+
+    def _last_templates(self, application) -> Dict[Tuple[str, str], str]:
+        """Request of the last template job per (printer ip, layout name), group jobs count for each member"""
+        requests = application.printJobs.get_last_requests("template")
+        last = dict(requests)
+        for group in application.printerGroups.get_all_groups():
+            for (target, name), request in requests.items():
+                if target == group["name"]:
+                    for ip in group["members"]:
+                        # A printer's own last job wins over its group's
+                        last.setdefault((ip, name), request)
+        return last
+
+    def _render_layout(self, generator_class, application, printer: Optional[Dict[str, Any]], row: Dict[str, Any],
+                       last_templates: Dict[Tuple[str, str], str]):
+        if printer is None:
+            return
+        try:
+            settings_data = json.loads(row["settings_data"])
+            generator = generator_class(printer["width"], printer["height"], printer["dpi"],
+                                        asset_store=application.assets)
+            region = generator.render_regions(settings_data)[0]
+            # Encoding once also registers Pillow's file formats, which the first PCX pays for
+            encode_region(*region, encodings=self.raster_encodings)
+            request = last_templates.get((row["printer_ip"], row["name"]))
+            if request is not None:
+                # The static layer depends on which fields are variable, the last job tells
+                static_settings, _ = split_template(settings_data, json.loads(request).get("variables"))
+                generator.render_static_region(static_settings)
+                self._count("static_layers")
+        except (TemplateError, TypeError, ValueError, KeyError, OSError) as e:
+            self._count("errors")
+            logger.warning("Warm-up of layout %s for %s failed: %s", row["name"], row["printer_ip"], e)
+
+# Global warm-up
+warm_up = WarmUp()
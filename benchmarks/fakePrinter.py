@@ -0,0 +1,251 @@
+"""
+Simulated TSPL label printer for benchmarks and development without hardware
+
+Listens on TCP (default 9100) and understands the subset of TSPL the app emits:
+SIZE, GAP, DIRECTION, CLS, DOWNLOAD, PUTBMP, PUTPCX, BITMAP (raw and zlib mode 3),
+TEXT, PRINT, plus the <ESC>!? status query and ~!T model query. Printing is simulated
+at a configurable speed, downloads count against a configurable memory buffer and
+connections can be dropped at random.
+
+Usage (from the repository root):
+    python -m benchmarks.fakePrinter --host 127.0.0.2 --port 9100 --speed-ips 5
+"""
+import argparse
+import logging
+import random
+import re
+import socketserver
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("benchmarks.fakePrinter")
+
+# <ESC>!? status byte bits (TSPL)
+STATUS_READY = 0x00
+STATUS_PRINTING = 0x20
+STATUS_OTHER_ERROR = 0x80
+
+DOWNLOAD_PATTERN = re.compile(rb'^DOWNLOAD\s+(?:[FRE],)?"([^"]+)",(\d+),')
+BITMAP_PATTERN = re.compile(rb'^BITMAP\s+(\d+),(\d+),(\d+),(\d+),(\d+),')
+BITMAP_LENGTH_PATTERN = re.compile(rb'(\d+),')
+SIZE_PATTERN = re.compile(r'^SIZE\s+([\d.]+)\s*(mm)?\s*,\s*([\d.]+)\s*(mm)?', re.IGNORECASE)
+PRINT_PATTERN = re.compile(r'^PRINT\s+(\d+)(?:\s*,\s*(\d+))?', re.IGNORECASE)
+
+class PrinterStats:
+    """Counters shared by all connections of one simulated printer"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.bytes_received = 0
+        self.print_commands = 0
+        self.labels_printed = 0
+        self.downloads = 0
+        self.bitmaps = 0
+        self.drops = 0
+        self.errors = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "connections": self.connections,
+                "bytes_received": self.bytes_received,
+                "print_commands": self.print_commands,
+                "labels_printed": self.labels_printed,
+                "downloads": self.downloads,
+                "bitmaps": self.bitmaps,
+                "drops": self.drops,
+                "errors": self.errors
+            }
+
+class TSPLConnectionHandler(socketserver.BaseRequestHandler):
+    """Parses one client's TSPL stream"""
+
+    def setup(self):
+        self.printer = self.server.printer
+        self.buffer = b""
+        self.label_height_mm = 29.0
+        self.status = STATUS_READY
+        with self.printer.stats.lock:
+            self.printer.stats.connections += 1
+
+    def handle(self):
+        sock = self.request
+        while True:
+            try:
+                chunk = sock.recv(65536)
+            except OSError:
+                return
+            if not chunk:
+                return
+            with self.printer.stats.lock:
+                self.printer.stats.bytes_received += len(chunk)
+            self.buffer += chunk
+            if not self._consume():
+                return
+
+    def _drop(self) -> bool:
+        """Randomly drop the connection mid-job when drop emulation is enabled"""
+        if self.printer.drop_rate and random.random() < self.printer.drop_rate:
+            with self.printer.stats.lock:
+                self.printer.stats.drops += 1
+            logger.info("%s dropping connection", self.printer.name)
+            return True
+        return False
+
+    def _consume(self) -> bool:
+        """Execute every complete command in the buffer; False closes the connection"""
+        while self.buffer:
+            if self.buffer.startswith(b"\x1b!?"):
+                self.buffer = self.buffer[3:]
+                self.request.sendall(bytes([self.status]))
+                continue
+            if self.buffer.startswith(b"~!T"):
+                self.buffer = self.buffer[3:].lstrip(b"\r\n")
+                self.request.sendall(self.printer.model.encode("ascii") + b"\r\n")
+                continue
+
+            match = DOWNLOAD_PATTERN.match(self.buffer)
+            if match:
+                size = int(match.group(2))
+                end = match.end() + size
+                if len(self.buffer) < end:
+                    return True  # wait for the rest of the file
+                if not self.printer.store_file(match.group(1).decode("ascii", "ignore"), size):
+                    self.status = STATUS_OTHER_ERROR
+                    with self.printer.stats.lock:
+                        self.printer.stats.errors += 1
+                self.buffer = self.buffer[end:].lstrip(b"\r\n")
+                with self.printer.stats.lock:
+                    self.printer.stats.downloads += 1
+                if self._drop():
+                    return False
+                continue
+
+            match = BITMAP_PATTERN.match(self.buffer)
+            if match:
+                width_bytes, height, mode = int(match.group(3)), int(match.group(4)), int(match.group(5))
+                length = self.printer.bitmap_payload_length(self.buffer, match, width_bytes, height, mode)
+                if length is None:
+                    return True  # wait for the length field
+                header_end, payload_length = length
+                end = header_end + payload_length
+                if len(self.buffer) < end:
+                    return True
+                self.buffer = self.buffer[end:].lstrip(b"\r\n")
+                with self.printer.stats.lock:
+                    self.printer.stats.bitmaps += 1
+                continue
+
+            newline = self.buffer.find(b"\n")
+            if newline < 0:
+                return True
+            line = self.buffer[:newline].decode("utf-8", "ignore").strip()
+            self.buffer = self.buffer[newline + 1:]
+            if line and not self._execute(line):
+                return False
+        return True
+
+    def _execute(self, line: str) -> bool:
+        command = line.split(None, 1)[0].upper()
+        if command == "SIZE":
+            match = SIZE_PATTERN.match(line)
+            if match:
+                height = float(match.group(3))
+                self.label_height_mm = height if match.group(4) else height * 25.4
+        elif command == "PRINT":
+            match = PRINT_PATTERN.match(line)
+            sets = int(match.group(1)) if match else 1
+            copies = int(match.group(2) or 1) if match else 1
+            if self._drop():
+                return False
+            self._print(sets * copies)
+        # CLS, DIRECTION, GAP, PUTBMP, PUTPCX, TEXT, SET ... only affect the image buffer
+        return True
+
+    def _print(self, labels: int):
+        """Simulate the print mechanism; blocking here back-pressures the TCP stream"""
+        self.status = STATUS_PRINTING
+        if self.printer.speed_ips:
+            time.sleep(labels * (self.label_height_mm / 25.4) / self.printer.speed_ips)
+        self.status = STATUS_READY
+        with self.printer.stats.lock:
+            self.printer.stats.print_commands += 1
+            self.printer.stats.labels_printed += labels
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class FakeTSPLPrinter:
+    """One simulated printer bound to host:port"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100, speed_ips: float = 5.0,
+                 buffer_bytes: int = 8 * 1024 * 1024, drop_rate: float = 0.0, model: str = "TE310"):
+        self.host = host
+        self.port = port
+        self.name = f"{host}:{port}"
+        self.speed_ips = speed_ips
+        self.buffer_bytes = buffer_bytes
+        self.drop_rate = drop_rate
+        self.model = model
+        self.files: Dict[str, int] = {}
+        self.stats = PrinterStats()
+        self._server: Optional[_ThreadingServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def store_file(self, name: str, size: int) -> bool:
+        """Keep a downloaded file in simulated memory; False when it doesn't fit"""
+        with self.stats.lock:
+            used = sum(length for key, length in self.files.items() if key != name)
+            if used + size > self.buffer_bytes:
+                return False
+            self.files[name] = size
+            return True
+
+    def bitmap_payload_length(self, buffer: bytes, match, width_bytes: int, height: int, mode: int):
+        """(header end, payload length) for a BITMAP command, None if more bytes are needed"""
+        if mode == 3:
+            # Compressed bitmap: BITMAP x,y,w,h,3,<length>,<zlib data>
+            length_match = BITMAP_LENGTH_PATTERN.match(buffer, match.end())
+            if not length_match:
+                return None
+            return length_match.end(), int(length_match.group(1))
+        return match.end(), width_bytes * height
+
+    def start(self) -> "FakeTSPLPrinter":
+        self._server = _ThreadingServer((self.host, self.port), TSPLConnectionHandler)
+        self._server.printer = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated TSPL printer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--speed-ips", type=float, default=5.0, help="Print speed in inches per second, 0 = instant")
+    parser.add_argument("--buffer-bytes", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Probability of dropping the connection per job")
+    parser.add_argument("--model", default="TE310")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    printer = FakeTSPLPrinter(args.host, args.port, args.speed_ips, args.buffer_bytes, args.drop_rate, args.model).start()
+    logger.info("Fake TSPL printer listening on %s", printer.name)
+    try:
+        while True:
+            time.sleep(5)
+            logger.info("%s %s", printer.name, printer.stats.as_dict())
+    except KeyboardInterrupt:
+        printer.stop()
+
+if __name__ == "__main__":
+    main()
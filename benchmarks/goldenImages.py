@@ -0,0 +1,431 @@
+"""
+Golden-image regression check for BitmapGenerator
+
+Renders canonical labels (the test.py charger label at several serials and resolutions,
+its shrink-to-fit variant, a template static layer and one barcode of each format) through
+every render path: saved BMP, pooled buffer packed for the printer and the precompiled
+layout, with each available raster backend. Every result must match the 1-bit reference
+PNG in benchmarks/golden/, and every barcode on it must decode back to its data from a
+scanline of the rendered pixels, so an optimization can't change a label unnoticed.
+
+The references were captured after the rendering changes of requests 026-046 (text layout,
+pooled buffers, compiled layouts, raster backends), not from the original renderer: they
+lock in the current output and say nothing about whether those changes kept labels as
+they were before. tests/test_goldenImages.py runs the same comparison under pytest.
+
+Usage (from the repository root):
+    python -m benchmarks.goldenImages
+    python -m benchmarks.goldenImages --update          # after an intended rendering change
+    python -m benchmarks.goldenImages --tolerance 0.0005 --diff-dir /tmp/golden-diff
+
+On a mismatch an actual and a diff image are written to --diff-dir: black is ink on both,
+red ink only in the reference, blue ink only in the new render.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import barcode
+import PIL
+from barcode.charsets import code128, code39, ean
+from PIL import Image
+
+from backend.bitmapGenerator import BitmapGenerator
+from backend.layoutCompiler import LayoutCompiler
+from backend.rasterBackend import NUMPY_AVAILABLE
+from backend.tsplTemplate import split_template
+from benchmarks.layouts import charger_fit_label, charger_label, charger_variables
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+MANIFEST_FILE = "manifest.json"
+FONT_FAMILIES = ("Arial",)  # fonts the canonical labels use; references depend on these files
+SCANLINE = 0.2  # barcodes are read at this fraction of their height, above the human readable text
+SCALED_KEYS = ("x", "y", "width", "height", "fontSize", "minFontSize")
+MIN_MODULE_PX = 2.0  # below two dots per module the nearest-neighbour resize makes bars uneven
+WIDE_MODULES = 3  # python-barcode draws wide Code39 elements three modules wide
+
+def barcode_label(serial: int = 0) -> dict:
+    """One barcode of every supported format"""
+    return {
+        "textItems": [],
+        "valueItems": [],
+        "iconItems": [],
+        "barcodeItems": [
+            {"id": 1, "data": f"{10114847068 + serial}", "x": 20, "y": 20, "format": "code128", "width": 360, "height": 100},
+            {"id": 2, "data": f"{869000000000 + serial:012d}", "x": 420, "y": 20, "format": "ean13", "width": 300, "height": 120},
+            {"id": 3, "data": f"HC-{serial:04d}", "x": 760, "y": 20, "format": "code39", "width": 400, "height": 100},
+        ],
+    }
+
+def charger_static_layer(serial: int = 0) -> dict:
+    """What a template job of the charger label sends once: everything but its printer-side variables"""
+    static_settings, _ = split_template(charger_label(serial), charger_variables(serial))
+    return static_settings
+
+def scale_layout(settings_data: dict, dpi: int, design_dpi: int = 300) -> dict:
+    """A layout drawn for design_dpi with its pixel positions and sizes converted to dpi"""
+    factor = dpi / design_dpi
+    scaled = dict(settings_data)
+    for list_name in ("textItems", "valueItems", "iconItems", "barcodeItems"):
+        scaled[list_name] = [
+            {key: round(value * factor) if key in SCALED_KEYS else value for key, value in item.items()}
+            for item in settings_data.get(list_name, [])
+        ]
+    return scaled
+
+# name -> (layout, width mm, height mm, dpi)
+CASES: Dict[str, Tuple[Callable[[], dict], int, int, int]] = {
+    "charger-0": (lambda: charger_label(0), 100, 29, 300),
+    "charger-7": (lambda: charger_label(7), 100, 29, 300),
+    "charger-12345": (lambda: charger_label(12345), 100, 29, 300),
+    "charger-203dpi": (lambda: scale_layout(charger_label(7), 203), 100, 29, 203),
+    "charger-600dpi": (lambda: scale_layout(charger_label(7), 600), 100, 29, 600),
+    "charger_fit-7": (lambda: charger_fit_label(7), 100, 29, 300),
+    "charger_static": (lambda: charger_static_layer(7), 100, 29, 300),
+    "barcodes": (lambda: barcode_label(7), 100, 29, 300),
+}
+
+# Barcode decoding, from the scanline's bar and space widths back to the encoded data
+
+def scanline_runs(image: Image.Image, bbox: List[int]) -> List[Tuple[bool, int]]:
+    """(is bar, pixels) runs of one row of a barcode, from its first to its last bar"""
+    left, top, right, bottom = bbox
+    y = top + int((bottom - top) * SCANLINE)
+    row = image.crop((left, y, right, y + 1)).convert("L").tobytes()
+    inked = [index for index, value in enumerate(row) if value < 128]
+    runs = []
+    for value in row[inked[0]:inked[-1] + 1] if inked else b"":
+        bar = value < 128
+        if runs and runs[-1][0] == bar:
+            runs[-1][1] += 1
+        else:
+            runs.append([bar, 1])
+    return [(bar, pixels) for bar, pixels in runs]
+
+def module_candidates(runs: List[Tuple[bool, int]], modules: int) -> Iterator[str]:
+    """
+    Bars (1) and spaces (0) of a scanline, one character per module
+
+    Every run edge is rounded to a module boundary, so resizing errors don't add up along
+    the row. Nearest-neighbour scaling can shave a pixel off the outer bars, the module
+    width and phase are therefore tried with a little slack, as a scanner would; the
+    symbology's checksum decides which reading is right.
+    """
+    span = sum(pixels for _, pixels in runs)
+    for slack in (0, 1, -1, 2, -2):
+        module_px = (span + slack) / modules
+        for phase in (0.0, 0.5, -0.5, 1.0, -1.0):
+            bits, edge, previous = "", phase, 0
+            for bar, pixels in runs:
+                edge += pixels
+                boundary = round(edge / module_px)
+                if boundary <= previous:
+                    break
+                bits += ("1" if bar else "0") * (boundary - previous)
+                previous = boundary
+            else:
+                if len(bits) == modules:
+                    yield bits
+
+def two_width_modules(runs: List[Tuple[bool, int]], modules: int) -> Iterator[str]:
+    """
+    Modules of a narrow/wide symbology (Code39): each run is classified by its width alone
+
+    Narrow elements come out one to three pixels wide after resizing, which rounding against
+    a module grid can't follow; the threshold halfway between the narrowest and widest run
+    can, as long as wide elements stay wider than any narrow one.
+    """
+    widths = [pixels for _, pixels in runs]
+    threshold = (min(widths) + max(widths)) / 2
+    bits = "".join(("1" if bar else "0") * (WIDE_MODULES if pixels > threshold else 1) for bar, pixels in runs)
+    if len(bits) == modules:
+        yield bits
+
+def read_barcode(image: Image.Image, bbox: List[int], barcode_type: str) -> Tuple[Optional[str], float]:
+    """
+    Data of the barcode in bbox read from the rendered pixels and its pixels per module
+
+    Data is None when the barcode can't be read; module width is 0 when the scanline
+    doesn't have the run count of the symbology at all.
+    """
+    modules_for, candidates, decode = DECODERS[barcode_type]
+    runs = scanline_runs(image, bbox)
+    modules = modules_for(len(runs))
+    if not modules:
+        return None, 0.0
+    module_px = sum(pixels for _, pixels in runs) / modules
+    for bits in candidates(runs, modules):
+        data = decode(bits)
+        if data is not None:
+            return data, module_px
+    return None, module_px
+
+def _code128_modules(runs: int) -> Optional[int]:
+    # 6 runs and 11 modules per symbol, the stop pattern with its bar is 7 runs and 13 modules
+    if runs < 19 or (runs - 7) % 6:
+        return None
+    return (runs - 7) // 6 * 11 + 13
+
+def decode_code128(bits: str) -> Optional[str]:
+    stop = code128.STOP + "11"
+    if not bits.endswith(stop) or (len(bits) - len(stop)) % 11:
+        return None
+    try:
+        values = [code128.CODES.index(bits[i:i + 11]) for i in range(0, len(bits) - len(stop), 11)]
+    except ValueError:
+        return None
+    if len(values) < 2 or values[0] not in code128.START_CODES.values():
+        return None
+    *symbols, check = values
+    if (symbols[0] + sum(position * value for position, value in enumerate(symbols[1:], start=1))) % 103 != check:
+        return None
+    charsets = {name: {value: char for char, value in getattr(code128, name).items()} for name in code128.START_CODES}
+    # Code set C only lists its control codes, 0-99 are digit pairs
+    charsets["C"].update({value: f"{value:02d}" for value in range(100)})
+    charset = next(name for name, value in code128.START_CODES.items() if value == symbols[0])
+    data = ""
+    for value in symbols[1:]:
+        char = charsets[charset].get(value)
+        if char is None or char == "SHIFT":
+            return None
+        if char.startswith("TO_"):
+            charset = char[3:]
+        else:
+            data += char
+    return data
+
+def _ean13_modules(runs: int) -> Optional[int]:
+    return 95 if runs == 59 else None
+
+def decode_ean13(bits: str) -> Optional[str]:
+    if len(bits) != 95 or bits[:3] != ean.EDGE or bits[45:50] != ean.MIDDLE or bits[-3:] != ean.EDGE:
+        return None
+    digits, parity = "", ""
+    for offset in range(3, 45, 7):
+        chunk = bits[offset:offset + 7]
+        for code in ("A", "B"):
+            if chunk in ean.CODES[code]:
+                digits += str(ean.CODES[code].index(chunk))
+                parity += code
+                break
+        else:
+            return None
+    if parity not in ean.LEFT_PATTERN:
+        return None
+    for offset in range(50, 92, 7):
+        chunk = bits[offset:offset + 7]
+        if chunk not in ean.CODES["C"]:
+            return None
+        digits += str(ean.CODES["C"].index(chunk))
+    data = str(ean.LEFT_PATTERN.index(parity)) + digits
+    check = (10 - sum(int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(data[:12])) % 10) % 10
+    return data if int(data[12]) == check else None
+
+def _code39_modules(runs: int) -> Optional[int]:
+    # 9 runs and 15 modules per character, characters separated by a one module space
+    if (runs + 1) % 10:
+        return None
+    characters = (runs + 1) // 10
+    return characters * 16 - 1
+
+def decode_code39(bits: str) -> Optional[str]:
+    patterns = {pattern: char for char, (_, pattern) in code39.MAP.items()}
+    chunks = [bits[i:i + 15] for i in range(0, len(bits), 16)]
+    if len(chunks) < 2 or chunks[0] != code39.EDGE or chunks[-1] != code39.EDGE:
+        return None
+    if any(bits[i - 1] != code39.MIDDLE for i in range(16, len(bits), 16)):
+        return None
+    data = ""
+    for chunk in chunks[1:-1]:
+        if chunk not in patterns:
+            return None
+        data += patterns[chunk]
+    return data
+
+DECODERS = {
+    "code128": (_code128_modules, module_candidates, decode_code128),
+    "ean13": (_ean13_modules, module_candidates, decode_ean13),
+    "code39": (_code39_modules, two_width_modules, decode_code39),
+}
+
+def expected_barcode_data(item: Dict[str, Any]) -> str:
+    # EAN13 and Code39 are printed with their check character appended
+    return barcode.get(str(item.get("format", "code128")).lower(), str(item["data"])).get_fullcode()
+
+def check_barcodes(image: Image.Image, compiled: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """
+    Problems with the barcodes of a rendered label, empty when each decodes to its data
+
+    Barcodes squeezed below MIN_MODULE_PX can't be read reliably from pixels (nor by a
+    scanner from the print); they are returned as notes instead of being verified.
+    """
+    problems, notes = [], []
+    for item in compiled.get("barcodeItems", []):
+        if not item.get("data") or not item.get("bbox"):
+            continue
+        barcode_type = str(item.get("format", "code128")).lower()
+        decoded, module_px = read_barcode(image, item["bbox"], barcode_type)
+        expected = expected_barcode_data(item)
+        name = f"{barcode_type} barcode {item.get('id')} at {item['bbox']}"
+        if decoded == expected:
+            continue
+        if decoded is None and 0 < module_px < MIN_MODULE_PX:
+            notes.append(f"{name} has {module_px:.2f} px per module, too dense to verify")
+        else:
+            problems.append(f"{name} reads {decoded!r}, expected {expected!r}")
+    return problems, notes
+
+# Rendering through each path
+
+def region_to_image(region: tuple, size: Tuple[int, int]) -> Image.Image:
+    """Full label from a packed (x, y, row bytes, height, data) region, 1 bits are white"""
+    x, y, row_bytes, height, data = region
+    image = Image.new("1", size, 1)
+    if height:
+        image.paste(Image.frombytes("1", (row_bytes * 8, height), data), (x, y))
+    return image
+
+def render(case: str, path: str, output_dir: str) -> Tuple[Image.Image, Dict[str, Any]]:
+    """Rendered label of a case through one path, and the compiled layout used for barcode positions"""
+    layout, width_mm, height_mm, dpi = CASES[case]
+    settings_data = layout()
+    compiled = LayoutCompiler(width_mm, height_mm, dpi).compile(settings_data)
+    generator = BitmapGenerator(width_mm, height_mm, dpi, os.path.join(output_dir, f"{case}.bmp"))
+    size = generator.set_label_scale()[:2]
+    if path == "file":
+        generator.create_from_frontend_data(settings_data["textItems"], settings_data["valueItems"],
+                                            settings_data["iconItems"], settings_data["barcodeItems"])
+        with Image.open(generator.filename) as saved:
+            image = saved.convert("1")
+    elif path == "buffer":
+        image = region_to_image(generator.render_regions(settings_data)[0], size)
+    else:  # compiled: the stored form of a saved layout, drawn at its precomputed bboxes
+        image = region_to_image(generator.render_regions(compiled)[0], size)
+    return image, compiled
+
+def compare(reference: Image.Image, image: Image.Image) -> Tuple[int, Optional[Image.Image]]:
+    """Number of differing pixels and a diff image when there are any"""
+    if reference.size != image.size:
+        return reference.width * reference.height, None
+    reference_bytes = reference.convert("L").tobytes()
+    image_bytes = image.convert("L").tobytes()
+    if reference_bytes == image_bytes:
+        return 0, None
+    colors = {(0, 0): b"\x00\x00\x00", (0, 255): b"\xff\x00\x00", (255, 0): b"\x00\x00\xff", (255, 255): b"\xff\xff\xff"}
+    diff = b"".join(colors[pair] for pair in zip(reference_bytes, image_bytes))
+    changed = sum(1 for a, b in zip(reference_bytes, image_bytes) if a != b)
+    return changed, Image.frombytes("RGB", reference.size, diff)
+
+def environment() -> Dict[str, Any]:
+    """What the references depend on besides this repository"""
+    generator = BitmapGenerator()
+    fonts = {}
+    for family in FONT_FAMILIES:
+        font_path = generator._resolve_font_path(family)
+        if font_path:
+            with open(font_path, "rb") as file:
+                fonts[family] = f"{os.path.basename(font_path)} {hashlib.sha1(file.read()).hexdigest()[:12]}"
+        else:
+            fonts[family] = "default bitmap font"
+    return {"pillow": PIL.__version__, "python-barcode": barcode.version, "fonts": fonts}
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Golden-image regression check for BitmapGenerator")
+    parser.add_argument("--update", action="store_true", help="Write the references from the current renderer")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument("--paths", nargs="+", choices=["file", "buffer", "compiled"], default=["file", "buffer", "compiled"])
+    parser.add_argument("--raster", choices=["auto", "pillow", "numpy", "both"], default="both",
+                        help="Raster backend for compositing and packing; both checks pillow and numpy")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="Allowed fraction of differing pixels, 0 requires identical labels")
+    parser.add_argument("--diff-dir", default=os.path.join(tempfile.gettempdir(), "golden-diff"),
+                        help="Where actual and diff images of failed cases are written")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("backend").setLevel(logging.ERROR)
+
+    rasters = ["pillow", "numpy"] if args.raster == "both" else [args.raster]
+    if "numpy" in rasters and not NUMPY_AVAILABLE:
+        print("NumPy is not installed, skipping the numpy raster backend")
+        rasters = [raster for raster in rasters if raster != "numpy"]
+
+    manifest_path = os.path.join(GOLDEN_DIR, MANIFEST_FILE)
+    current = environment()
+    if args.update:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        os.environ["HERA_RASTER_BACKEND"] = rasters[0]
+        manifest = {"environment": current, "cases": {}}
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, encoding="utf-8") as file:
+                manifest["cases"] = json.load(file).get("cases", {})
+        with tempfile.TemporaryDirectory() as output_dir:
+            for case in args.cases:
+                image, compiled = render(case, "file", output_dir)
+                problems, notes = check_barcodes(image, compiled)
+                for note in notes:
+                    print(f"note {case}: {note}")
+                if problems:
+                    # A reference must itself be a readable label
+                    for problem in problems:
+                        print(f"FAIL {case}: {problem}")
+                    return 1
+                image.save(os.path.join(GOLDEN_DIR, f"{case}.png"), optimize=True)
+                manifest["cases"][case] = {
+                    "size": list(image.size),
+                    "black_pixels": image.histogram()[0],
+                    "sha1": hashlib.sha1(image.tobytes()).hexdigest()
+                }
+                print(f"Wrote {case}.png {image.width}x{image.height}")
+        with open(manifest_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+        return 0
+
+    with open(manifest_path, encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("environment") != current:
+        print(f"Warning: references were made with {manifest.get('environment')}, this is {current}; "
+              f"mismatches may come from fonts or libraries rather than the renderer")
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as output_dir:
+        for raster in rasters:
+            os.environ["HERA_RASTER_BACKEND"] = raster
+            for case in args.cases:
+                with Image.open(os.path.join(GOLDEN_DIR, f"{case}.png")) as file:
+                    reference = file.convert("1")
+                for path in args.paths:
+                    name = f"{case}/{path}/{raster}"
+                    image, compiled = render(case, path, output_dir)
+                    changed, diff = compare(reference, image)
+                    allowed = int(args.tolerance * reference.width * reference.height)
+                    problems, notes = check_barcodes(image, compiled)
+                    for note in notes:
+                        print(f"note {name}: {note}")
+                    if changed > allowed:
+                        problems.insert(0, f"{changed} pixels differ from the reference (allowed {allowed})")
+                    if not problems:
+                        print(f"ok   {name}" + (f" ({changed} pixels within tolerance)" if changed else ""))
+                        continue
+                    failures += 1
+                    for problem in problems:
+                        print(f"FAIL {name}: {problem}")
+                    os.makedirs(args.diff_dir, exist_ok=True)
+                    prefix = os.path.join(args.diff_dir, f"{case}-{path}-{raster}")
+                    image.save(f"{prefix}-actual.png")
+                    if diff is not None:
+                        diff.save(f"{prefix}-diff.png")
+                    print(f"     images in {prefix}-*.png")
+
+    if failures:
+        print(f"{failures} golden image check(s) failed")
+        return 1
+    print("All golden images match")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
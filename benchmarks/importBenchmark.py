@@ -0,0 +1,80 @@
+"""
+Bulk printer import benchmark
+
+Imports generated printers through POST /api/printers/import (one transaction) and,
+for comparison, through one POST /api/printers per printer, then reports rows per second.
+
+The run happens in a temporary working directory so the real database is never touched.
+
+Usage (from the repository root):
+    python -m benchmarks.importBenchmark
+    python -m benchmarks.importBenchmark --rows 5000 --format csv
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+def generate_printers(count: int, offset: int = 0) -> list:
+    return [
+        {"ip": f"10.{(n >> 16) & 0xFF}.{(n >> 8) & 0xFF}.{n & 0xFF}", "name": f"Line {n}", "dpi": 300, "width": 100, "height": 29}
+        for n in range(offset, offset + count)
+    ]
+
+def run(rows: int, file_format: str, single_rows: int) -> dict:
+    # Imported here so the Application uses the temporary working directory for its database
+    from backend.printerImport import printers_to_csv
+    from main import Application
+    client = Application(start_server=False).flaskModule.app.test_client()
+
+    printers = generate_printers(rows)
+    start = time.perf_counter()
+    if file_format == "csv":
+        response = client.post("/api/printers/import", data=printers_to_csv(printers), content_type="text/csv")
+    else:
+        response = client.post("/api/printers/import", json={"printers": printers})
+    bulk_seconds = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"Import failed: {response.get_json()}")
+
+    start = time.perf_counter()
+    for printer in generate_printers(single_rows, offset=rows):
+        client.post("/api/printers", json=printer)
+    single_seconds = time.perf_counter() - start
+
+    return {
+        "rows": rows,
+        "format": file_format,
+        "bulk_seconds": bulk_seconds,
+        "bulk_rows_per_second": rows / bulk_seconds,
+        "single_rows": single_rows,
+        "single_rows_per_second": single_rows / single_seconds if single_rows else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk printer import benchmark")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("--single-rows", type=int, default=100, help="Printers added one request at a time for comparison")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, repo_root)
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="hera-import-bench-") as work_dir:
+        os.chdir(work_dir)
+        try:
+            result = run(args.rows, args.format, args.single_rows)
+        finally:
+            os.chdir(previous_cwd)
+
+    print(f"bulk import: {result['rows']} rows ({result['format']}) in {result['bulk_seconds'] * 1000:.1f} ms "
+          f"({result['bulk_rows_per_second']:.0f} rows/s)")
+    if result["single_rows_per_second"]:
+        print(f"one request per printer: {result['single_rows_per_second']:.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Realistic label layouts for benchmarks, in the frontend data format
+(textItems / valueItems / iconItems / barcodeItems) used by BitmapGenerator.create_from_frontend_data.
+
+The charger label mirrors the 100x29 mm TE310 layout in test.py. Icons are synthesized
+so the benchmark does not depend on files outside the repo.
+"""
+import base64
+from io import BytesIO
+from PIL import Image, ImageDraw
+
+def _icon_data_url(width: int, height: int, shape: str) -> str:
+    """Grayscale PNG icon with anti-aliased edges, as a base64 data URL"""
+    img = Image.new("RGBA", (width * 4, height * 4), (255, 255, 255, 0))
+    draw = ImageDraw.Draw(img)
+    if shape == "ellipse":
+        draw.ellipse([4, 4, img.width - 4, img.height - 4], outline=(0, 0, 0, 255), width=12)
+    elif shape == "square":
+        draw.rectangle([4, 4, img.width - 4, img.height - 4], outline=(0, 0, 0, 255), width=12)
+    else:
+        draw.polygon([(img.width // 2, 4), (img.width - 4, img.height - 4), (4, img.height - 4)], fill=(60, 60, 60, 255))
+    img = img.resize((width * 2, height * 2), Image.LANCZOS)
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+def _text(content: str, x: int, y: int, font_size: int, value_id: str = None) -> dict:
+    item = {"content": content, "x": x, "y": y, "fontSize": font_size, "fontFamily": "Arial"}
+    if value_id:
+        item["valueId"] = value_id
+    return item
+
+def _icon(icon_file: str, x: int, y: int, width: int, height: int) -> dict:
+    return {"iconFile": icon_file, "x": x, "y": y, "width": width, "height": height}
+
+_icons = None
+
+def _get_icons() -> dict:
+    global _icons
+    if _icons is None:
+        _icons = {
+            "logo": _icon_data_url(216, 90, "triangle"),
+            "m24": _icon_data_url(84, 70, "ellipse"),
+            "square": _icon_data_url(56, 56, "square"),
+            "ce": _icon_data_url(70, 56, "ellipse"),
+            "recycle": _icon_data_url(56, 56, "triangle"),
+        }
+    return _icons
+
+def charger_label(serial: int = 0) -> dict:
+    """The test.py charger label; value items and the barcode change with `serial`"""
+    icons = _get_icons()
+    labels = ["Product Code", "Model", "System", "Rated Voltage", "Rated Power"]
+    text_items = []
+    for row, label in enumerate(labels):
+        y = 102 + row * 32
+        text_items.append(_text(label, 10, y, 27))
+        text_items.append(_text(":", 195, y, 27))
+    text_items += [
+        _text("ChargePack® BS33A Smart+ Type2 Socket", 205, 136, 25),
+        _text("RFID, Wifi, Ethernet, Bluetooth, 4G whit MID METER", 205, 168, 25),
+        _text("Three Phase 340-460 VAC 50-60 Hz", 205, 200, 25),
+        _text("Max 32A - 22kW", 205, 232, 25),
+        _text("Hera Charge Elektronik A.Ş.", 10, 265, 27),
+        _text("www.heracharge.com", 10, 295, 27),
+        _text("Made in Türkiye", 970, 320, 14),
+    ]
+    values = charger_payload(serial)["values"]
+    value_items = [
+        _text(values["product_code"], 205, 104, 25, "product_code"),
+        _text(values["bt_mac"], 755, 20, 26, "bt_mac"),
+        _text(values["lan_mac"], 755, 55, 26, "lan_mac"),
+        _text(values["imei"], 755, 90, 26, "imei"),
+        _text(values["date"], 920, 190, 25, "date"),
+    ]
+    icon_items = [
+        _icon(icons["logo"], 20, 10, 216, 90),
+        _icon(icons["m24"], 400, 260, 84, 70),
+        _icon(icons["square"], 490, 260, 56, 56),
+        _icon(icons["ce"], 555, 260, 70, 56),
+        _icon(icons["recycle"], 630, 260, 56, 56),
+    ]
+    barcode_items = [
+        {"id": 1, "data": charger_payload(serial)["barcodes"]["1"], "x": 760, "y": 220, "format": "code128", "width": 360, "height": 100},
+    ]
+    return {
+        "textItems": text_items,
+        "valueItems": value_items,
+        "iconItems": icon_items,
+        "barcodeItems": barcode_items,
+    }
+
+def charger_fit_label(serial: int = 0) -> dict:
+    """The charger label with its description lines and product code in shrink-to-fit text boxes"""
+    layout = charger_label(serial)
+    boxed = {"ChargePack® BS33A Smart+ Type2 Socket", "RFID, Wifi, Ethernet, Bluetooth, 4G whit MID METER"}
+    for item in layout["textItems"]:
+        if item["content"] in boxed:
+            # Up to the MAC column at x=755, two lines when one doesn't fit
+            item.update(width=540, height=32, fit="shrink", minFontSize=14)
+    for item in layout["valueItems"]:
+        if item["valueId"] == "product_code":
+            item.update(width=300, height=30, fit="shrink", minFontSize=14)
+    return layout
+
+def charger_payload(serial: int) -> dict:
+    """Variable fields of the charger label for one serial, in /api/printer/print payload format"""
+    mac = serial & 0xFFFFFF
+    mac_suffix = f"{mac >> 16 & 0xFF:02X}:{mac >> 8 & 0xFF:02X}:{mac & 0xFF:02X}"
+    return {
+        "values": {
+            "product_code": f"HC0223{serial:05d}",
+            "bt_mac": f"BT Mac : E8:51:9E:{mac_suffix}",
+            "lan_mac": f"Lan Mac: 1E:23:D4:{mac_suffix}",
+            "imei": f"IMEI   : {867395071672212 + serial}",
+            "date": "Date: 18/03/2025",
+        },
+        "barcodes": {"1": f"{10114847068 + serial}"},
+    }
+
+def charger_variables(serial: int) -> dict:
+    """Printer-side variables for a template run of the charger label starting at `serial`"""
+    # MAC suffixes are hex and cannot be printer counters, they stay in the static layer
+    return {
+        "values": {
+            "product_code": {"type": "counter", "prefix": "HC0223", "start": f"{serial:05d}"},
+            "imei": {"type": "counter", "prefix": "IMEI   : ", "start": str(867395071672212 + serial)},
+            "date": {"type": "date", "prefix": "Date: "},
+        },
+        "barcodes": {"1": {"type": "counter", "start": str(10114847068 + serial)}},
+    }
+
+LAYOUTS = {
+    "charger": charger_label,
+    "charger_fit": charger_fit_label,
+}
+
+PAYLOADS = {
+    "charger": charger_payload,
+    "charger_fit": charger_payload,
+}
+
+TEMPLATE_VARIABLES = {
+    "charger": charger_variables,
+    "charger_fit": charger_variables,
+}
@@ -0,0 +1,210 @@
+"""
+End-to-end print throughput benchmark
+
+Starts N simulated TSPL printers (benchmarks.fakePrinter) on 127.0.0.2, 127.0.0.3, ...
+port 9100, registers them through the Flask API, saves the charger layout for each and
+then fires print jobs at all of them concurrently through /api/printer/print.
+Reports labels/sec, job latency percentiles and bytes on the wire.
+
+The run happens in a temporary working directory so the real database and bitmap files
+are never touched.
+
+Usage (from the repository root):
+    python -m benchmarks.printBenchmark --printers 4 --jobs 20
+    python -m benchmarks.printBenchmark --printers 2 --jobs 10 --speed-ips 0 --drop-rate 0.05
+    python -m benchmarks.printBenchmark --mode layout --labels-per-job 50 --jobs 2
+    python -m benchmarks.printBenchmark --mode template --labels-per-job 50 --jobs 2
+    python -m benchmarks.printBenchmark --mode layout --group --labels-per-job 20 --jobs 5
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.fakePrinter import FakeTSPLPrinter
+from benchmarks.layouts import LAYOUTS, PAYLOADS, TEMPLATE_VARIABLES
+from benchmarks.renderBenchmark import percentile
+
+def continued_serials(variables: dict) -> dict:
+    """Template variables whose counters continue after the last journaled serial"""
+    # Serials are never reissued, so concurrent jobs must not pick their own start values
+    return {
+        section: {key: {k: v for k, v in spec.items() if k != "start"} for key, spec in specs.items()}
+        for section, specs in variables.items()
+    }
+
+def run(printer_count: int, jobs_per_printer: int, speed_ips: float, drop_rate: float, buffer_bytes: int, layout_name: str,
+        mode: str = "bmp", labels_per_job: int = 1, copies: int = 1, group: bool = False) -> Dict:
+    # Admission control paces each printer at its print speed; an instant printer is not limited
+    if speed_ips > 0:
+        labels_per_second = speed_ips * 25.4 / 29  # the benchmark registers 29 mm labels
+        os.environ.setdefault("HERA_PRINTER_RATES", ",".join(
+            f"127.0.0.{index + 2}={labels_per_second:.2f}" for index in range(printer_count)))
+    else:
+        os.environ.setdefault("HERA_ADMISSION", "0")
+    # Imported here so the Application uses the temporary working directory for its database
+    from main import Application
+
+    class BenchmarkApplication(Application):
+        def __init__(self):
+            super().__init__(start_server=False)
+
+    application = BenchmarkApplication()
+    client = application.flaskModule.app.test_client()
+
+    printers = []
+    for index in range(printer_count):
+        printers.append(FakeTSPLPrinter(f"127.0.0.{index + 2}", 9100, speed_ips, buffer_bytes, drop_rate).start())
+
+    layout = LAYOUTS[layout_name](0)
+    for printer in printers:
+        response = client.post("/api/printers", json={
+            "ip": printer.host, "name": f"bench-{printer.host}", "dpi": 300, "width": 100, "height": 29
+        })
+        assert response.status_code == 201, response.get_json()
+        response = client.post("/api/bitmap-settings", json={"ip": printer.host, "name": "default", **layout})
+        assert response.status_code == 200, response.status_code
+    if group:
+        response = client.post("/api/printer-groups", json={"name": "bench", "members": [p.host for p in printers]})
+        assert response.status_code == 200, response.get_json()
+
+    latencies: List[float] = []
+    failures = [0]
+    lock = threading.Lock()
+
+    def worker(printer: FakeTSPLPrinter = None):
+        # One client per printer: jobs for the same printer are serialized, printers run in parallel.
+        # In group mode a single client sends every job to the group and the dispatcher fans out.
+        worker_client = application.flaskModule.app.test_client()
+        labels = labels_per_job * printer_count if group else labels_per_job
+        for job in range(jobs_per_printer):
+            if group:
+                first_serial = job * labels
+                request_body = {"group": "bench", "type": mode, "name": "default", "copies": copies}
+                if mode == "template":
+                    request_body.update(sets=labels, variables=continued_serials(TEMPLATE_VARIABLES[layout_name](0)))
+                else:
+                    request_body["payloads"] = [PAYLOADS[layout_name](serial) for serial in range(first_serial, first_serial + labels)]
+            elif mode == "layout":
+                # Render saved layout per payload and stream all labels in one session
+                first_serial = job * labels_per_job
+                request_body = {
+                    "ip": printer.host, "type": "layout", "name": "default", "copies": copies,
+                    "payloads": [PAYLOADS[layout_name](serial) for serial in range(first_serial, first_serial + labels_per_job)]
+                }
+            elif mode == "template":
+                # Static layer uploaded once, the printer numbers the labels itself
+                request_body = {
+                    "ip": printer.host, "type": "template", "name": "default", "copies": copies,
+                    "sets": labels_per_job, "variables": continued_serials(TEMPLATE_VARIABLES[layout_name](0))
+                }
+            else:
+                request_body = {
+                    "ip": printer.host, "type": "bmp", "bmp_path": f"bitmap_{printer.host}_default.bmp", "copies": copies
+                }
+            start = time.perf_counter()
+            response = worker_client.post("/api/printer-groups/print" if group else "/api/printer/print", json=request_body)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code != 200:
+                    failures[0] += 1
+
+    if group:
+        threads = [threading.Thread(target=worker)]
+    else:
+        threads = [threading.Thread(target=worker, args=(printer,)) for printer in printers]
+    batch_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Let the simulated mechanisms finish the last labels
+    deadline = time.time() + 30
+    labels_per_request = (labels_per_job if mode in ("layout", "template") else 1) * copies
+    if group:
+        expected = (jobs_per_printer - failures[0]) * labels_per_request * printer_count
+    else:
+        expected = (printer_count * jobs_per_printer - failures[0]) * labels_per_request
+    while time.time() < deadline and sum(p.stats.labels_printed for p in printers) < expected:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - batch_start
+
+    stats = [printer.stats.as_dict() for printer in printers]
+    for printer in printers:
+        printer.stop()
+
+    labels = sum(entry["labels_printed"] for entry in stats)
+    wire_bytes = sum(entry["bytes_received"] for entry in stats)
+    latencies.sort()
+    return {
+        "mode": mode,
+        "group": group,
+        "printers": printer_count,
+        "jobs": jobs_per_printer if group else printer_count * jobs_per_printer,
+        "failed_jobs": failures[0],
+        "labels_printed": labels,
+        "elapsed_s": elapsed,
+        "labels_per_s": labels / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "bytes_on_wire": wire_bytes,
+        "bytes_per_label": wire_bytes / labels if labels else 0,
+        "printer_stats": stats
+    }
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end print throughput benchmark")
+    parser.add_argument("--printers", type=int, default=4)
+    parser.add_argument("--jobs", type=int, default=20, help="Jobs per printer")
+    parser.add_argument("--speed-ips", type=float, default=5.0, help="Simulated print speed, 0 = instant")
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--buffer-bytes", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="charger")
+    parser.add_argument("--mode", choices=["bmp", "layout", "template"], default="bmp",
+                        help="bmp: print the saved BMP file, layout: render payloads server-side in one session, "
+                             "template: printer-side counters over a static layer")
+    parser.add_argument("--labels-per-job", type=int, default=1, help="Labels per job in layout and template mode")
+    parser.add_argument("--copies", type=int, default=1)
+    parser.add_argument("--group", action="store_true",
+                        help="Send layout/template jobs to a group of all printers (labels-per-job x printers each)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("backend").setLevel(logging.WARNING)
+    output = os.path.abspath(args.output) if args.output else None
+
+    repository_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if repository_root not in sys.path:
+        sys.path.insert(0, repository_root)
+
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            result = run(args.printers, args.jobs, args.speed_ips, args.drop_rate, args.buffer_bytes, args.layout,
+                         args.mode, args.labels_per_job, args.copies, args.group)
+        finally:
+            os.chdir(previous_cwd)
+
+    print(
+        f"{result['printers']} printers, {result['jobs']} jobs ({result['failed_jobs']} failed): "
+        f"{result['labels_per_s']:.2f} labels/s, p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+        f"p99 {result['p99_ms']:.1f} ms, {result['bytes_on_wire']} bytes on wire "
+        f"({result['bytes_per_label']:.0f} bytes/label)"
+    )
+
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+        print(f"Results written to {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Render benchmark for BitmapGenerator
+
+Renders the charger label from test.py (text, value, icon and barcode items) with a
+different serial per label, at several batch sizes, and reports per-label latency
+percentiles, throughput, time per item type and peak RSS.
+
+Usage (from the repository root):
+    python -m benchmarks.renderBenchmark
+    python -m benchmarks.renderBenchmark --sizes 100 1000 --baseline benchmarks/baseline_render.json
+    python -m benchmarks.renderBenchmark --compare benchmarks/baseline_render.json --tolerance 0.15
+    python -m benchmarks.renderBenchmark --mode buffer --raster both
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from backend.bitmapGenerator import BitmapGenerator
+from backend.imageCache import image_cache
+from backend.metricsModule import render_item_seconds
+from backend.rasterBackend import NUMPY_AVAILABLE
+from benchmarks.layouts import LAYOUTS
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def run_batch(layout_name: str, count: int, width_mm: int, height_mm: int, dpi: int, output_dir: str, mode: str = "file") -> Dict:
+    """Render `count` labels and return latency/throughput statistics"""
+    layout = LAYOUTS[layout_name]
+    item_totals_before = render_item_seconds.totals()
+    filename = os.path.join(output_dir, f"bench_{layout_name}.bmp")
+
+    latencies = []
+    batch_start = time.perf_counter()
+    for serial in range(count):
+        data = layout(serial)
+        start = time.perf_counter()
+        generator = BitmapGenerator(width_mm, height_mm, dpi, filename)
+        if mode == "buffer":
+            # Render into a pooled LabelBuffer and pack rows as the printer encoder would
+            label_buffer = generator.render_frontend_data(
+                data["textItems"], data["valueItems"], data["iconItems"], data["barcodeItems"]
+            )
+            label_buffer.packed_rows()
+            generator.release_buffer()
+        else:
+            generator.create_from_frontend_data(
+                data["textItems"], data["valueItems"], data["iconItems"], data["barcodeItems"]
+            )
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - batch_start
+
+    item_times = {}
+    for key, (item_count, item_sum) in render_item_seconds.totals().items():
+        before_count, before_sum = item_totals_before.get(key, (0, 0.0))
+        if item_count > before_count:
+            item_times[key[0]] = {
+                "count": item_count - before_count,
+                "mean_ms": (item_sum - before_sum) / (item_count - before_count) * 1000
+            }
+
+    latencies.sort()
+    return {
+        "layout": layout_name,
+        "mode": mode,
+        "raster": os.environ.get("HERA_RASTER_BACKEND", "auto"),
+        "labels": count,
+        "elapsed_s": elapsed,
+        "labels_per_s": count / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "item_times": item_times,
+        "image_cache_hit_ratio": image_cache.hit_ratio(),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Return a message per batch whose p50/p90 latency regressed beyond tolerance"""
+    regressions = []
+    def key(entry):
+        return entry["layout"], entry.get("mode", "file"), entry.get("raster", "auto"), entry["labels"]
+
+    previous = {key(entry): entry for entry in baseline.get("results", [])}
+    for result in results:
+        reference = previous.get(key(result))
+        if not reference:
+            continue
+        for metric in ("p50_ms", "p90_ms"):
+            if reference[metric] and result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{result['layout']}/{result['raster']} x{result['labels']} {metric}: {result[metric]:.2f} ms vs baseline {reference[metric]:.2f} ms"
+                )
+    return regressions
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="BitmapGenerator render benchmark")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="charger")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--width-mm", type=int, default=100)
+    parser.add_argument("--height-mm", type=int, default=29)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--mode", choices=["file", "buffer"], default="file",
+                        help="file: render and save BMP, buffer: render into a pooled LabelBuffer and pack rows")
+    parser.add_argument("--raster", choices=["auto", "pillow", "numpy", "both"], default="auto",
+                        help="Raster backend for compositing and packing; both runs pillow then numpy")
+    parser.add_argument("--baseline", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against this JSON baseline, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown for --compare")
+    args = parser.parse_args(argv)
+
+    # Keep per-item debug logging out of the measurement
+    logging.getLogger("backend").setLevel(logging.WARNING)
+
+    rasters = ["pillow", "numpy"] if args.raster == "both" else [args.raster]
+    if "numpy" in rasters and not NUMPY_AVAILABLE:
+        print("NumPy is not installed, skipping the numpy raster backend")
+        rasters = [raster for raster in rasters if raster != "numpy"]
+
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for raster in rasters:
+            os.environ["HERA_RASTER_BACKEND"] = raster
+            # Warm fonts, barcode writer and icon tiles so the first batch isn't penalized
+            run_batch(args.layout, 5, args.width_mm, args.height_mm, args.dpi, output_dir, args.mode)
+            for size in args.sizes:
+                result = run_batch(args.layout, size, args.width_mm, args.height_mm, args.dpi, output_dir, args.mode)
+                results.append(result)
+                print(
+                    f"{result['layout']:>8}/{raster:<6} x{size:<6} "
+                    f"p50 {result['p50_ms']:7.2f} ms  p90 {result['p90_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+                    f"{result['labels_per_s']:8.1f} labels/s  rss {result['peak_rss_mb'] or 0:.1f} MB"
+                )
+                for item_type, stats in sorted(result["item_times"].items()):
+                    print(f"           {item_type:<8} {stats['mean_ms']:7.3f} ms/item  ({stats['count']} items)")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+
+    if args.baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
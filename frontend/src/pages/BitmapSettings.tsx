@@ -7,7 +7,16 @@ interface BitmapSettingsProps {
   onBack: () => void;
 }
 
-interface TextItem {
+// A width turns text into a box: wrapped, optionally shrunk to fit and aligned
+interface TextBoxFields {
+  width?: number;
+  height?: number;
+  fit?: 'none' | 'shrink';
+  minFontSize?: number;
+  align?: 'left' | 'center' | 'right';
+}
+
+interface TextItem extends TextBoxFields {
   id: number;
   content: string;
   x: number;
@@ -16,7 +25,7 @@ interface TextItem {
   fontFamily: string;
 }
 
-interface ValueItem {
+interface ValueItem extends TextBoxFields {
   id: number;
   valueId: string;  // Kullanıcının girdiği ID
   content: string;
@@ -33,6 +42,7 @@ interface IconItem {
   width: number;
   height: number;
   iconFile: string;
+  assetId?: string;
 }
 
 interface BarcodeItem {
@@ -280,7 +290,7 @@ const BitmapSettings: React.FC<BitmapSettingsProps> = ({ printer, onBack }) => {
     setNextTextId(prev => prev + 1);
   };
 
-  const updateTextItem = (id: number, field: string, value: string | number) => {
+  const updateTextItem = (id: number, field: string, value: string | number | undefined) => {
     console.log(`Updating text item ${id}, field: ${field}, value: ${value}`);
     setTextItems(prev => {
       const updated = prev.map(item => 
@@ -314,7 +324,7 @@ const BitmapSettings: React.FC<BitmapSettingsProps> = ({ printer, onBack }) => {
     setNextValueId(prev => prev + 1);
   };
 
-  const updateValueItem = (id: number, field: string, value: string | number) => {
+  const updateValueItem = (id: number, field: string, value: string | number | undefined) => {
     console.log(`Updating value item ${id}, field: ${field}, value: ${value}`);
     setValueItems(prev => {
       const updated = prev.map(item => 
@@ -342,7 +352,7 @@ const BitmapSettings: React.FC<BitmapSettingsProps> = ({ printer, onBack }) => {
     setNextIconId(prev => prev + 1);
   };
 
-  const updateIconItem = (id: number, field: string, value: string | number) => {
+  const updateIconItem = (id: number, field: string, value: string | number | undefined) => {
     setIconItems(prev => 
       prev.map(item => 
         item.id === id ? { ...item, [field]: value } : item
@@ -354,9 +364,18 @@ const BitmapSettings: React.FC<BitmapSettingsProps> = ({ printer, onBack }) => {
     setIconItems(prev => prev.filter(item => item.id !== id));
   };
 
-  const handleIconFileChange = (id: number, event: React.ChangeEvent<HTMLInputElement>) => {
+  const handleIconFileChange = async (id: number, event: React.ChangeEvent<HTMLInputElement>) => {
     const file = event.target.files?.[0];
     if (file) {
+      try {
+        // İkonu bir kez yükle, düzen içinde sadece referansını sakla
+        const asset = await apiService.uploadAsset(file);
+        updateIconItem(id, 'assetId', asset.id);
+        updateIconItem(id, 'iconFile', asset.url);
+        return;
+      } catch (error) {
+        console.error('Error uploading icon:', error);
+      }
       const reader = new FileReader();
       reader.onload = (e) => {
         const result = e.target?.result as string;
@@ -523,6 +542,50 @@ const BitmapSettings: React.FC<BitmapSettingsProps> = ({ printer, onBack }) => {
                     <option value="Helvetica">Helvetica</option>
                   </select>
                 </div>
+                <div className="form-group">
+                  <label>Kutu Genişliği:</label>
+                  <input
+                    type="number"
+                    value={textItem.width ?? ''}
+                    onChange={(e) => updateTextItem(textItem.id, 'width', e.target.value === '' ? undefined : parseInt(e.target.value))}
+                    min="1"
+                    placeholder="Tek satır"
+                  />
+                </div>
+                <div className="form-group">
+                  <label>Kutu Yüksekliği:</label>
+                  <input
+                    type="number"
+                    value={textItem.height ?? ''}
+                    onChange={(e) => updateTextItem(textItem.id, 'height', e.target.value === '' ? undefined : parseInt(e.target.value))}
+                    min="1"
+                    placeholder="Serbest"
+                    disabled={!textItem.width}
+                  />
+                </div>
+                <div className="form-group">
+                  <label>Sığdırma:</label>
+                  <select
+                    value={textItem.fit ?? 'none'}
+                    onChange={(e) => updateTextItem(textItem.id, 'fit', e.target.value)}
+                    disabled={!textItem.width}
+                  >
+                    <option value="none">Satır kaydır</option>
+                    <option value="shrink">Küçülterek sığdır</option>
+                  </select>
+                </div>
+                <div className="form-group">
+                  <label>Hizalama:</label>
+                  <select
+                    value={textItem.align ?? 'left'}
+                    onChange={(e) => updateTextItem(textItem.id, 'align', e.target.value)}
+                    disabled={!textItem.width}
+                  >
+                    <option value="left">Sol</option>
+                    <option value="center">Orta</option>
+                    <option value="right">Sağ</option>
+                  </select>
+                </div>
               </div>
             ))}
           </div>
@@ -615,6 +678,50 @@ const BitmapSettings: React.FC<BitmapSettingsProps> = ({ printer, onBack }) => {
                     <option value="Helvetica">Helvetica</option>
                   </select>
                 </div>
+                <div className="form-group">
+                  <label>Kutu Genişliği:</label>
+                  <input
+                    type="number"
+                    value={valueItem.width ?? ''}
+                    onChange={(e) => updateValueItem(valueItem.id, 'width', e.target.value === '' ? undefined : parseInt(e.target.value))}
+                    min="1"
+                    placeholder="Tek satır"
+                  />
+                </div>
+                <div className="form-group">
+                  <label>Kutu Yüksekliği:</label>
+                  <input
+                    type="number"
+                    value={valueItem.height ?? ''}
+                    onChange={(e) => updateValueItem(valueItem.id, 'height', e.target.value === '' ? undefined : parseInt(e.target.value))}
+                    min="1"
+                    placeholder="Serbest"
+                    disabled={!valueItem.width}
+                  />
+                </div>
+                <div className="form-group">
+                  <label>Sığdırma:</label>
+                  <select
+                    value={valueItem.fit ?? 'none'}
+                    onChange={(e) => updateValueItem(valueItem.id, 'fit', e.target.value)}
+                    disabled={!valueItem.width}
+                  >
+                    <option value="none">Satır kaydır</option>
+                    <option value="shrink">Küçülterek sığdır</option>
+                  </select>
+                </div>
+                <div className="form-group">
+                  <label>Hizalama:</label>
+                  <select
+                    value={valueItem.align ?? 'left'}
+                    onChange={(e) => updateValueItem(valueItem.id, 'align', e.target.value)}
+                    disabled={!valueItem.width}
+                  >
+                    <option value="left">Sol</option>
+                    <option value="center">Orta</option>
+                    <option value="right">Sağ</option>
+                  </select>
+                </div>
               </div>
             ))}
           </div>
@@ -650,7 +757,7 @@ const BitmapSettings: React.FC<BitmapSettingsProps> = ({ printer, onBack }) => {
                   />
                   {iconItem.iconFile && (
                     <div className="icon-preview">
-                      <img src={iconItem.iconFile} alt="Icon preview" style={{ maxWidth: '50px', maxHeight: '50px' }} />
+                      <img src={apiService.assetUrl(iconItem.iconFile)} alt="Icon preview" style={{ maxWidth: '50px', maxHeight: '50px' }} />
                     </div>
                   )}
                 </div>
@@ -8,6 +8,12 @@ const HomePage: React.FC = () => {
 
   useEffect(() => {
     fetchPrinters();
+    const unsubscribe = apiService.subscribeEvents({
+      onPrinterStatus: (event) => setPrinters((current) => current.map((printer) =>
+        printer.ip === event.ip ? { ...printer, is_online: event.is_online, status: event.status } : printer
+      )),
+    });
+    return unsubscribe;
   }, []);
 
   const fetchPrinters = async () => {
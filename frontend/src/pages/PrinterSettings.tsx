@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { Printer, apiService } from '../services/api';
+import { Printer, DiscoveryResult, apiService } from '../services/api';
 import PrinterCard from '../components/PrinterCard';
 import '../styles/pages/PrinterSettings.css';
 
@@ -17,12 +17,26 @@ const PrinterSettings: React.FC = () => {
     width: 100,
     height: 30
   });
+  const [cidr, setCidr] = useState('');
+  const [scanning, setScanning] = useState(false);
+  const [discovery, setDiscovery] = useState<DiscoveryResult | null>(null);
   const navigate = useNavigate();
 
   useEffect(() => {
     fetchPrinters();
+    const unsubscribe = apiService.subscribeEvents({
+      onPrinterStatus: (event) => setPrinters((current) => current.map((printer) =>
+        printer.ip === event.ip ? { ...printer, is_online: event.is_online, status: event.status } : printer
+      )),
+    });
+    return unsubscribe;
   }, []);
 
+  useEffect(() => {
+    // Status events update single printers, keep the counters in sync
+    setOnlineCount(printers.filter(printer => printer.is_online).length);
+  }, [printers]);
+
   const fetchPrinters = async () => {
     try {
       setLoading(true);
@@ -83,6 +97,39 @@ const PrinterSettings: React.FC = () => {
     }
   };
 
+  const handleDiscover = async () => {
+    try {
+      setScanning(true);
+      setDiscovery(await apiService.discoverPrinters(cidr || undefined));
+      setError(null);
+    } catch (err) {
+      setError('Ağ taraması sırasında hata oluştu');
+    } finally {
+      setScanning(false);
+    }
+  };
+
+  const handleRegisterDiscovered = async () => {
+    // Only devices that answered the TSPL status query, label size comes from the form
+    const found = (discovery?.printers || []).filter(printer => printer.tspl && !printer.registered);
+    try {
+      await apiService.importPrinters({
+        printers: found.map(printer => ({
+          ip: printer.ip,
+          name: printer.model ? `${printer.model} ${printer.ip}` : printer.ip,
+          dpi: printer.dpi || formData.dpi,
+          width: formData.width,
+          height: formData.height
+        }))
+      });
+      setDiscovery(null);
+      setError(null);
+      fetchPrinters();
+    } catch (err) {
+      setError('Bulunan printerlar eklenirken hata oluştu');
+    }
+  };
+
   const handleDeletePrinter = async (ip: string) => {
     if (window.confirm('Bu printer\'ı silmek istediğinizden emin misiniz?')) {
       try {
@@ -206,6 +253,50 @@ const PrinterSettings: React.FC = () => {
         </button>
       </form>
       
+      <div className="add-printer-form">
+        <h2>Ağda Printer Ara</h2>
+        <div className="form-row">
+          <div className="form-group">
+            <label>IP Aralığı (CIDR):</label>
+            <input
+              type="text"
+              value={cidr}
+              onChange={(e) => setCidr(e.target.value)}
+              placeholder="192.168.1.0/24"
+            />
+          </div>
+        </div>
+        <button type="button" className="btn" onClick={handleDiscover} disabled={scanning}>
+          {scanning ? 'Taranıyor...' : 'Ağı Tara'}
+        </button>
+        
+        {discovery && (
+          <div>
+            <p>
+              {discovery.cidr}: {discovery.scanned} adres {discovery.seconds} sn içinde tarandı
+              {discovery.unfinished > 0 && `, ${discovery.unfinished} adres zaman aşımına uğradı`}
+            </p>
+            <ul>
+              {discovery.printers.filter(printer => printer.tspl).map(printer => (
+                <li key={printer.ip}>
+                  {printer.ip} {printer.model || 'Bilinmeyen model'}
+                  {printer.dpi ? ` (${printer.dpi} DPI)` : ''}
+                  {printer.registered ? ' - kayıtlı' : ''}
+                </li>
+              ))}
+            </ul>
+            <button
+              type="button"
+              className="btn"
+              onClick={handleRegisterDiscovered}
+              disabled={!discovery.printers.some(printer => printer.tspl && !printer.registered)}
+            >
+              Bulunanları Ekle
+            </button>
+          </div>
+        )}
+      </div>
+      
       <div>
         <h2>Kayıtlı Printerlar ({printers.length})</h2>
         <div className="printer-grid">
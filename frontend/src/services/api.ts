@@ -11,6 +11,124 @@ export interface Printer {
   status?: string;
 }
 
+export interface PrinterStatusEvent {
+  ip: string;
+  port: number;
+  is_online: boolean;
+  status: string;
+  checked_at: number;
+  changed_at: number;
+}
+
+export interface JobEvent {
+  job: string;
+  state: 'started' | 'progress' | 'finished' | 'failed';
+  ip?: string;
+  group?: string;
+  type?: string;
+  printer?: string;
+  labels?: number;
+  total?: number;
+}
+
+export interface PrinterGroup {
+  id: number;
+  name: string;
+  members: string[];
+  created_at?: string;
+}
+
+export interface LabelPayload {
+  values?: Record<string, string>;
+  barcodes?: Record<string, string>;
+}
+
+export interface TemplateVariable {
+  type: 'counter' | 'date' | 'time';
+  start?: string;
+  step?: number;
+  prefix?: string;
+}
+
+export interface TemplateVariables {
+  values?: Record<string, TemplateVariable>;
+  barcodes?: Record<string, TemplateVariable>;
+}
+
+export interface DiscoveredPrinter {
+  ip: string;
+  port: number;
+  model: string | null;
+  dpi: number | null;
+  status: number | null;
+  tspl: boolean;
+  registered: boolean;
+}
+
+export interface DiscoveryResult {
+  cidr: string;
+  scanned: number;
+  unfinished: number;
+  seconds: number;
+  printers: DiscoveredPrinter[];
+}
+
+export interface WarmUpProgress {
+  state: 'pending' | 'running' | 'done' | 'disabled';
+  stage: string | null;
+  layouts_done: number;
+  layouts_total: number;
+  static_layers: number;
+  printers_connected: number;
+  printers_total: number;
+  errors: number;
+  seconds: number | null;
+}
+
+export interface HealthStatus {
+  status: string;
+  message: string;
+  warmup: WarmUpProgress;
+}
+
+export interface PrinterExport {
+  printers: (Omit<Printer, 'id'> & { layouts?: Record<string, unknown> })[];
+  assets?: Record<string, string>;
+}
+
+export interface PrinterImportResult {
+  inserted: number;
+  updated: number;
+  layouts: number;
+  errors: { row: number; ip?: string; error: string }[];
+}
+
+export interface PrintJobSlice {
+  printer_ip: string;
+  slice_offset: number;
+  labels: number;
+  state: 'sending' | 'sent' | 'failed';
+  updated_at: string;
+}
+
+export interface PrintJob {
+  id: string;
+  target: string;
+  target_kind: 'printer' | 'group';
+  type: string;
+  settings_name?: string;
+  state: 'started' | 'finished' | 'failed' | 'interrupted';
+  labels_total: number;
+  labels_done: number;
+  created_at: string;
+  updated_at: string;
+  slices?: PrintJobSlice[];
+  labels_sent?: number;
+  labels_in_doubt?: number;
+  labels_missing?: number;
+  missing?: { offset: number; labels: number }[];
+}
+
 class ApiService {
   private async request<T>(endpoint: string, options?: RequestInit): Promise<T> {
     const response = await fetch(`${API_BASE_URL}${endpoint}`, {
@@ -60,8 +178,8 @@ class ApiService {
     });
   }
 
-  async healthCheck(): Promise<{ status: string; message: string }> {
-    return this.request<{ status: string; message: string }>('/health');
+  async healthCheck(): Promise<HealthStatus> {
+    return this.request<HealthStatus>('/health');
   }
 
   async getLogo(printerIp: string, settingsName: string = 'default'): Promise<Blob> {
@@ -84,12 +202,52 @@ class ApiService {
     return this.request<{ count: number }>('/printers/count');
   }
 
+  async discoverPrinters(cidr?: string): Promise<DiscoveryResult> {
+    return this.request<DiscoveryResult>('/printers/discover', {
+      method: 'POST',
+      body: JSON.stringify(cidr ? { cidr } : {}),
+    });
+  }
+
+  async exportPrinters(): Promise<PrinterExport> {
+    return this.request<PrinterExport>('/printers/export');
+  }
+
+  async importPrinters(data: PrinterExport | File, onError: 'abort' | 'skip' = 'abort'): Promise<PrinterImportResult> {
+    if (data instanceof File) {
+      const formData = new FormData();
+      formData.append('file', data);
+
+      const response = await fetch(`${API_BASE_URL}/printers/import?on_error=${onError}`, {
+        method: 'POST',
+        body: formData,
+      });
+
+      if (!response.ok) {
+        throw new Error(`API Error: ${response.status}`);
+      }
+
+      return response.json();
+    }
+    return this.request<PrinterImportResult>(`/printers/import?on_error=${onError}`, {
+      method: 'POST',
+      body: JSON.stringify(data),
+    });
+  }
+
   async printToPrinter(ip: string, printData: {
-    type: 'bmp' | 'text';
+    type: 'bmp' | 'text' | 'layout' | 'template';
     bmp_path?: string;
     text?: string;
     x?: number;
     y?: number;
+    name?: string;
+    payloads?: LabelPayload[];
+    variables?: TemplateVariables;
+    copies?: number;
+    sets?: number;
+    counter_start?: string;
+    counter_step?: number;
   }): Promise<void> {
     return this.request<void>('/printer/print', {
       method: 'POST',
@@ -97,6 +255,30 @@ class ApiService {
     });
   }
 
+  async uploadAsset(file: File): Promise<{ id: string; url: string; size: number }> {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    const response = await fetch(`${API_BASE_URL}/assets`, {
+      method: 'POST',
+      body: formData,
+    });
+
+    if (!response.ok) {
+      throw new Error(`API Error: ${response.status}`);
+    }
+
+    return response.json();
+  }
+
+  assetUrl(reference: string): string {
+    // Asset references are stored as '/api/assets/<id>', resolve them against the API host
+    if (reference.startsWith('/api/')) {
+      return `${API_BASE_URL}${reference.substring('/api'.length)}`;
+    }
+    return reference;
+  }
+
   async saveBitmapSettings(ip: string, name: string, settings: {
     textItems: any[];
     iconItems: any[];
@@ -115,7 +297,9 @@ class ApiService {
     });
 
     if (!response.ok) {
-      throw new Error(`API Error: ${response.status}`);
+      // Invalid layouts come back as 400 with one message per problem
+      const body = await response.json().catch(() => null);
+      throw new Error(body?.problems ? body.problems.join('\n') : `API Error: ${response.status}`);
     }
 
     return response.blob();
@@ -140,6 +324,67 @@ class ApiService {
       body: JSON.stringify({ ip, name }),
     });
   }
+
+  subscribeEvents(handlers: {
+    onPrinterStatus?: (event: PrinterStatusEvent) => void;
+    onJob?: (event: JobEvent) => void;
+  }): () => void {
+    // One stream per page instead of polling; EventSource reconnects and resumes by itself
+    const source = new EventSource(`${API_BASE_URL}/events`);
+    if (handlers.onPrinterStatus) {
+      const onPrinterStatus = handlers.onPrinterStatus;
+      source.addEventListener('printer_status', (event) => onPrinterStatus(JSON.parse((event as MessageEvent).data)));
+    }
+    if (handlers.onJob) {
+      const onJob = handlers.onJob;
+      source.addEventListener('job', (event) => onJob(JSON.parse((event as MessageEvent).data)));
+    }
+    return () => source.close();
+  }
+
+  async getPrinterGroups(): Promise<PrinterGroup[]> {
+    return this.request<PrinterGroup[]>('/printer-groups');
+  }
+
+  async savePrinterGroup(name: string, members: string[]): Promise<PrinterGroup> {
+    return this.request<PrinterGroup>('/printer-groups', {
+      method: 'POST',
+      body: JSON.stringify({ name, members }),
+    });
+  }
+
+  async deletePrinterGroup(name: string): Promise<void> {
+    return this.request<void>('/printer-groups/delete', {
+      method: 'POST',
+      body: JSON.stringify({ name }),
+    });
+  }
+
+  async printToGroup(group: string, printData: {
+    type: 'layout' | 'template';
+    name?: string;
+    payloads?: LabelPayload[];
+    variables?: TemplateVariables;
+    copies?: number;
+    sets?: number;
+  }): Promise<{ message: string; labels: number; printers: Record<string, number>; failed_printers: string[] }> {
+    return this.request('/printer-groups/print', {
+      method: 'POST',
+      body: JSON.stringify({ group, ...printData }),
+    });
+  }
+
+  async getJobs(state?: PrintJob['state']): Promise<PrintJob[]> {
+    return this.request<PrintJob[]>(state ? `/jobs?state=${state}` : '/jobs');
+  }
+
+  async getJob(jobId: string): Promise<PrintJob> {
+    return this.request<PrintJob>(`/jobs/${jobId}`);
+  }
+
+  async resumeJob(jobId: string): Promise<{ message: string; job: string; labels: number; in_doubt: number; failed_printers: string[] }> {
+    return this.request(`/jobs/${jobId}/resume`, { method: 'POST' });
+  }
 }
 
 export const apiService = new ApiService();
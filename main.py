@@ -1,18 +1,44 @@
+from backend.startupProfile import startup_profile
+# Installed first so HERA_STARTUP_PROFILE=1 times every application import
+startup_profile.install()
 from backend.databaseModule.printers import Printers
+from backend.databaseModule.assets import Assets
+from backend.databaseModule.printerGroups import PrinterGroups
+from backend.databaseModule.printJobs import PrintJobs
+from backend.jobJournal import JobJournal
+from backend.idempotencyKeys import IdempotencyKeys
 from backend.flaskModule import FlaskModule
 from backend.tscPrinterModule import TSCPrinter
+from backend.statusMonitor import printer_status_monitor
+from backend.warmUp import warm_up
+from backend.logModule import setup_logging
 import time
 
 class Application:
-    def __init__(self):
-        self.printers = Printers()
-        self.flaskModule = FlaskModule(self)
+    def __init__(self, start_server: bool = True):
+        with startup_profile.phase("database"):
+            self.printers = Printers()
+            self.assets = Assets()
+            self.printerGroups = PrinterGroups()
+            self.printJobs = PrintJobs()
+        with startup_profile.phase("journal recovery"):
+            self.jobJournal = JobJournal(self.printJobs)
+            # Jobs a previous process left running are reported before new ones start
+            self.jobJournal.recover()
+            self.idempotencyKeys = IdempotencyKeys(self.jobJournal)
+        with startup_profile.phase("flask"):
+            self.flaskModule = FlaskModule(self, start_server)
+        if start_server:
+            printer_status_monitor.start(lambda: [printer["ip"] for printer in self.printers.get_all_printers()])
+            # Caches and printer connections are primed in the background, requests are served meanwhile
+            warm_up.start(self)
         
     def run(self):
         self.flaskModule.run()
 
 
 if __name__ == "__main__":
+    setup_logging()
     app = Application()
     while True:
         time.sleep(1)
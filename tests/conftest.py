@@ -0,0 +1,67 @@
+import os
+import sys
+import pytest
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPOSITORY_ROOT not in sys.path:
+    sys.path.insert(0, REPOSITORY_ROOT)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Empty working directory with a database folder, DatabaseConfig paths are relative"""
+    (tmp_path / "database").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+_hosts = iter(range(20, 250))
+
+@pytest.fixture
+def application(workdir):
+    """Application on a fresh database, without the HTTP server and background jobs"""
+    from main import Application
+    return Application(start_server=False)
+
+@pytest.fixture
+def client(application):
+    return application.flaskModule.app.test_client()
+
+@pytest.fixture
+def printer_factory():
+    """Start simulated TSPL printers on loopback addresses of their own, stopped after the test"""
+    from benchmarks.fakePrinter import FakeTSPLPrinter
+    printers = []
+
+    def start(speed_ips: float = 0, drop_rate: float = 0.0) -> FakeTSPLPrinter:
+        printer = FakeTSPLPrinter(f"127.0.0.{next(_hosts)}", 9100, speed_ips, 8 * 1024 * 1024, drop_rate).start()
+        printers.append(printer)
+        return printer
+
+    yield start
+    for printer in printers:
+        printer.stop()
+
+@pytest.fixture
+def registered_printer(client, printer_factory):
+    """A simulated printer registered with a 100x29 mm label and the charger layout as "default" """
+    from benchmarks.layouts import LAYOUTS
+
+    def register(**options):
+        printer = printer_factory(**options)
+        response = client.post("/api/printers", json={
+            "ip": printer.host, "name": f"test-{printer.host}", "dpi": 300, "width": 100, "height": 29})
+        assert response.status_code == 201, response.get_json()
+        response = client.post("/api/bitmap-settings", json={"ip": printer.host, "name": "default", **LAYOUTS["charger"](0)})
+        assert response.status_code == 200, response.get_json()
+        return printer
+
+    return register
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    """Poll until condition() is true; the simulated printer handles its stream on its own thread"""
+    import time
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
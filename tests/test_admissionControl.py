@@ -0,0 +1,82 @@
+import threading
+import pytest
+from backend.admissionControl import (
+    AdmissionControl, AdmissionRejected, PrinterGate, LANE_BULK, LANE_URGENT, admission_control
+)
+from backend.configModule import AdmissionConfig
+
+def gate(rate: float = 10, burst: int = 10) -> PrinterGate:
+    return PrinterGate("10.0.0.1", rate, burst, AdmissionConfig())
+
+def test_jobs_that_would_wait_too_long_are_rejected():
+    printer = gate(rate=1, burst=10)
+    ticket = printer.admit(70, LANE_BULK)
+    printer.acquire(ticket)  # leaves a debt of 60 labels, 60 s at 1 label/s
+    with pytest.raises(AdmissionRejected) as rejected:
+        printer.admit(10, LANE_BULK)
+    assert rejected.value.retry_after >= 10
+    # Urgent jobs may wait longer
+    printer.cancel(printer.admit(10, LANE_URGENT))
+
+def test_urgent_jobs_overtake_waiting_bulk_jobs():
+    printer = gate(rate=100, burst=5)
+    printer.acquire(printer.admit(5, LANE_BULK))  # bucket empty
+    order = []
+    bulk, urgent = printer.admit(5, LANE_BULK), printer.admit(5, LANE_URGENT)
+    threads = [threading.Thread(target=lambda t=t: (printer.acquire(t), order.append(t.lane))) for t in (bulk, urgent)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert order == [LANE_URGENT, LANE_BULK]
+
+def test_cancelled_tickets_leave_the_queue():
+    printer = gate()
+    ticket = printer.admit(5, LANE_BULK)
+    printer.cancel(ticket)
+    printer.cancel(ticket)
+    assert printer.waiting == []
+    later = printer.admit(5, LANE_BULK)
+    printer.acquire(later)
+    assert later.granted
+
+def test_paced_send_uses_the_ticket_and_returns_failed_tokens():
+    control = AdmissionControl()
+    ticket = control.admit("10.0.0.2", 4, LANE_BULK)
+    sent = []
+    assert control.paced(lambda ip, offset, labels: sent.append(labels) or False, LANE_BULK, 2, ticket)(
+        "10.0.0.2", 0, 3) is False
+    assert sent == [3] and ticket.granted and ticket.labels == 6
+    assert control.gate("10.0.0.2").tokens == pytest.approx(control.config.burst_labels, abs=1)
+
+def test_job_that_fails_before_sending_releases_its_ticket(client, application, registered_printer):
+    printer = registered_printer()
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("render bug")
+
+    application.flaskModule.prepare_job = broken
+    response = client.post("/api/printer/print", json={"ip": printer.host, "type": "text", "text": "A"})
+    assert response.status_code == 500
+    assert admission_control.gate(printer.host).waiting == []
+
+def test_layout_payloads_must_be_objects(client, registered_printer):
+    printer = registered_printer()
+    response = client.post("/api/printer/print", json={"ip": printer.host, "type": "layout", "payloads": [{}, 3]})
+    assert response.status_code == 400
+    assert admission_control.gate(printer.host).waiting == []
+
+def test_cancelled_ticket_cannot_be_acquired():
+    printer = gate()
+    ticket = printer.admit(5, LANE_BULK)
+    printer.cancel(ticket)
+    with pytest.raises(RuntimeError):
+        printer.acquire(ticket)
+    other = printer.admit(5, LANE_BULK)
+    cancelled = printer.admit(5, LANE_BULK)
+    printer.cancel(cancelled)
+    with pytest.raises(RuntimeError):
+        printer.acquire(cancelled)  # used to wait forever behind `other`
+    printer.acquire(other)
+    printer.acquire(other)  # already granted, returns at once
+    assert other.granted
@@ -0,0 +1,58 @@
+from backend.eventBus import EventBus, EVENT_PRINTER_STATUS, event_bus
+
+def sse_id(event) -> str:
+    return f"{event.epoch}-{event.id}"
+
+def drain(subscription) -> list:
+    events = []
+    while True:
+        event = subscription.get(timeout=0)
+        if event is None:
+            return events
+        events.append(event.type)
+
+def test_resuming_client_gets_the_events_it_missed():
+    bus = EventBus()
+    first = bus.publish("a")
+    bus.publish("b")
+    bus.publish("c")
+    subscription = bus.subscribe(sse_id(first))
+    assert subscription.resumed and drain(subscription) == ["b", "c"]
+    latest = bus.subscribe(f"{bus.epoch}-3")
+    assert latest.resumed and drain(latest) == []
+
+def test_new_and_foreign_ids_need_a_snapshot():
+    bus = EventBus()
+    bus.publish("a")
+    # No id, garbage, an id from an earlier process and an id this process never issued
+    for last_event_id in (None, "abc", "7", f"{EventBus().epoch}-1", f"{bus.epoch}-9"):
+        subscription = bus.subscribe(last_event_id)
+        assert not subscription.resumed and drain(subscription) == []
+
+def test_ids_that_left_the_history_need_a_snapshot():
+    bus = EventBus(history=2)
+    first = bus.publish("a")
+    second = bus.publish("b")
+    bus.publish("c")
+    bus.publish("d")
+    assert not bus.subscribe(sse_id(first)).resumed
+    resumed = bus.subscribe(sse_id(second))
+    assert resumed.resumed and drain(resumed) == ["c", "d"]
+
+def test_event_stream_sends_the_snapshot_unless_resumed(client, registered_printer):
+    registered_printer()
+    client.get("/api/printers")  # the status monitor learns the printer
+    missed = event_bus.publish("test")
+    event_bus.publish("test")
+
+    stale = client.get("/api/events", headers={"Last-Event-ID": "0123abcd-999"}, buffered=False)
+    chunks = iter(stale.response)
+    assert next(chunks).startswith(b"retry")
+    assert next(chunks).startswith(f"event: {EVENT_PRINTER_STATUS}".encode())
+    stale.close()
+
+    resumed = client.get("/api/events", headers={"Last-Event-ID": sse_id(missed)}, buffered=False)
+    chunks = iter(resumed.response)
+    assert next(chunks).startswith(b"retry")
+    assert next(chunks).startswith(f"id: {missed.epoch}-{missed.id + 1}\nevent: test".encode())
+    resumed.close()
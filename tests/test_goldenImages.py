@@ -0,0 +1,29 @@
+import json
+import os
+import pytest
+from PIL import Image
+from backend.rasterBackend import NUMPY_AVAILABLE
+from benchmarks.goldenImages import CASES, GOLDEN_DIR, MANIFEST_FILE, check_barcodes, compare, environment, render
+
+RASTERS = ["pillow"] + (["numpy"] if NUMPY_AVAILABLE else [])
+
+@pytest.fixture(scope="module")
+def references():
+    with open(os.path.join(GOLDEN_DIR, MANIFEST_FILE), encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest["environment"] != environment():
+        pytest.skip(f"references were made with {manifest['environment']}, fonts or libraries differ here")
+    return manifest
+
+@pytest.mark.parametrize("raster", RASTERS)
+@pytest.mark.parametrize("path", ["file", "buffer", "compiled"])
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_label_matches_its_reference(references, case, path, raster, tmp_path, monkeypatch):
+    monkeypatch.setenv("HERA_RASTER_BACKEND", raster)
+    with Image.open(os.path.join(GOLDEN_DIR, f"{case}.png")) as file:
+        reference = file.convert("1")
+    image, compiled = render(case, path, str(tmp_path))
+    changed, _ = compare(reference, image)
+    assert changed == 0, f"{changed} pixels differ, run python -m benchmarks.goldenImages for the diff images"
+    problems, _ = check_barcodes(image, compiled)
+    assert problems == []
@@ -0,0 +1,97 @@
+import json
+import threading
+import pytest
+from backend.databaseModule.printJobs import PrintJobs
+from backend.idempotencyKeys import (
+    IdempotencyError, IdempotencyKeys, IDEMPOTENCY_HEADER, REPLAYED_HEADER, request_fingerprint
+)
+from backend.jobJournal import JobJournal
+from conftest import wait_for
+
+@pytest.fixture
+def journal(workdir):
+    return JobJournal(PrintJobs())
+
+def started_job(keys: IdempotencyKeys, key: str, job_id: str):
+    assert keys.claim(key, "body") is None
+    keys.started(key, job_id)
+    keys.journal.begin_job(job_id, "10.0.0.1", "printer", "text", None, {}, 1)
+
+def test_repeats_get_the_first_response(journal):
+    keys = IdempotencyKeys(journal)
+    started_job(keys, "k", "job")
+    keys.finish("k", 200, '{"labels": 1}')
+    stored = keys.claim("k", "body")
+    assert (stored.status, stored.body) == (200, '{"labels": 1}')
+    with pytest.raises(IdempotencyError) as error:
+        keys.claim("k", "other body")
+    assert error.value.status == 422
+
+def test_repeat_of_a_running_request_times_out(journal):
+    keys = IdempotencyKeys(journal)
+    keys.config.in_flight_wait = 0.05
+    started_job(keys, "k", "job")
+    with pytest.raises(IdempotencyError) as error:
+        keys.claim("k", "body")
+    assert (error.value.status, error.value.fields["job"]) == (409, "job")
+
+def test_key_is_freed_when_no_job_began(journal):
+    keys = IdempotencyKeys(journal)
+    assert keys.claim("k", "body") is None
+    keys.finish("k", 429, "{}")
+    assert keys.claim("k", "body") is None
+
+def test_database_is_read_without_the_lock(journal):
+    keys = IdempotencyKeys(journal)
+    read = journal.store.get_idempotency_key
+    lock_free = []
+
+    def get_idempotency_key(key):
+        other = threading.Thread(target=lambda: lock_free.append(keys._condition.acquire(timeout=1)) or
+                                 keys._condition.release())
+        other.start()
+        other.join()
+        return read(key)
+
+    journal.store.get_idempotency_key = get_idempotency_key
+    assert keys.claim("k", "body") is None
+    assert lock_free == [True]
+
+def test_interrupted_key_answers_with_the_resumed_result(journal):
+    started_job(IdempotencyKeys(journal), "k", "job")
+    journal.flush()
+    restarted = IdempotencyKeys(journal)
+    stored = restarted.claim("k", "body")
+    assert stored.status == 409 and json.loads(stored.body)["job"] == "job"
+    restarted.job_finished("job", 200, '{"message": "Resumed job job"}')
+    assert restarted.claim("k", "body").status == 200
+    assert IdempotencyKeys(journal).claim("k", "body").status == 200
+
+def test_repeated_print_request_is_replayed(client, registered_printer):
+    printer = registered_printer()
+    request = {"ip": printer.host, "type": "text", "text": "A", "sets": 2}
+    first = client.post("/api/printer/print", json=request, headers={IDEMPOTENCY_HEADER: "order-1"})
+    assert first.status_code == 200, first.get_json()
+    assert wait_for(lambda: printer.stats.as_dict()["labels_printed"] == 2)
+    repeat = client.post("/api/printer/print", json=request, headers={IDEMPOTENCY_HEADER: "order-1"})
+    assert repeat.status_code == 200 and repeat.headers[REPLAYED_HEADER] == "true"
+    assert repeat.get_json() == first.get_json()
+    assert printer.stats.as_dict()["print_commands"] == 1
+
+def test_resume_answers_repeats_of_an_interrupted_request(client, application, registered_printer):
+    printer = registered_printer()
+    request = {"ip": printer.host, "type": "text", "text": "A"}
+    key = "/api/printer/print order-2"
+    # A request that was printing when the process stopped
+    assert application.idempotencyKeys.claim(key, request_fingerprint(request)) is None
+    application.idempotencyKeys.started(key, "job")
+    application.jobJournal.begin_job("job", printer.host, "printer", "text", None, request, 1)
+    application.jobJournal.recover()
+    application.idempotencyKeys = IdempotencyKeys(application.jobJournal)
+
+    repeat = client.post("/api/printer/print", json=request, headers={IDEMPOTENCY_HEADER: "order-2"})
+    assert repeat.status_code == 409
+    assert client.post("/api/jobs/job/resume").status_code == 200
+    repeat = client.post("/api/printer/print", json=request, headers={IDEMPOTENCY_HEADER: "order-2"})
+    assert repeat.status_code == 200 and repeat.get_json()["job"] == "job"
+    assert wait_for(lambda: printer.stats.as_dict()["labels_printed"] == 1)
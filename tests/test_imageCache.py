@@ -0,0 +1,58 @@
+import base64
+import os
+from io import BytesIO
+from PIL import Image
+from backend.bitmapGenerator import BitmapGenerator
+from backend.imageCache import image_cache
+
+def gradient_png() -> bytes:
+    image = Image.linear_gradient("L").resize((64, 32))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def counting_conversions(generator: BitmapGenerator, monkeypatch) -> list:
+    calls = []
+    convert = generator._to_1bit_tile
+
+    def counted(*args, **kwargs):
+        calls.append(args[1:])
+        return convert(*args, **kwargs)
+
+    monkeypatch.setattr(generator, "_to_1bit_tile", counted)
+    return calls
+
+def icon_label(generator: BitmapGenerator, icon_ref: str, **options) -> bytes:
+    generator.bitmap_init()
+    generator.set_icon(icon_ref, 10, 10, 48, 24, **options)
+    data = generator.buffer.data
+    generator.release_buffer()
+    return data
+
+def test_repeated_icon_is_dithered_once(monkeypatch):
+    image_cache.clear()
+    generator = BitmapGenerator(20, 10, 203)
+    calls = counting_conversions(generator, monkeypatch)
+    icon = "data:image/png;base64," + base64.b64encode(gradient_png()).decode("ascii")
+    first = icon_label(generator, icon, dither="floyd-steinberg")
+    assert icon_label(generator, icon, dither="floyd-steinberg") == first
+    assert len(calls) == 1
+    # Any change to the conversion parameters is a different tile
+    assert icon_label(generator, icon, dither="threshold", threshold=100) != first
+    icon_label(generator, icon, dither="threshold", threshold=160)
+    assert len(calls) == 3
+
+def test_image_file_is_converted_again_after_it_changes(tmp_path, monkeypatch):
+    image_cache.clear()
+    generator = BitmapGenerator(20, 10, 203)
+    calls = counting_conversions(generator, monkeypatch)
+    path = tmp_path / "logo.png"
+    path.write_bytes(gradient_png())
+    generator.bitmap_init()
+    generator.set_image(str(path), 0, 0, 48, 24)
+    generator.set_image(str(path), 0, 0, 48, 24)
+    mtime = os.path.getmtime(path)
+    os.utime(path, (mtime + 10, mtime + 10))
+    generator.set_image(str(path), 0, 0, 48, 24)
+    generator.release_buffer()
+    assert len(calls) == 2
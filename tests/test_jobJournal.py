@@ -0,0 +1,104 @@
+import pytest
+from backend.databaseModule.printJobs import PrintJobs, SLICE_FAILED, SLICE_SENDING, SLICE_SENT
+from backend.jobJournal import JobJournal, JournalError, SerialConflict
+from backend.tsplCommands import PrinterUnreachable
+from benchmarks.layouts import charger_variables
+
+@pytest.fixture
+def journal(workdir):
+    return JobJournal(PrintJobs())
+
+def slice_states(journal, job_id):
+    return {entry["slice_offset"]: entry["state"] for entry in journal.describe(job_id)["slices"]}
+
+def test_serials_continue_after_the_last_issued_value(journal):
+    assert journal.reserve_serials({"a": ("00010", 1)}, 5) == {"a": "00010"}
+    assert journal.reserve_serials({"a": (None, 1)}, 2) == {"a": "00015"}
+    assert journal.reserve_serials({"b": (None, 1)}, 1) == {"b": "1"}
+
+def test_serials_below_an_issued_value_conflict(journal):
+    journal.reserve_serials({"a": ("100", 1)}, 10)
+    with pytest.raises(SerialConflict) as conflict:
+        journal.reserve_serials({"a": ("105", 1)}, 1)
+    assert conflict.value.next_values == {"a": "110"}
+    assert journal.reserve_serials({"a": ("110", 1)}, 1) == {"a": "110"}
+
+def test_serials_continue_an_inherited_scope(journal):
+    journal.reserve_serials({"default/serial": ("1", 1)}, 20)
+    with pytest.raises(SerialConflict):
+        journal.reserve_serials({"10.0.0.1/default/serial": ("5", 1)}, 1, {"10.0.0.1/default/serial": "default/serial"})
+    assert journal.reserve_serials({"10.0.0.1/default/serial": (None, 1)}, 1,
+                                   {"10.0.0.1/default/serial": "default/serial"}) == {"10.0.0.1/default/serial": "21"}
+
+def test_describe_reports_missing_and_in_doubt_labels(journal):
+    journal.begin_job("job", "group", "group", "text", None, {"text": "A"}, 30)
+    journal.slice_sending("job", "10.0.0.1", 0, 10)
+    journal.slice_done("job", "10.0.0.1", 0, True)
+    journal.slice_sending("job", "10.0.0.2", 10, 10)
+    journal.slice_sending("job", "10.0.0.3", 20, 10)
+    journal.slice_done("job", "10.0.0.3", 20, False)
+    job = journal.describe("job")
+    assert (job["labels_sent"], job["labels_in_doubt"], job["labels_missing"]) == (10, 10, 10)
+    assert job["missing"] == [{"offset": 20, "labels": 10}]
+
+def test_recover_marks_running_jobs_interrupted(journal):
+    journal.begin_job("job", "10.0.0.1", "printer", "text", None, {}, 5)
+    journal.flush()
+    reports = journal.recover()
+    assert [report["id"] for report in reports] == ["job"]
+    assert journal.describe("job")["state"] == "interrupted"
+
+def test_journaled_send_keeps_partly_sent_slices_in_doubt(journal):
+    journal.begin_job("job", "group", "group", "text", None, {}, 3)
+
+    def send(ip, offset, labels):
+        if offset == 1:
+            raise PrinterUnreachable(ip)
+        return offset == 0
+
+    send = journal.journaled("job", send)
+    assert send("10.0.0.1", 0, 1) is True
+    with pytest.raises(PrinterUnreachable):
+        send("10.0.0.1", 1, 1)
+    assert send("10.0.0.1", 2, 1) is False
+    journal.flush()
+    assert slice_states(journal, "job") == {0: SLICE_SENT, 1: SLICE_FAILED, 2: SLICE_SENDING}
+
+def test_each_printer_has_its_own_template_serials(client, registered_printer):
+    printers = [registered_printer(), registered_printer()]
+    for printer in printers:
+        response = client.post("/api/printer/print", json={"ip": printer.host, "type": "template",
+                                                           "variables": charger_variables(0), "sets": 2})
+        assert response.status_code == 200, response.get_json()
+    response = client.post("/api/printer/print", json={"ip": printers[0].host, "type": "template",
+                                                       "variables": charger_variables(1)})
+    assert response.status_code == 409
+    assert response.get_json()["next"][f"{printers[0].host}/default/values.product_code"] == "00002"
+
+def test_job_is_closed_when_sending_raises(client, registered_printer, monkeypatch, application):
+    from backend import flaskModule
+    printer = registered_printer()
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("driver bug")
+
+    monkeypatch.setattr(flaskModule.printer_manager, "print_text", broken)
+    response = client.post("/api/printer/print", json={"ip": printer.host, "type": "text", "text": "A"})
+    assert response.status_code == 500
+    jobs = client.get("/api/jobs").get_json()
+    assert [job["state"] for job in jobs] == ["failed"]
+    job = application.jobJournal.describe(jobs[0]["id"])
+    assert job["labels_in_doubt"] == 1
+
+def test_writer_survives_a_failing_commit(journal, monkeypatch):
+    execute_batch = journal.store.execute_batch
+
+    def broken(batch):
+        raise MemoryError("out of memory")
+
+    monkeypatch.setattr(journal.store, "execute_batch", broken)
+    with pytest.raises(JournalError):
+        journal.begin_job("job", "10.0.0.1", "printer", "text", None, {}, 1)
+    monkeypatch.setattr(journal.store, "execute_batch", execute_batch)
+    journal.begin_job("job", "10.0.0.1", "printer", "text", None, {}, 1)
+    assert journal.describe("job")["state"] == "started"
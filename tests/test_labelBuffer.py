@@ -0,0 +1,78 @@
+import pytest
+from PIL import ImageDraw
+from backend.labelBuffer import LabelBuffer, LabelBufferPool
+from backend.rasterBackend import PillowRaster, NumpyRaster, NUMPY_AVAILABLE
+
+def drawn_buffer(width: int = 45, height: int = 12) -> LabelBuffer:
+    buffer = LabelBuffer(width, height)
+    draw = ImageDraw.Draw(buffer.image)
+    draw.rectangle([2, 1, 20, 6], fill=0)
+    draw.point([(width - 1, height - 1), (0, 0)], fill=0)
+    return buffer
+
+def reference_rows(buffer: LabelBuffer, box=None, invert: bool = False) -> bytes:
+    """Rows packed bit by bit, padding white"""
+    left, top, right, bottom = box or (0, 0, buffer.width_px, buffer.height_px)
+    packed = bytearray()
+    for y in range(top, bottom):
+        row_bits = [buffer.image.getpixel((x, y)) >= 128 for x in range(left, right)]
+        if invert:
+            row_bits = [not bit for bit in row_bits]
+        row_bits += [not invert] * (-len(row_bits) % 8)
+        for start in range(0, len(row_bits), 8):
+            packed.append(sum(bit << (7 - index) for index, bit in enumerate(row_bits[start:start + 8])))
+    return bytes(packed)
+
+BACKENDS = [PillowRaster()] + ([NumpyRaster()] if NUMPY_AVAILABLE else [])
+
+@pytest.mark.parametrize("raster", BACKENDS, ids=lambda raster: raster.name)
+@pytest.mark.parametrize("box", [None, (0, 0, 45, 12), (8, 1, 29, 7), (3, 2, 4, 3)])
+@pytest.mark.parametrize("invert", [False, True])
+def test_pack_rows_reads_the_buffer(raster, box, invert):
+    buffer = drawn_buffer()
+    assert raster.pack_rows(buffer, box, invert=invert) == reference_rows(buffer, box, invert)
+
+def test_padding_bits_are_white():
+    buffer = LabelBuffer(10, 2)
+    rows = PillowRaster().pack_rows(buffer)
+    # 10 pixels -> 2 bytes per row, the 6 pad bits of each row stay 1 (white)
+    assert rows == b"\xff\xff\xff\xff"
+
+def test_packed_region_crops_to_ink_on_byte_boundary():
+    buffer = drawn_buffer()
+    x, y, row_bytes, height, data = buffer.packed_region()
+    assert (x, y, row_bytes, height) == (0, 0, 6, 12)
+    assert len(data) == row_bytes * height
+    assert LabelBuffer(16, 4).packed_region() == (0, 0, 0, 0, b"")
+
+def test_pool_reuses_cleared_buffers():
+    pool = LabelBufferPool()
+    buffer = pool.acquire(16, 4)
+    ImageDraw.Draw(buffer.image).rectangle([0, 0, 15, 3], fill=0)
+    pool.release(buffer)
+    again = pool.acquire(16, 4)
+    assert again is buffer and pool.allocations == 1
+    assert set(again.data) == {255}
+
+def test_drawing_shows_in_the_packed_data():
+    buffer = LabelBuffer(8, 1)
+    ImageDraw.Draw(buffer.image).point([(0, 0)], fill=0)
+    assert buffer.data[0] == 0 and PillowRaster().pack_rows(buffer) == b"\x7f"
+
+def test_failed_render_returns_its_buffer(monkeypatch):
+    from backend.bitmapGenerator import BitmapGenerator
+    from backend.labelBuffer import label_buffer_pool
+    generator = BitmapGenerator(10, 5, 203)
+    label = {"textItems": [{"content": "A", "x": 0, "y": 0}]}
+    generator.render_regions(label)
+    buffer = label_buffer_pool.acquire(*generator.set_label_scale()[:2])
+    label_buffer_pool.release(buffer)
+
+    def broken(*items):
+        raise ValueError("bad item")
+
+    monkeypatch.setattr(generator, "_draw_frontend_items", broken)
+    with pytest.raises(ValueError):
+        generator.render_regions(label)
+    assert generator.buffer is None
+    assert label_buffer_pool.acquire(*buffer.size) is buffer
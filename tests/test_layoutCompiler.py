@@ -0,0 +1,15 @@
+from backend.bitmapGenerator import BitmapGenerator
+from backend.layoutCompiler import ITEM_LISTS, LayoutCompiler
+from benchmarks.layouts import charger_label
+
+def rendered(settings_data: dict) -> bytes:
+    generator = BitmapGenerator(100, 29, 300)
+    return generator.render_regions(settings_data)[0][4]  # packed (x, y, row_bytes, height, data)
+
+def test_compiled_layout_draws_like_the_saved_one(workdir):
+    settings_data = charger_label(7)
+    settings_data["textItems"][0]["z"] = 5  # left by an earlier version
+    compiled = LayoutCompiler(100, 29, 300).compile(settings_data)
+    items = [item for list_name, _ in ITEM_LISTS for item in compiled[list_name]]
+    assert all("bbox" in item and "z" not in item for item in items if item.get("content") or item.get("data"))
+    assert rendered(compiled) == rendered(settings_data)
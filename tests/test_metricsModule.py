@@ -0,0 +1,49 @@
+from backend.metricsModule import MetricsRegistry
+
+def test_counter_exposition_escapes_label_values():
+    registry = MetricsRegistry()
+    counter = registry.counter("hera_errors_total", "Errors by operation", ("printer", "operation"))
+    counter.inc(printer="10.0.0.1", operation="send")
+    counter.inc(2, printer='la"b\\el\nx', operation="send")
+    counter.inc(printer="10.0.0.1", operation="send")
+    assert registry.render().splitlines() == [
+        "# HELP hera_errors_total Errors by operation",
+        "# TYPE hera_errors_total counter",
+        'hera_errors_total{printer="10.0.0.1",operation="send"} 2',
+        'hera_errors_total{printer="la\\"b\\\\el\\nx",operation="send"} 2',
+    ]
+
+def test_histogram_exposition_has_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("hera_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, route="/api/health")
+    histogram.observe(0.2)
+    assert registry.render().splitlines() == [
+        "# HELP hera_seconds Latency",
+        "# TYPE hera_seconds histogram",
+        'hera_seconds_bucket{route="",le="0.1"} 0',
+        'hera_seconds_bucket{route="",le="1.0"} 1',
+        'hera_seconds_bucket{route="",le="+Inf"} 1',
+        'hera_seconds_sum{route=""} 0.2',
+        'hera_seconds_count{route=""} 1',
+        'hera_seconds_bucket{route="/api/health",le="0.1"} 2',
+        'hera_seconds_bucket{route="/api/health",le="1.0"} 3',
+        'hera_seconds_bucket{route="/api/health",le="+Inf"} 4',
+        'hera_seconds_sum{route="/api/health"} 3.65',
+        'hera_seconds_count{route="/api/health"} 4',
+    ]
+    assert histogram.totals()[("/api/health",)] == (4, 3.65)
+
+def test_registering_a_name_twice_returns_the_first_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter("hera_total", "First")
+    assert registry.counter("hera_total", "Second") is counter
+    counter.inc()
+    assert registry.render() == "# HELP hera_total First\n# TYPE hera_total counter\nhera_total 1\n"
+
+def test_metrics_endpoint_serves_the_exposition(client):
+    client.get("/api/health")
+    response = client.get("/api/metrics")
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    assert "# TYPE hera_http_request_seconds histogram" in response.get_data(as_text=True)
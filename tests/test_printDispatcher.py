@@ -0,0 +1,78 @@
+import threading
+import time
+from backend.printDispatcher import PrintDispatcher
+from backend.tsplCommands import PrinterUnreachable
+
+class RecordingSend:
+    """send(ip, offset, labels) that records slices and fails as configured per printer"""
+
+    def __init__(self, unreachable=(), failing=()):
+        self.unreachable = set(unreachable)
+        self.failing = set(failing)
+        self.sent = []
+        self.active = {}
+        self.overlapped = False
+        self.lock = threading.Lock()
+
+    def __call__(self, ip, offset, labels):
+        with self.lock:
+            self.active[ip] = self.active.get(ip, 0) + 1
+            self.overlapped |= self.active[ip] > 1
+        try:
+            time.sleep(0.01)
+            if ip in self.unreachable:
+                raise PrinterUnreachable(ip)
+            with self.lock:
+                self.sent.append((ip, offset, labels))
+            return ip not in self.failing
+        finally:
+            with self.lock:
+                self.active[ip] -= 1
+
+def dispatcher() -> PrintDispatcher:
+    return PrintDispatcher(manager=None, monitor=None, bus=None, max_workers=8)
+
+def test_split_gives_contiguous_slices_covering_the_job():
+    slices = dispatcher().split(["a", "b", "c"], 10)
+    assert [ip for ip, _, _ in slices] == ["a", "b", "c"]
+    assert [(offset, labels) for _, offset, labels in slices] == [(0, 4), (4, 3), (7, 3)]
+
+def test_split_prefers_printers_with_shorter_queues():
+    printer_dispatcher = dispatcher()
+    printer_dispatcher._add_queued("a", 6)
+    slices = printer_dispatcher.split(["a", "b"], 8)
+    assert slices == [("a", 0, 1), ("b", 1, 7)]
+
+def test_unreachable_printer_slices_move_to_healthy_printers_one_at_a_time():
+    send = RecordingSend(unreachable={"b", "c"})
+    result = dispatcher().dispatch(["a", "b", "c"], 9, send)
+    assert result.success
+    assert result.printed == {"a": 9}
+    assert result.failed_printers == ["b", "c"]
+    # Every label printed exactly once, and "a" never had two slices in flight
+    printed = sorted(label for _, offset, labels in send.sent for label in range(offset, offset + labels))
+    assert printed == list(range(9))
+    assert not send.overlapped
+
+def test_slice_that_failed_part_way_is_not_sent_again():
+    send = RecordingSend(failing={"b"})
+    result = dispatcher().dispatch(["a", "b"], 6, send)
+    assert not result.success
+    assert result.in_doubt == 3 and result.unsent == 0
+    assert result.printed == {"a": 3}
+    assert sorted(send.sent) == [("a", 0, 3), ("b", 3, 3)]
+
+def test_labels_are_unsent_when_no_printer_is_reachable():
+    result = dispatcher().dispatch(["a", "b"], 4, RecordingSend(unreachable={"a", "b"}))
+    assert result.unsent == 4 and result.labels == 0
+
+def test_save_group_is_all_or_nothing(workdir):
+    from backend.databaseModule.printerGroups import PrinterGroups
+    groups = PrinterGroups()
+    assert groups.save_group("line", ["10.0.0.1", "10.0.0.2"])
+    # The second member can't be stored, the old members must survive
+    assert not groups.save_group("line", ["10.0.0.3", {"not": "an ip"}])
+    assert groups.get_group("line")["members"] == ["10.0.0.1", "10.0.0.2"]
+    assert groups.save_group("line", ["10.0.0.2"])
+    assert groups.get_group("line")["members"] == ["10.0.0.2"]
+    assert groups.delete_group("line") and groups.get_group("line") is None
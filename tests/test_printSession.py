@@ -0,0 +1,47 @@
+from backend.bitmapGenerator import BitmapGenerator
+from backend.metricsModule import render_label_seconds
+from benchmarks.layouts import LAYOUTS
+from conftest import wait_for
+
+def label_renders() -> int:
+    return sum(count for count, _ in render_label_seconds.totals().values())
+
+def test_copies_and_sets_print_in_one_session(client, registered_printer):
+    printer = registered_printer()
+    response = client.post("/api/printer/print", json={"ip": printer.host, "type": "text", "text": "A",
+                                                       "sets": 3, "copies": 2})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["labels"] == 6
+    assert wait_for(lambda: printer.stats.as_dict()["labels_printed"] == 6)
+    assert printer.stats.as_dict()["print_commands"] == 1
+
+def test_layout_payloads_print_as_one_job(client, registered_printer):
+    printer = registered_printer()
+    response = client.post("/api/printer/print", json={"ip": printer.host, "type": "layout",
+                                                       "payloads": [{}, {}, {}], "copies": 2})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["labels"] == 6
+    assert wait_for(lambda: printer.stats.as_dict()["labels_printed"] == 6)
+
+def test_invalid_counter_step_is_a_bad_request(client, registered_printer):
+    printer = registered_printer()
+    response = client.post("/api/printer/print", json={"ip": printer.host, "type": "text", "counter_start": "1",
+                                                       "counter_step": "two"})
+    assert response.status_code == 400
+    assert "counter_step" in response.get_json()["error"]
+
+def test_sets_are_rejected_for_layout_prints(client, registered_printer):
+    printer = registered_printer()
+    response = client.post("/api/printer/print", json={"ip": printer.host, "type": "layout", "sets": 5})
+    assert response.status_code == 400
+    assert printer.stats.as_dict()["labels_printed"] == 0
+
+def test_render_label_seconds_counts_each_label_once(workdir):
+    generator = BitmapGenerator(100, 29, 300)
+    layout = LAYOUTS["charger"](0)
+    before = label_renders()
+    generator.render_regions(layout, [None, None, None])
+    assert label_renders() == before + 3
+    generator.create_from_frontend_data(layout["textItems"], layout["valueItems"], layout["iconItems"],
+                                        layout["barcodeItems"])
+    assert label_renders() == before + 4
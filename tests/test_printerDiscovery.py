@@ -0,0 +1,34 @@
+from backend.configModule import DiscoveryConfig
+from backend.printerDiscovery import discover_printers
+from benchmarks.fakePrinter import FakeTSPLPrinter
+
+def test_discovery_reports_model_and_resolution(printer_factory):
+    printer = printer_factory()
+    result = discover_printers(f"{printer.host}/32")
+    assert [(found["ip"], found["model"], found["dpi"], found["tspl"]) for found in result["printers"]] == [
+        (printer.host, "TE310", 300, True)]
+
+def test_model_reply_is_read_up_to_a_bound():
+    printer = FakeTSPLPrinter("127.0.0.250", 9100, 0, model="TE310" + "X" * 100000).start()
+    try:
+        result = discover_printers(f"{printer.host}/32")
+    finally:
+        printer.stop()
+    model = result["printers"][0]["model"]
+    assert model.startswith("TE310") and len(model) == DiscoveryConfig().max_reply_bytes
+
+def test_registered_flag_needs_the_same_port(client, registered_printer):
+    printer = registered_printer()
+    other_port = FakeTSPLPrinter(printer.host, 9101, 0).start()
+    try:
+        for port, registered in ((9100, True), (9101, False)):
+            response = client.post("/api/printers/discover", json={"cidr": f"{printer.host}/32", "port": port})
+            assert response.status_code == 200, response.get_json()
+            assert [found["registered"] for found in response.get_json()["printers"]] == [registered]
+    finally:
+        other_port.stop()
+
+def test_port_out_of_range_is_a_bad_request(client):
+    for port in (0, 65536, 10 ** 6):
+        response = client.post("/api/printers/discover", json={"cidr": "127.0.0.1/32", "port": port})
+        assert response.status_code == 400 and "port" in response.get_json()["error"]
@@ -0,0 +1,64 @@
+import base64
+from io import BytesIO
+from PIL import Image
+from benchmarks.layouts import LAYOUTS
+
+def icon_url(shade: int) -> str:
+    buffer = BytesIO()
+    Image.new("L", (8, 8), shade).save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+def icon_layout(shade: int) -> dict:
+    return {"iconItems": [{"iconFile": icon_url(shade), "x": 10, "y": 10, "width": 40, "height": 40}]}
+
+def printer_row(ip: str, **layouts) -> dict:
+    return {"ip": ip, "name": f"p-{ip}", "dpi": 300, "width": 100, "height": 29, "layouts": layouts}
+
+def asset_count(application) -> int:
+    return application.assets.execute_query("SELECT COUNT(*) AS n FROM assets")[0]["n"]
+
+def test_export_imports_onto_another_printer(client, application, registered_printer):
+    registered_printer()
+    exported = client.get("/api/printers/export").get_json()
+    exported["printers"][0]["ip"] = "10.9.0.1"
+    response = client.post("/api/printers/import", json=exported)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["layouts"] == 1
+    layout = client.post("/api/bitmap-settings/get", json={"ip": "10.9.0.1", "name": "default"}).get_json()["settings"]
+    assert all(item["iconFile"].startswith("/api/assets/") for item in layout["iconItems"])
+    assert len(layout["iconItems"]) == len(LAYOUTS["charger"](0)["iconItems"])
+
+def test_aborted_import_writes_nothing(client, application):
+    before = asset_count(application)
+    response = client.post("/api/printers/import", json=[
+        printer_row("10.9.0.1", icon=icon_layout(40)),
+        {"ip": "10.9.0.2", "name": "bad", "dpi": "x", "width": 100, "height": 29},
+    ])
+    assert response.status_code == 400
+    assert [error["row"] for error in response.get_json()["errors"]] == [2]
+    assert asset_count(application) == before
+    assert client.get("/api/printers").get_json() == []
+
+def test_skipped_rows_leave_their_assets_out(client, application):
+    before = asset_count(application)
+    response = client.post("/api/printers/import?on_error=skip", json=[
+        printer_row("10.9.0.1", icon=icon_layout(40)),
+        printer_row("10.9.0.2", icon={**icon_layout(80), "textItems": [{"content": "x", "x": 5000, "y": 0}]}),
+    ])
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["inserted"] == 1
+    assert asset_count(application) == before + 1
+
+def test_imported_geometry_is_always_recompiled(client):
+    layout = {"textItems": [{"content": "far away", "x": 5000, "y": 10, "fontSize": 20, "bbox": [0, 0, 10, 10]}],
+              "layout": {"version": 1, "dpi": 300, "widthPx": 1181, "heightPx": 342, "warnings": []}}
+    response = client.post("/api/printers/import", json=[printer_row("10.9.0.1", default=layout)])
+    assert response.status_code == 400
+    assert "outside" in response.get_json()["errors"][0]["error"]
+
+def test_bad_asset_urls_are_rejected(client, application):
+    before = asset_count(application)
+    response = client.post("/api/printers/import", json={
+        "printers": [printer_row("10.9.0.1")], "assets": {"a": icon_url(10), "b": "not a data url"}})
+    assert response.status_code == 400
+    assert asset_count(application) == before
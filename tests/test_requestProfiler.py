@@ -0,0 +1,73 @@
+import time
+from backend.requestProfiler import (
+    MODE_CPROFILE, MODE_SAMPLE, STAGE_DB, STAGE_RENDER, RequestProfiler, profile_stage, stage_span
+)
+
+REMOTE = {"REMOTE_ADDR": "10.0.0.5"}
+
+def busy_render(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+@profile_stage(STAGE_RENDER)
+def render_stage(nested: bool = False):
+    if nested:
+        return render_stage()
+    with stage_span(STAGE_DB):
+        pass
+
+def test_armed_session_profiles_the_next_request(client):
+    response = client.post("/api/admin/profile", json={"route": "/api/health"})
+    assert response.status_code == 201, response.get_json()
+    session_id = response.get_json()["id"]
+    assert client.get("/api/health").status_code == 200
+    report = client.get(f"/api/admin/profile/{session_id}").get_json()
+    assert (report["state"], report["profiled"]) == ("done", 1)
+    assert [capture["route"] for capture in report["captures"]] == ["/api/health"]
+    text = client.get(f"/api/admin/profile/{session_id}?format=text&sort=tottime")
+    assert text.status_code == 200 and "function calls" in text.get_data(as_text=True)
+    assert client.get(f"/api/admin/profile/{session_id}?format=text&sort=bogus").status_code == 400
+
+def test_sampler_collects_frames():
+    profiler = RequestProfiler()
+    session = profiler.arm("/x", mode=MODE_SAMPLE, interval_ms=1)
+    capture = profiler.start_request("GET", "/x", "/x")
+    busy_render(0.2)
+    profiler.finish_request(capture, 200)
+    stacks = profiler.collapsed(session)
+    assert session.state == "done"
+    assert any("busy_render" in line and line.startswith("GET /x;[other]") for line in stacks.splitlines())
+
+def test_stage_spans_are_recorded():
+    profiler = RequestProfiler()
+    session = profiler.arm("/x", mode=MODE_SAMPLE, interval_ms=1)
+    capture = profiler.start_request("GET", "/x", "/x")
+    render_stage(nested=True)
+    render_stage()
+    profiler.finish_request(capture, 200)
+    stages = session.summary()["stages"]
+    # The nested render counts once, the database span inside it is not render's own time
+    assert stages[STAGE_RENDER]["spans"] == 2 and stages[STAGE_DB]["spans"] == 2
+    assert stages[STAGE_RENDER]["self_ms"] <= stages[STAGE_RENDER]["ms"]
+
+def test_second_cprofile_capture_is_refused():
+    profiler = RequestProfiler()
+    session = profiler.arm("/x", requests=2, mode=MODE_CPROFILE)
+    first = profiler.start_request("GET", "/x", "/x")
+    try:
+        assert profiler.start_request("GET", "/x", "/x") is None
+        assert session.skipped == 1
+    finally:
+        profiler.finish_request(first, 200)
+    second = profiler.start_request("GET", "/x", "/x")
+    profiler.finish_request(second, 200)
+    assert session.state == "done" and session.stats is not None
+
+def test_admin_api_needs_loopback_or_the_token(client, monkeypatch):
+    assert client.get("/api/admin/profile", environ_base=REMOTE).status_code == 403
+    monkeypatch.setenv("HERA_ADMIN_TOKEN", "secret")
+    assert client.get("/api/admin/profile").status_code == 401
+    assert client.get("/api/admin/profile", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    assert client.get("/api/admin/profile", environ_base=REMOTE,
+                      headers={"Authorization": "Bearer secret"}).status_code == 200
@@ -0,0 +1,39 @@
+import sys
+import time
+from backend.startupProfile import StartupProfile, _ImportTimer
+
+def test_report_contains_the_import_timings(tmp_path, monkeypatch):
+    (tmp_path / "startup_outer.py").write_text("import time\nimport startup_inner\ntime.sleep(0.02)\n")
+    (tmp_path / "startup_inner.py").write_text("import time\ntime.sleep(0.05)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    profile = StartupProfile()
+    profile.enabled = True
+    profile.install()
+    try:
+        with profile.phase("imports"):
+            import startup_outer  # noqa: F401
+        profile.first_request()
+    finally:
+        profile.uninstall()
+        for name in ("startup_outer", "startup_inner"):
+            sys.modules.pop(name, None)
+    assert not any(isinstance(finder, _ImportTimer) for finder in sys.meta_path)
+
+    report = profile.report(top=50)
+    timings = {entry["module"]: entry for entry in report["slowest_imports"]}
+    outer, inner = timings["startup_outer"], timings["startup_inner"]
+    assert inner["self_ms"] >= 50 and inner["cumulative_ms"] == inner["self_ms"]
+    # The nested import counts towards the outer module's cumulative time only
+    assert outer["self_ms"] >= 20 and outer["cumulative_ms"] >= outer["self_ms"] + inner["self_ms"]
+    assert [phase["phase"] for phase in report["phases"]] == ["imports"]
+    assert report["first_request_ms"] >= report["phases"][0]["ms"]
+
+def test_disabled_profile_records_nothing():
+    profile = StartupProfile()
+    profile.enabled = False
+    profile.install()
+    with profile.phase("flask"):
+        time.sleep(0.001)
+    profile.first_request()
+    report = profile.report()
+    assert (report["imports"], report["phases"], report["first_request_ms"]) == (0, [], None)
@@ -0,0 +1,64 @@
+import gzip
+import pytest
+from flask import Flask, request
+from backend.staticAssets import INDEX_FILE, StaticAssets
+
+BUNDLE = "static/js/main.1a2b3c4d.js"
+
+@pytest.fixture
+def assets(tmp_path):
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / INDEX_FILE).write_text("<html>" + "<div>etiket</div>" * 200 + "</html>")
+    (tmp_path / BUNDLE).write_text("console.log('etiket');" * 200)
+    (tmp_path / "favicon.ico").write_bytes(bytes(range(256)) * 8)
+    (tmp_path / "robots.txt").write_text("User-agent: *\n")
+    return StaticAssets(str(tmp_path)).load()
+
+@pytest.fixture
+def client(assets):
+    app = Flask(__name__, static_folder=None)
+
+    @app.route("/<path:path>")
+    def serve(path):
+        return assets.response(assets.get(path), request)
+
+    return app.test_client()
+
+def test_uncompressed_until_precompressed(assets, client):
+    response = client.get(f"/{INDEX_FILE}", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers and "Vary" not in response.headers
+    assets.precompress()
+    response = client.get(f"/{INDEX_FILE}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == assets.get(INDEX_FILE).data
+
+def test_encoding_follows_accept_encoding(assets, client):
+    assets.precompress()
+    assets.get(BUNDLE).encoded["br"] = b"brotli body"  # as if Brotli were installed
+    encodings = {}
+    for accept in ("br, gzip", "gzip", "identity", None):
+        response = client.get(f"/{BUNDLE}", headers={"Accept-Encoding": accept} if accept else {})
+        encodings[accept] = response.headers.get("Content-Encoding")
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert "immutable" in response.headers["Cache-Control"]
+    assert encodings == {"br, gzip": "br", "gzip": "gzip", "identity": None, None: None}
+
+def test_small_and_binary_files_are_sent_as_is(assets, client):
+    assets.precompress()
+    for path in ("robots.txt", "favicon.ico"):
+        assert assets.get(path).encoded == {}
+        response = client.get(f"/{path}", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers and "Vary" not in response.headers
+        assert response.data == assets.get(path).data
+
+def test_etag_revalidation_per_encoding(assets, client):
+    assets.precompress()
+    plain = client.get(f"/{INDEX_FILE}")
+    gzipped = client.get(f"/{INDEX_FILE}", headers={"Accept-Encoding": "gzip"})
+    assert plain.headers["Cache-Control"] == "no-cache"
+    assert plain.headers["ETag"] != gzipped.headers["ETag"]
+    again = client.get(f"/{INDEX_FILE}", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+    # The identity ETag doesn't validate the gzip variant
+    other = client.get(f"/{INDEX_FILE}", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]})
+    assert other.status_code == 200
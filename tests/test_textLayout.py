@@ -0,0 +1,57 @@
+from PIL import ImageFont
+from backend.textLayout import FIT_SHRINK, GlyphMetrics, layout_text, wrap_text
+
+class FixedFont:
+    """Every character is half the font size wide, lines are as tall as the size"""
+
+    layout_engine = ImageFont.Layout.BASIC
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def getmetrics(self):
+        return self.size, 0
+
+    def getlength(self, text: str, mode: str = None) -> float:
+        return len(text) * self.size / 2
+
+def metrics_for(size: int) -> GlyphMetrics:
+    return GlyphMetrics(FixedFont(size))
+
+def test_words_wrap_greedily():
+    # 5 px per character at size 10
+    assert wrap_text("aa bb cc dd", 30, metrics_for(10)) == ["aa bb", "cc dd"]
+    assert wrap_text("aa bb\ncc", None, metrics_for(10)) == ["aa bb", "cc"]
+
+def test_long_words_break_between_characters():
+    assert wrap_text("abcdefghij", 20, metrics_for(10)) == ["abcd", "efgh", "ij"]
+
+def test_fixed_size_drops_lines_that_do_not_fit():
+    layout = layout_text("aa bb cc dd ee", metrics_for, 10, width=25, height=25)
+    assert [line for line, _, _ in layout.lines] == ["aa bb", "cc dd"]
+    assert layout.truncated and layout.font_size == 10
+
+def test_shrink_picks_the_largest_size_that_fits():
+    layout = layout_text("abcdefghij", metrics_for, 20, width=60, height=20, fit=FIT_SHRINK)
+    assert (layout.font_size, layout.truncated) == (12, False)
+    assert [line for line, _, _ in layout.lines] == ["abcdefghij"]
+
+def test_shrink_stops_at_the_minimum_size():
+    layout = layout_text("abcdefghij " * 10, metrics_for, 20, width=60, height=20, fit=FIT_SHRINK, min_font_size=10)
+    assert layout.font_size == 10 and layout.truncated
+
+def test_lines_are_aligned_in_their_box():
+    centered = layout_text("ab", metrics_for, 10, width=30, height=40, align="center", vertical_align="middle")
+    assert centered.lines == [("ab", 10, 15)]
+    right = layout_text("ab\na", metrics_for, 10, width=30, height=40, align="right", vertical_align="bottom",
+                        line_spacing=1.5)
+    assert right.lines == [("ab", 20, 15), ("a", 25, 30)]
+
+def test_compiler_warns_about_truncated_text(workdir):
+    from backend.layoutCompiler import LayoutCompiler
+    item = {"content": "Rated Voltage Three Phase 340-460 VAC", "x": 10, "y": 10, "fontSize": 30,
+            "width": 120, "height": 30}
+    compiled = LayoutCompiler(100, 29, 300).compile({"textItems": [item]})
+    assert any("doesn't fit" in warning for warning in compiled["layout"]["warnings"])
+    bbox = compiled["textItems"][0]["bbox"]
+    assert bbox[2] - bbox[0] <= 120 and bbox[3] - bbox[1] <= 30
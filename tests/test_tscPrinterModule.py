@@ -0,0 +1,26 @@
+import socket
+from backend.tscPrinterModule import TSCPrinter
+from conftest import wait_for
+
+def dead_socket() -> socket.socket:
+    """Connected socket whose peer has gone away"""
+    ours, theirs = socket.socketpair()
+    theirs.close()
+    return ours
+
+def test_connection_closed_by_the_printer_is_not_connected():
+    printer = TSCPrinter()
+    printer.socket = dead_socket()
+    assert not printer.is_connected()
+    assert printer.socket is None
+
+def test_failed_send_reconnects_on_the_next_job(printer_factory, monkeypatch):
+    fake = printer_factory()
+    printer = TSCPrinter(fake.host, fake.port)
+    printer.socket = dead_socket()
+    monkeypatch.setattr(printer, "is_connected", lambda: printer.socket is not None)
+    assert printer.send_text("A") is False
+    assert printer.socket is None
+    assert printer.send_text("B") is True
+    assert wait_for(lambda: fake.stats.as_dict()["labels_printed"] == 1)
+    printer.disconnect_printer()
@@ -0,0 +1,21 @@
+from backend.rasterEncoder import ENCODING_PCX, ENCODING_RAW
+from backend.tsplCommands import regions_commands
+
+def region(height: int) -> tuple:
+    """Mostly blank 64 px wide region, PCX is its smallest encoding"""
+    return 0, 0, 8, height, (b"\x00" + b"\xff" * 7) * height
+
+def command_lines(stream: bytes) -> list:
+    return [line.split(b" ")[0].split(b",")[0] for line in stream.split(b"\n") if line[:1].isalpha()]
+
+def test_downloads_come_before_the_label_setup():
+    stream = regions_commands([region(40), region(40)], 100, 29, 1, [ENCODING_RAW, ENCODING_PCX], "10.0.0.1")
+    assert stream.startswith(b'DOWNLOAD "LABEL.PCX"')
+    commands = [command for command in command_lines(stream) if command != b"DOWNLOAD"]
+    assert commands == [b"SIZE", b"DIRECTION", b"CLS", b"PUTPCX", b"PRINT"] * 2
+    assert stream.count(b"DOWNLOAD") == 2
+
+def test_raw_bitmaps_share_one_setup():
+    stream = regions_commands([region(1), region(1)], 100, 29, 2, [ENCODING_RAW], "10.0.0.1")
+    assert command_lines(stream)[:3] == [b"SIZE", b"DIRECTION", b"CLS"]
+    assert stream.count(b"SIZE") == 1 and stream.count(b"PRINT 1,2") == 2
@@ -0,0 +1,38 @@
+from backend.bitmapGenerator import BitmapGenerator
+from backend.imageCache import static_layer_cache
+from backend.tscPrinterModule import TSCPrinter
+from backend.tsplCommands import template_commands, template_download
+from backend.tsplTemplate import compile_template, offset_variables, split_template, template_filename
+from benchmarks.layouts import charger_label, charger_variables
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendall(self, data: bytes):
+        self.sent.append(data)
+
+def template_job(offset: int):
+    """Static layer and program of the charger template run continuing after offset labels"""
+    static_settings, variable_items = split_template(charger_label(0), offset_variables(charger_variables(0), offset))
+    return static_settings, compile_template(variable_items, 300)
+
+def test_cached_template_sends_the_freshly_built_stream(workdir, monkeypatch):
+    static_layer_cache.clear()
+    hits = static_layer_cache.hits
+    printer = TSCPrinter()
+    printer.socket = RecordingSocket()
+    monkeypatch.setattr(printer, "is_connected", lambda: True)
+    for offset in (0, 3):
+        static_settings, program = template_job(offset)
+        region = BitmapGenerator(100, 29, 300).render_static_region(static_settings)
+        assert printer.send_template(template_filename(region), region, program, 3)
+    assert static_layer_cache.hits == hits + 1
+
+    # Built from scratch: a new render of the static layer and its download, then only the commands
+    static_settings, _ = template_job(0)
+    fresh = BitmapGenerator(100, 29, 300).render_regions(static_settings)[0]
+    filename = template_filename(fresh)
+    first, second = printer.socket.sent
+    assert first == template_download(filename, fresh) + template_commands(filename, fresh, template_job(0)[1], 3, 1, 100, 29)
+    assert second == template_commands(filename, fresh, template_job(3)[1], 3, 1, 100, 29)
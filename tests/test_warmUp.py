@@ -0,0 +1,46 @@
+import json
+from backend.metricsModule import render_label_seconds, SOURCE_JOB, SOURCE_WARMUP
+from backend.warmUp import WarmUp
+from benchmarks.layouts import charger_variables
+
+def renders(source: str) -> int:
+    return render_label_seconds.totals().get((source,), (0, 0.0))[0]
+
+def warm(application) -> dict:
+    warm_up = WarmUp()
+    warm_up.config.connect_printers = False
+    warm_up._run(application)
+    return warm_up.progress()
+
+def test_last_requests_are_kept_per_printer(application):
+    journal = application.jobJournal
+    journal.begin_job("a", "10.0.0.1", "printer", "template", "default", {"variables": {"a": 1}}, 1)
+    journal.begin_job("b", "10.0.0.2", "printer", "template", "default", {"variables": {"b": 1}}, 1)
+    journal.flush()
+    last = application.printJobs.get_last_requests("template")
+    assert {key: json.loads(request)["variables"] for key, request in last.items()} == {
+        ("10.0.0.1", "default"): {"a": 1}, ("10.0.0.2", "default"): {"b": 1}}
+
+def test_static_layers_follow_each_printers_last_job(client, application, registered_printer):
+    printers = [registered_printer(), registered_printer()]
+    response = client.post("/api/printer/print", json={"ip": printers[0].host, "type": "template",
+                                                       "variables": charger_variables(0)})
+    assert response.status_code == 200, response.get_json()
+    progress = warm(application)
+    assert (progress["layouts_done"], progress["static_layers"], progress["errors"]) == (2, 1, 0)
+
+def test_group_jobs_warm_every_member(client, application, registered_printer):
+    printers = [registered_printer(), registered_printer()]
+    response = client.post("/api/printer-groups", json={"name": "line", "members": [p.host for p in printers]})
+    assert response.status_code in (200, 201), response.get_json()
+    application.jobJournal.begin_job("g", "line", "group", "template", "default",
+                                     {"variables": charger_variables(0)}, 1)
+    application.jobJournal.flush()
+    assert warm(application)["static_layers"] == 2
+
+def test_warm_up_renders_are_labelled_separately(application, registered_printer):
+    registered_printer()
+    jobs, warmups = renders(SOURCE_JOB), renders(SOURCE_WARMUP)
+    warm(application)
+    assert renders(SOURCE_JOB) == jobs
+    assert renders(SOURCE_WARMUP) > warmups